@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Rewrite Grafana dashboard Flux queries from the agent's legacy 'containers'
+schema (container and cid tags) to the 'tasks' schema written with
+INFLUX_SCHEMA=task (service and slot tags, cid and container as fields).
+
+    python migrate_dashboard_schema.py grafana_dashboard*.json            # writes *.tasks.json
+    python migrate_dashboard_schema.py --in-place grafana_dashboard.json
+    python migrate_dashboard_schema.py --check grafana_dashboard.json     # report only
+
+Works on dashboard JSON and on import payloads ({'dashboard': {...}}).
+Queries filtering on r.container / r.cid are flagged for manual review:
+those are fields now, so the filter has to move after the pivot.
+"""
+
+import re
+import sys
+import json
+import argparse
+
+MEASUREMENT = re.compile(r'(r\._measurement\s*==\s*)"containers"')
+# Column lists of pivot(rowKey: [...]) and group(columns: [...]): series identity moves to service/slot
+KEY_LIST = re.compile(r'((?:rowKey|group\(columns)\s*:\s*\[)([^\]]*)(\])')
+TAG_VALUES = re.compile(r'(tag:\s*)"(container|cid)"')
+FIELD_FILTER = re.compile(r'\br\.(container|cid)\b|\br\["(container|cid)"\]')
+RENAMED = {'"container"': '"service"', '"cid"': '"slot"'}
+
+
+def migrate_query(query: str):
+    """(new query, warnings) for one Flux query; unchanged if it does not read the containers measurement"""
+    if not MEASUREMENT.search(query):
+        return query, []
+    warnings = []
+    query = MEASUREMENT.sub(r'\1"tasks"', query)
+
+    def rename_keys(match):
+        columns = [c.strip() for c in match.group(2).split(',') if c.strip()]
+        renamed = list(dict.fromkeys(RENAMED.get(c, c) for c in columns))
+        return match.group(1) + ', '.join(renamed) + match.group(3)
+
+    query = KEY_LIST.sub(rename_keys, query)
+    query = TAG_VALUES.sub(lambda m: f'{m.group(1)}"{"service" if m.group(2) == "container" else "slot"}"', query)
+    if FIELD_FILTER.search(query):
+        warnings.append('filters on container/cid - these are fields in the tasks schema, filter after pivot()')
+    return query, warnings
+
+
+def walk_panels(panels: list):
+    for panel in panels or []:
+        yield panel
+        yield from walk_panels(panel.get('panels'))
+
+
+def migrate_dashboard(document: dict):
+    """Rewrite a dashboard (or import payload) in place; returns [(where, warnings)] of changed queries"""
+    dashboard = document.get('dashboard', document)
+    queries = [(f"panel '{panel.get('title', panel.get('id'))}' target {target.get('refId', '?')}", target)
+               for panel in walk_panels(dashboard.get('panels')) for target in panel.get('targets') or []]
+    queries += [(f"variable '{variable.get('name')}'", variable)
+                for variable in (dashboard.get('templating') or {}).get('list') or []]
+    changes = []
+    for where, holder in queries:
+        if not isinstance(holder.get('query'), str):
+            continue
+        migrated, warnings = migrate_query(holder['query'])
+        if migrated != holder['query']:
+            holder['query'] = migrated
+            changes.append((where, warnings))
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate Grafana dashboards to the tasks InfluxDB schema')
+    parser.add_argument('dashboards', nargs='+')
+    parser.add_argument('--in-place', action='store_true', help='Overwrite the input files')
+    parser.add_argument('--check', action='store_true', help='Only report the queries that would change')
+    args = parser.parse_args()
+
+    review = False
+    for path in args.dashboards:
+        with open(path) as f:
+            document = json.load(f)
+        changes = migrate_dashboard(document)
+        print(f"{path}: {len(changes)} quer{'y' if len(changes) == 1 else 'ies'} migrated")
+        for where, warnings in changes:
+            print(f"  {where}")
+            for warning in warnings:
+                print(f"    REVIEW: {warning}")
+                review = True
+        if args.check or not changes:
+            continue
+        output = path if args.in_place else re.sub(r'\.json$', '', path) + '.tasks.json'
+        with open(output, 'w') as f:
+            json.dump(document, f, indent=2)
+            f.write('\n')
+        print(f"  written to {output}")
+    return 1 if review else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,6 +5,13 @@ set -e
 
 REGISTRY="docker-registry.amirmuz.com"
 IMAGE="${REGISTRY}/swarmguard-manager:latest"
+# MANAGER_WORKERS>1 runs the shard router on :5000 with that many manager
+# workers behind it, each owning a consistent-hash share of the services
+MANAGER_WORKERS="${MANAGER_WORKERS:-1}"
+COMMAND=""
+if [ "${MANAGER_WORKERS}" -gt 1 ]; then
+  COMMAND="python shard_launcher.py --workers ${MANAGER_WORKERS} --restart"
+fi
 
 echo "Deploying recovery manager on master node..."
 
@@ -12,9 +19,10 @@ ssh master "docker service create \
   --name recovery-manager \
   --constraint 'node.hostname == master' \
   --mount type=bind,src=/var/run/docker.sock,dst=/var/run/docker.sock \
+  --mount type=volume,src=swarmguard-manager-state,dst=/app/state \
   --network swarmguard-net \
   --publish 5000:5000 \
-  ${IMAGE}"
+  ${IMAGE} ${COMMAND}"
 
 echo "✅ Recovery manager deployed!"
 echo "Waiting for service to be ready..."
@@ -6,6 +6,8 @@ Collects metrics from Docker containers and sends alerts to recovery manager
 
 import os
 import sys
+import json
+import math
 import time
 import logging
 import signal
@@ -15,6 +17,16 @@ import asyncio
 from metrics_collector import MetricsCollector
 from influxdb_writer import InfluxDBWriter
 from alert_sender import AlertSender
+from image_cache import ImageCache
+from stream_client import StreamClient
+from tracing import SpanRecorder
+from latency_scraper import LatencyScraper, route_patterns
+try:
+    import rule_compiler  # copied next to agent.py in the image
+except ImportError:
+    # Source checkout: the one copy lives in recovery-manager/ (appended, so local modules win)
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'recovery-manager'))
+from rule_compiler import DEFAULT_RULES, METRIC_NAMES, RollingHistory, RuleError, compile_rules, np
 
 logging.basicConfig(
     level=logging.INFO,
@@ -36,16 +48,68 @@ class MonitoringAgent:
         self.memory_threshold = float(os.getenv('MEMORY_THRESHOLD', '80.0'))
         self.network_threshold_low = float(os.getenv('NETWORK_THRESHOLD_LOW', '35.0'))
         self.network_threshold_high = float(os.getenv('NETWORK_THRESHOLD_HIGH', '65.0'))
+        # Forward every poll's container samples to the manager (needed for predictive scale-up)
+        self.forward_samples = os.getenv('FORWARD_SAMPLES', 'false').lower() == 'true'
+        # Report node metrics to the manager every poll (feeds migration target selection)
+        self.report_node_metrics = os.getenv('REPORT_NODE_METRICS', 'true').lower() == 'true'
+        # Report per-service means every poll (feeds the manager's time-series store)
+        self.report_service_summary = os.getenv('REPORT_SERVICE_SUMMARY', 'true').lower() == 'true'
+        # Append every poll as one JSON line (replayable by the recovery manager's simulator.py)
+        self.capture_file = os.getenv('CAPTURE_FILE')
+        # Report local images with node metrics and pull what the manager asks for (cuts task start time)
+        self.prepull_enabled = os.getenv('PREPULL_ENABLED', 'true').lower() == 'true'
+        self.image_inventory_interval = int(os.getenv('IMAGE_INVENTORY_INTERVAL', '60'))
+        # InfluxDB schema for container points: 'container' tags the container name and ID (a new
+        # series for every task), 'task' tags service and task slot and keeps the IDs as fields
+        # (bounded series), 'both' writes the two while dashboards are migrated
+        self.influx_schema = os.getenv('INFLUX_SCHEMA', 'container').lower()
+        if self.influx_schema not in ('container', 'task', 'both'):
+            logger.warning(f"Unknown INFLUX_SCHEMA '{self.influx_schema}' - using 'container'")
+            self.influx_schema = 'container'
+        # Persistent msgpack stream to the manager (alerts, samples, heartbeats); HTTP while it is down
+        self.stream_enabled = os.getenv('STREAM_ENABLED', 'true').lower() == 'true'
+        self.stream_summary = os.getenv('STREAM_METRIC_SUMMARY', 'true').lower() == 'true'
+        # Start a trace at each breaching sample; spans go to TRACE_FILE (OTLP/JSON lines, '' for none)
+        # and to InfluxDB, and the manager continues the trace (see recovery-manager/trace_view.py)
+        self.tracing_enabled = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
+        # Scrape request latency and concurrency from local tasks labelled swarmguard.latency.port
+        # (on their LATENCY_NETWORK IP); rules see them as p95 (ms) and inflight. The percentiles leave out
+        # LATENCY_EXCLUDE_ROUTES ('GET /download/data,GET /stress/*') unless the task sets its own
+        # swarmguard.latency.routes / exclude_routes labels
+        self.latency_enabled = os.getenv('LATENCY_SCRAPE', 'true').lower() == 'true'
 
         logger.info(f"Initializing monitoring agent for node: {self.node_name}")
         logger.info(f"Network interface: {self.net_iface}, Poll interval: {self.poll_interval}s")
 
-        self.metrics_collector = MetricsCollector(self.node_name, self.net_iface)
+        self.latency_scraper = LatencyScraper(os.getenv('LATENCY_NETWORK', 'swarmguard-net'),
+                                              float(os.getenv('LATENCY_TIMEOUT', '1.0')),
+                                              route_patterns(os.getenv('LATENCY_EXCLUDE_ROUTES'))
+                                              ) if self.latency_enabled else None
+        self.metrics_collector = MetricsCollector(self.node_name, self.net_iface, self.latency_scraper)
         self.influxdb_writer = InfluxDBWriter(self.influxdb_url, self.influxdb_token)
-        self.alert_sender = AlertSender(self.recovery_manager_url)
+        self.stream = StreamClient(self.recovery_manager_url, self.node_name,
+                                   float(os.getenv('STREAM_HEARTBEAT_INTERVAL', '5')),
+                                   float(os.getenv('STREAM_BACKOFF_MAX', '30'))) if self.stream_enabled else None
+        self.tracer = SpanRecorder(self.node_name, os.getenv('TRACE_FILE', '/tmp/swarmguard/agent-spans.jsonl')
+                                   ) if self.tracing_enabled else None
+        self.alert_sender = AlertSender(self.recovery_manager_url, self.stream, self.tracer,
+                                        float(os.getenv('ALERT_ACK_TIMEOUT', '1')))
+        self.image_cache = ImageCache(self.metrics_collector.docker_client,
+                                      int(os.getenv('PREPULL_CONCURRENCY', '1')))
+
+        # Threshold rules: shared definitions fetched from the recovery manager,
+        # falling back to the env thresholds until the manager is reachable
+        self.rules_refresh_interval = int(os.getenv('RULES_REFRESH_INTERVAL', '60'))
+        self.batch_eval_min = int(os.getenv('BATCH_EVAL_MIN', '32'))
+        self.rule_set = compile_rules(self.default_rule_definitions())
+        self.rules_source = 'env'
+        self.last_rules_fetch = 0
+        self.history = RollingHistory(self.rule_set.history_size)
 
         self.metrics_batch = []
         self.last_flush = time.time()
+        # When the current poll started, had its metrics collected and had its rules evaluated
+        self.poll_times = dict.fromkeys(('started', 'collected', 'evaluated'), time.time())
         self.batch_size = int(os.getenv('BATCH_SIZE', '20'))
         self.flush_interval = int(os.getenv('FLUSH_INTERVAL', '10'))
 
@@ -53,48 +117,97 @@ class MonitoringAgent:
         logger.info(f"Received signal {signum}, shutting down...")
         self.running = False
 
-    async def check_thresholds_and_alert(self, container_metrics: dict):
+    def calculate_network_percent(self, container_metrics: dict) -> float:
+        # Calculate network percentage based on 100Mbps interface capacity (12.5 MB/s)
+        # Average of RX and TX as percentage of capacity
+        interface_capacity_mbps = 100.0  # 100Mbps network (PRD section 4.2)
+        net_total_mbps = container_metrics.get('network_rx_mbps', 0) + container_metrics.get('network_tx_mbps', 0)
+        return (net_total_mbps / interface_capacity_mbps) * 100
+
+    def default_rule_definitions(self) -> list:
+        params = {
+            'scenario1_migration': {'cpu_threshold': self.cpu_threshold, 'memory_threshold': self.memory_threshold,
+                                    'network_threshold_max': self.network_threshold_low},
+            'scenario2_scaling': {'cpu_threshold': self.cpu_threshold, 'memory_threshold': self.memory_threshold,
+                                  'network_threshold_min': self.network_threshold_high}
+        }
+        return [dict(rule, params=params[rule['name']]) for rule in DEFAULT_RULES]
+
+    async def refresh_rules(self):
+        if time.time() - self.last_rules_fetch < self.rules_refresh_interval:
+            return
+        self.last_rules_fetch = time.time()
+        data = await self.alert_sender.fetch_rules()
+        if not data or 'rules' not in data:
+            return
+        try:
+            rule_set = compile_rules(data['rules'])
+        except RuleError as e:
+            logger.error(f"Rejected rules from recovery manager: {e}")
+            return
+        if self.rules_source != 'manager':
+            logger.info(f"Using {len(rule_set.rules)} rules from recovery manager")
+        self.rule_set = rule_set
+        self.rules_source = 'manager'
+        self.history.resize(rule_set.history_size)
+
+    def evaluate_rules(self, containers: list) -> list:
+        """Scenario (first matching rule) per container - vectorized for large batches"""
+        samples = []
+        for container in containers:
+            sample = {'cpu': container.get('cpu_percent', 0), 'mem': container.get('memory_percent', 0),
+                      'net': self.calculate_network_percent(container),
+                      'p95': container.get('latency_p95_ms', math.nan), 'inflight': container.get('in_flight', math.nan)}
+            self.history.push(container['container_id'], sample)
+            samples.append(sample)
+        keys = [c['container_id'] for c in containers]
+        self.history.prune(keys)
+
+        if np is not None and len(containers) >= self.batch_eval_min:
+            columns = {m: np.array([sample[m] for sample in samples]) for m in METRIC_NAMES}
+            return self.rule_set.first_match_batch(columns, self.history.matrix(keys))
+        return [self.rule_set.evaluate(sample, self.history.samples[key]) for sample, key in zip(samples, keys)]
+
+    async def check_thresholds_and_alert(self, container_metrics: dict, scenario: str):
+        if scenario is None:
+            return
+
         cpu = container_metrics.get('cpu_percent', 0)
         mem = container_metrics.get('memory_percent', 0)
         net_in = container_metrics.get('network_rx_mbps', 0)
         net_out = container_metrics.get('network_tx_mbps', 0)
+        net_percent = self.calculate_network_percent(container_metrics)
+        logger.warning(f"{scenario} detected: {container_metrics['container_name']} - CPU={cpu:.1f}%, MEM={mem:.1f}%, NET={net_percent:.1f}%")
 
-        # Calculate network percentage based on 100Mbps interface capacity (12.5 MB/s)
-        # Average of RX and TX as percentage of capacity
-        interface_capacity_mbps = 100.0  # 100Mbps network (PRD section 4.2)
-        net_total_mbps = net_in + net_out
-        net_percent = (net_total_mbps / interface_capacity_mbps) * 100
-
-        should_alert = False
-        scenario = None
-
-        if (cpu > self.cpu_threshold or mem > self.memory_threshold) and net_percent < self.network_threshold_low:
-            should_alert = True
-            scenario = "scenario1_migration"
-            logger.warning(f"Scenario 1 detected: {container_metrics['container_name']} - CPU={cpu:.1f}%, MEM={mem:.1f}%, NET={net_percent:.1f}%")
-        elif (cpu > self.cpu_threshold or mem > self.memory_threshold) and net_percent > self.network_threshold_high:
-            should_alert = True
-            scenario = "scenario2_scaling"
-            logger.warning(f"Scenario 2 detected: {container_metrics['container_name']} - CPU={cpu:.1f}%, MEM={mem:.1f}%, NET={net_percent:.1f}%")
-
-        if should_alert:
-            alert_data = {
-                "timestamp": int(time.time()),
-                "node": self.node_name,
-                "container_id": container_metrics['container_id'],
-                "container_name": container_metrics['container_name'],
-                "service_name": container_metrics.get('service_name', ''),
-                "scenario": scenario,
-                "metrics": {
-                    "cpu_percent": round(cpu, 2),
-                    "memory_mb": container_metrics['memory_mb'],
-                    "memory_percent": round(mem, 2),
-                    "network_rx_mbps": round(net_in, 2),
-                    "network_tx_mbps": round(net_out, 2),
-                    "network_percent": round(net_percent, 2)
-                }
+        trace = None
+        if self.tracer is not None:
+            # The trace starts with the poll that took the breaching sample
+            times = self.poll_times
+            trace = self.tracer.new_trace(times['started'])
+            self.tracer.record(trace, 'agent.collect', times['started'], times['collected'])
+            self.tracer.record(trace, 'agent.evaluate', times['collected'], times['evaluated'], scenario=scenario,
+                               container=container_metrics['container_name'])
+
+        alert_data = {
+            "timestamp": int(time.time()),
+            "node": self.node_name,
+            "container_id": container_metrics['container_id'],
+            "container_name": container_metrics['container_name'],
+            "service_name": container_metrics.get('service_name', ''),
+            "scenario": scenario,
+            "metrics": {
+                "cpu_percent": round(cpu, 2),
+                "memory_mb": container_metrics['memory_mb'],
+                "memory_percent": round(mem, 2),
+                "network_rx_mbps": round(net_in, 2),
+                "network_tx_mbps": round(net_out, 2),
+                "network_percent": round(net_percent, 2)
             }
-            await self.alert_sender.send_alert(alert_data)
+        }
+        for key in ('latency_p95_ms', 'in_flight'):
+            if key in container_metrics:
+                alert_data['metrics'][key] = container_metrics[key]
+        await self.alert_sender.send_alert(alert_data, trace)
 
     async def process_metrics(self, metrics: dict):
         node_metrics = metrics.get('node', {})
@@ -109,23 +222,119 @@ class MonitoringAgent:
                         f"net_out={node_metrics['network_tx_mbps']:.3f} {timestamp}")
             self.metrics_batch.append(node_line)
 
-        for container in containers:
-            await self.check_thresholds_and_alert(container)
-            container_line = (f"containers,node={self.node_name},"
-                            f"container={container['container_name']},"
-                            f"cid={container['container_id'][:12]} "
-                            f"cpu={container['cpu_percent']:.2f},"
-                            f"mem={container['memory_percent']:.2f},"
-                            f"mem_mb={container['memory_mb']:.2f},"
-                            f"net_in={container['network_rx_mbps']:.3f},"
-                            f"net_out={container['network_tx_mbps']:.3f} {timestamp}")
-            self.metrics_batch.append(container_line)
+        await self.refresh_rules()
+        scenarios = self.evaluate_rules(containers)
+        self.poll_times['evaluated'] = time.time()
+        if self.capture_file:
+            self.capture_poll(timestamp, node_metrics, containers)
+
+        for container, scenario in zip(containers, scenarios):
+            await self.check_thresholds_and_alert(container, scenario)
+            self.metrics_batch.extend(self.container_lines(container, timestamp))
+
+        sample_data = {"timestamp": timestamp, "node": self.node_name}
+        if self.report_node_metrics and node_metrics:
+            sample_data["node_metrics"] = {
+                "cpu_percent": round(node_metrics['cpu_percent'], 2),
+                "memory_percent": round(node_metrics['memory_percent'], 2),
+                "network_rx_mbps": round(node_metrics['network_rx_mbps'], 3),
+                "network_tx_mbps": round(node_metrics['network_tx_mbps'], 3)
+            }
+        if self.report_service_summary and containers:
+            sample_data["services"] = self.service_summary(containers)
+        if self.forward_samples and containers:
+            sample_data["samples"] = [{
+                "container_id": c['container_id'],
+                "service_name": c.get('service_name', ''),
+                "cpu_percent": round(c['cpu_percent'], 2),
+                "memory_percent": round(c['memory_percent'], 2),
+                "network_percent": round(self.calculate_network_percent(c), 2)
+            } for c in containers]
+        if self.prepull_enabled and "node_metrics" in sample_data and (
+                self.image_cache.changed or time.time() - self.image_cache.updated >= self.image_inventory_interval):
+            try:
+                sample_data["images"] = await self.image_cache.refresh()
+            except Exception as e:
+                logger.error(f"Error listing local images: {e}")
+        if self.stream is not None and self.stream_summary and node_metrics:
+            self.stream.summary = {"timestamp": timestamp, "containers": len(containers),
+                                   "cpu_percent": round(node_metrics['cpu_percent'], 2),
+                                   "memory_percent": round(node_metrics['memory_percent'], 2)}
+        if len(sample_data) > 2:
+            response = await self.alert_sender.send_samples(sample_data)
+            if self.prepull_enabled and response and response.get('prepull'):
+                self.image_cache.request(response['prepull'])
 
         current_time = time.time()
         if len(self.metrics_batch) >= self.batch_size or (current_time - self.last_flush) >= self.flush_interval:
             await self.flush_metrics()
 
+    def container_lines(self, container: dict, timestamp: int) -> list:
+        fields = (f"cpu={container['cpu_percent']:.2f},"
+                  f"mem={container['memory_percent']:.2f},"
+                  f"mem_mb={container['memory_mb']:.2f},"
+                  f"net_in={container['network_rx_mbps']:.3f},"
+                  f"net_out={container['network_tx_mbps']:.3f}")
+        for key, field in (('latency_p50_ms', 'p50_ms'), ('latency_p95_ms', 'p95_ms'),
+                           ('request_rate', 'rps'), ('in_flight', 'inflight')):
+            if key in container:
+                fields += f",{field}={float(container[key])}"
+        lines = []
+        if self.influx_schema in ('container', 'both'):
+            lines.append(f"containers,node={self.node_name},"
+                         f"container={container['container_name']},"
+                         f"cid={container['container_id'][:12]} {fields} {timestamp}")
+        if self.influx_schema in ('task', 'both'):
+            lines.append(f"tasks,node={self.node_name},"
+                         f"service={container.get('service_name') or container['container_name']},"
+                         f"slot={container.get('task_slot', '0')} {fields},"
+                         f"cid=\"{container['container_id'][:12]}\",container=\"{container['container_name']}\" {timestamp}")
+        return lines
+
+    def service_summary(self, containers: list) -> dict:
+        """
+        {service: mean cpu/memory/network percent over its replicas on this
+        node, 'replicas'}, plus mean latency_p95_ms/in_flight over the
+        replicas that reported them this poll
+        """
+        services = {}
+        latency = {}
+        for c in containers:
+            if not c.get('service_name'):
+                continue
+            summary = services.setdefault(c['service_name'], {"cpu_percent": 0.0, "memory_percent": 0.0,
+                                                              "network_percent": 0.0, "replicas": 0})
+            summary["cpu_percent"] += c['cpu_percent']
+            summary["memory_percent"] += c['memory_percent']
+            summary["network_percent"] += self.calculate_network_percent(c)
+            summary["replicas"] += 1
+            for metric in ("latency_p95_ms", "in_flight"):
+                if metric in c:
+                    latency.setdefault((c['service_name'], metric), []).append(c[metric])
+        for summary in services.values():
+            for metric in ("cpu_percent", "memory_percent", "network_percent"):
+                summary[metric] = round(summary[metric] / summary["replicas"], 2)
+        for (service_name, metric), values in latency.items():
+            services[service_name][metric] = round(sum(values) / len(values), 2)
+        return services
+
+    def capture_poll(self, timestamp: int, node_metrics: dict, containers: list):
+        try:
+            record = {'timestamp': timestamp, 'node': self.node_name, 'node_metrics': node_metrics,
+                      'containers': [{k: c.get(k) for k in ('container_id', 'container_name', 'service_name', 'cpu_percent',
+                                                              'memory_percent', 'memory_mb', 'network_rx_mbps', 'network_tx_mbps',
+                                                              'latency_p95_ms', 'in_flight') if k in c}
+                                     for c in containers]}
+            with open(self.capture_file, 'a') as f:
+                f.write(json.dumps(record, separators=(',', ':')) + '\n')
+        except OSError as e:
+            logger.error(f"Capture write failed ({self.capture_file}): {e}")
+
     async def flush_metrics(self):
+        if self.tracer is not None:
+            spans = self.tracer.drain()
+            if spans and not await self.influxdb_writer.write_batch(spans, precision='ns'):
+                logger.error(f"Failed to flush {len(spans)} spans to InfluxDB")
         if not self.metrics_batch:
             return
         success = await self.influxdb_writer.write_batch(self.metrics_batch)
@@ -139,11 +348,14 @@ class MonitoringAgent:
     async def run(self):
         self.running = True
         logger.info(f"Starting monitoring agent on {self.node_name}")
+        if self.stream is not None:
+            self.stream.start()
 
         while self.running:
             try:
                 loop_start = time.time()
                 metrics = await self.metrics_collector.collect_metrics()
+                self.poll_times.update(started=loop_start, collected=time.time())
                 await self.process_metrics(metrics)
                 loop_duration = time.time() - loop_start
                 sleep_time = max(0, self.poll_interval - loop_duration)
@@ -157,6 +369,11 @@ class MonitoringAgent:
                 await asyncio.sleep(5)
 
         await self.flush_metrics()
+        await self.alert_sender.close()
+        if self.latency_scraper is not None:
+            await self.latency_scraper.close()
+        if self.tracer is not None:
+            self.tracer.close()
         logger.info("Monitoring agent stopped")
 
 
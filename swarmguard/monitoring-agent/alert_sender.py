@@ -3,25 +3,81 @@
 
 import logging
 import json
+import time
 import asyncio
 from typing import Dict
 import aiohttp
 
+from tracing import inject
+
 logger = logging.getLogger(__name__)
 
 
 class AlertSender:
-    def __init__(self, recovery_manager_url: str):
+    """
+    Alerts and samples go over the manager stream (stream_client.py) while it
+    is connected, and as HTTP POSTs otherwise. A streamed alert counts as
+    delivered once its ack says 200/202, or once it was sent and the ack is
+    still out after ack_timeout: without admission control the manager acks
+    only after handling the alert, which a migration stretches to tens of
+    seconds, and a resend would count the breach twice. The late ack is
+    handled like any other. An alert the stream could not send or that got
+    another status is POSTed instead. A traced alert carries its
+    trace context (traceparent/tracestate headers over HTTP, a 'trace' entry
+    in the streamed alert) and gets an agent.send span.
+    """
+
+    def __init__(self, recovery_manager_url: str, stream=None, tracer=None, ack_timeout: float = 1.0):
+        self.stream = stream
+        self.tracer = tracer
+        self.ack_timeout = ack_timeout
+        if stream is not None:
+            stream.on_ack = self.handle_alert_ack
         self.recovery_manager_url = f"{recovery_manager_url}/alert"
+        self.samples_url = f"{recovery_manager_url}/samples"
+        self.rules_url = f"{recovery_manager_url}/rules"
         self.headers = {"Content-Type": "application/json"}
         self.session = None
+        self.backoff_until = 0.0  # Set from a 429's Retry-After; alerts are not sent before it
         logger.info(f"Alert sender initialized: {recovery_manager_url}")
 
-    async def send_alert(self, alert_data: Dict) -> bool:
+    async def send_alert(self, alert_data: Dict, trace: Dict = None) -> bool:
+        start = time.time()
+        context = inject(trace, start) if trace is not None else None
+        delivered, transport = await self._send_alert(alert_data, context)
+        if trace is not None and self.tracer is not None:
+            self.tracer.record(trace, 'agent.send', start, time.time(), ok=delivered, transport=transport,
+                               container=alert_data['container_name'])
+        return delivered
+
+    async def _send_alert(self, alert_data: Dict, context: Dict = None):
+        """(delivered, transport)"""
+        if time.time() < self.backoff_until:
+            logger.debug(f"Recovery manager shedding load - alert for {alert_data['container_name']} held back")
+            return False, 'held_back'
         try:
+            if self.stream is not None and self.stream.connected:
+                streamed = dict(alert_data, trace=context) if context else alert_data
+                ack = await self.stream.request('alert', streamed, timeout=self.ack_timeout)
+                status = ack.get('status') if ack else None
+                if status in (200, 202):
+                    logger.info(f"Alert streamed: {alert_data['container_name']} - {alert_data['scenario']}")
+                    return True, 'stream'
+                if ack and ack.get('pending'):
+                    logger.info(f"Alert streamed: {alert_data['container_name']} - {alert_data['scenario']} "
+                                f"(no ack within {self.ack_timeout:g}s - the manager is still handling it)")
+                    return True, 'stream'
+                if status == 429:
+                    self.handle_alert_ack(ack)
+                    return False, 'stream'
+                logger.warning(f"Streamed alert for {alert_data['container_name']} "
+                               f"{'not acked' if ack is None else f'answered {status}'} - sending it over HTTP")
+
+            # The trace context rides in headers so the body stays within the 500 byte budget
             payload = json.dumps(alert_data, separators=(',', ':'))
             if len(payload) > 500:
                 logger.warning(f"Alert payload size {len(payload)} bytes exceeds 500 bytes")
+            headers = dict(self.headers, **context) if context else self.headers
 
             if self.session is None or self.session.closed:
                 timeout = aiohttp.ClientTimeout(total=1)
@@ -29,25 +85,85 @@ class AlertSender:
 
             for attempt in range(2):
                 try:
-                    async with self.session.post(self.recovery_manager_url, headers=self.headers, data=payload) as response:
-                        if response.status == 200:
+                    async with self.session.post(self.recovery_manager_url, headers=headers, data=payload) as response:
+                        if response.status in (200, 202):
                             logger.info(f"Alert sent: {alert_data['container_name']} - {alert_data['scenario']}")
-                            return True
+                            return True, 'http'
+                        elif response.status == 429:
+                            retry_after = float(response.headers.get('Retry-After', 1))
+                            self.backoff_until = time.time() + retry_after
+                            logger.warning(f"Recovery manager overloaded - backing off alerts for {retry_after:.0f}s")
+                            return False, 'http'
                         else:
                             error_text = await response.text()
                             logger.error(f"Recovery manager returned HTTP {response.status}: {error_text}")
-                            return False
+                            return False, 'http'
                 except aiohttp.ClientError as e:
                     if attempt < 1:
                         logger.warning(f"Alert send failed (attempt {attempt + 1}), retrying...")
                         await asyncio.sleep(0.1)
                     else:
                         logger.error(f"Alert send failed after 2 attempts: {e}")
-                        return False
+                        return False, 'http'
         except Exception as e:
             logger.error(f"Error sending alert: {e}")
-            return False
+            return False, 'error'
+
+    def handle_alert_ack(self, frame: Dict):
+        """Ack of a streamed alert (including late ones): same outcomes as the HTTP response"""
+        status = frame.get('status')
+        if status == 429:
+            retry_after = float(frame.get('retry_after', 1))
+            self.backoff_until = time.time() + retry_after
+            logger.warning(f"Recovery manager overloaded - backing off alerts for {retry_after:.0f}s")
+        elif status not in (200, 202):
+            logger.error(f"Recovery manager returned {status} for streamed alert: {frame.get('body')}")
+
+    async def send_samples(self, sample_data: Dict):
+        """
+        Best-effort forwarding of a poll's samples (no retry - the next poll
+        supersedes it). Returns the manager's response (e.g. images to
+        pre-pull) or None.
+        """
+        try:
+            if self.stream is not None and self.stream.connected:
+                ack = await self.stream.request('samples', sample_data, timeout=1)
+                return ack.get('body') if ack and ack.get('status') == 200 else None
+
+            payload = json.dumps(sample_data, separators=(',', ':'))
+
+            if self.session is None or self.session.closed:
+                timeout = aiohttp.ClientTimeout(total=1)
+                self.session = aiohttp.ClientSession(timeout=timeout)
+
+            async with self.session.post(self.samples_url, headers=self.headers, data=payload) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.debug(f"Recovery manager returned HTTP {response.status} for samples: {error_text}")
+                    return None
+                return await response.json()
+        except Exception as e:
+            logger.debug(f"Error sending samples: {e}")
+            return None
+
+    async def fetch_rules(self):
+        """Shared rule definitions served by the recovery manager, or None if unavailable"""
+        try:
+            if self.session is None or self.session.closed:
+                timeout = aiohttp.ClientTimeout(total=1)
+                self.session = aiohttp.ClientSession(timeout=timeout)
+
+            async with self.session.get(self.rules_url) as response:
+                if response.status != 200:
+                    logger.warning(f"Recovery manager returned HTTP {response.status} for rules")
+                    return None
+                return await response.json()
+        except Exception as e:
+            logger.warning(f"Error fetching rules: {e}")
+            return None
 
     async def close(self):
+        if self.stream is not None:
+            await self.stream.close()
         if self.session and not self.session.closed:
             await self.session.close()
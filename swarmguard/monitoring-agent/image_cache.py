@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Image Cache - Local image inventory and background pre-pulls requested by the recovery manager"""
+
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def pull_reference(image: str) -> str:
+    """Swarm pins service images as 'repo:tag@sha256:..'; pull by 'repo@sha256:..' (the digest is what runs)"""
+    name, _, digest = image.partition('@')
+    if not digest:
+        return image
+    slash, colon = name.rfind('/'), name.rfind(':')
+    return f"{name[:colon] if colon > slash else name}@{digest}"
+
+
+class ImageCache:
+    """
+    Reports which images this node holds (tags and digests) and pulls the
+    images the recovery manager asks for, one at a time by default, off the
+    event loop. pull_fn replaces the Docker pull (fake registry / tests).
+    """
+
+    def __init__(self, docker_client, max_concurrent_pulls: int = 1, pull_fn=None):
+        self.docker_client = docker_client
+        self.pull_fn = pull_fn or self.docker_pull
+        self.semaphore = asyncio.Semaphore(max(1, max_concurrent_pulls))
+        self.images = []
+        self.updated = 0.0
+        self.changed = False  # a pull finished since the last inventory was reported
+        self.in_flight = set()
+        self.tasks = set()
+        self.pulled = 0
+        self.failed = 0
+
+    def docker_pull(self, reference: str):
+        self.docker_client.images.pull(reference)
+
+    def list_images(self) -> list:
+        references = set()
+        for image in self.docker_client.images.list():
+            for reference in (image.attrs.get('RepoTags') or []) + (image.attrs.get('RepoDigests') or []):
+                if reference and not reference.startswith('<none>'):
+                    references.add(reference)
+        return sorted(references)
+
+    async def refresh(self) -> list:
+        self.images = await asyncio.to_thread(self.list_images)
+        self.updated = time.time()
+        self.changed = False
+        return self.images
+
+    def request(self, images: list):
+        """Start background pulls for requested images not already being pulled"""
+        for image in images:
+            if image in self.in_flight:
+                continue
+            self.in_flight.add(image)
+            task = asyncio.create_task(self.pull(image))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def pull(self, image: str):
+        reference = pull_reference(image)
+        try:
+            async with self.semaphore:
+                start = time.time()
+                await asyncio.to_thread(self.pull_fn, reference)
+                logger.info(f"Pre-pulled {reference} in {time.time() - start:.1f}s")
+                self.pulled += 1
+                self.changed = True
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Pre-pull of {reference} failed: {e}")
+        finally:
+            self.in_flight.discard(image)
@@ -4,6 +4,7 @@
 import logging
 from typing import List
 import aiohttp
+from yarl import URL
 
 logger = logging.getLogger(__name__)
 
@@ -15,15 +16,17 @@ class InfluxDBWriter:
         self.headers = {"Authorization": f"Token {token}", "Content-Type": "text/plain; charset=utf-8"}
         logger.info(f"InfluxDB writer initialized: {influxdb_url}")
 
-    async def write_batch(self, lines: List[str]) -> bool:
+    async def write_batch(self, lines: List[str], precision: str = None) -> bool:
+        """precision overrides the URL's (e.g. 'ns' for lines with nanosecond timestamps)"""
         if not lines:
             return True
 
         payload = "\n".join(lines)
         try:
+            url = str(URL(self.influxdb_url).update_query(precision=precision)) if precision else self.influxdb_url
             timeout = aiohttp.ClientTimeout(total=2)
             async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(self.influxdb_url, headers=self.headers, data=payload) as response:
+                async with session.post(url, headers=self.headers, data=payload) as response:
                     if response.status == 204:
                         return True
                     else:
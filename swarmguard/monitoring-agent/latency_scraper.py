@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Latency Scraper - Request latency and concurrency of local tasks that export GET /latency (web-stress latency.py)"""
+
+import asyncio
+import logging
+from fnmatch import fnmatchcase
+from typing import Dict
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+PORT_LABEL = 'swarmguard.latency.port'
+PATH_LABEL = 'swarmguard.latency.path'
+# Comma-separated route patterns ('GET /compute/pi', 'GET /stress/*') selecting
+# the routes whose requests make up the latency percentiles
+ROUTES_LABEL = 'swarmguard.latency.routes'
+EXCLUDE_ROUTES_LABEL = 'swarmguard.latency.exclude_routes'
+
+
+def route_patterns(value) -> tuple:
+    return tuple(p.strip() for p in (value or '').split(',') if p.strip())
+
+
+def route_selected(route: str, include: tuple = (), exclude: tuple = ()) -> bool:
+    if include and not any(fnmatchcase(route, p) for p in include):
+        return False
+    return not any(fnmatchcase(route, p) for p in exclude)
+
+
+def histogram_quantile(q: float, bounds: list, counts: list):
+    """
+    q-quantile (ms) of a bucketed histogram, interpolated linearly inside the
+    bucket it falls in; the open last bucket reports its lower bound. None
+    without observations.
+    """
+    total = sum(counts)
+    if total <= 0:
+        return None
+    rank = q * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= rank:
+            if index >= len(bounds):
+                return float(bounds[-1])
+            lower = bounds[index - 1] if index else 0.0
+            return lower + (bounds[index] - lower) * (rank - seen) / count
+        seen += count
+    return float(bounds[-1])
+
+
+class LatencyScraper:
+    """
+    Scrapes the cumulative counters of every local container labelled with
+    swarmguard.latency.port, on its overlay IP, and turns the difference to
+    the previous scrape into the poll's values: latency_p50_ms/latency_p95_ms
+    over the requests that finished (left out if none did), request_rate (req/s)
+    and in_flight (mean concurrency, all routes). The percentiles and the rate
+    cover the routes selected by the container's swarmguard.latency.routes and
+    swarmguard.latency.exclude_routes labels (exclude_routes defaults to the
+    agent's exclude_routes), so bulk transfers do not swamp an SLO route. The
+    first scrape of a container, or one after its counters reset, only sets
+    the baseline.
+    """
+
+    def __init__(self, network: str = None, timeout: float = 1.0, exclude_routes: tuple = ()):
+        self.network = network
+        self.timeout = timeout
+        self.exclude_routes = tuple(exclude_routes)
+        self.previous = {}  # container_id -> last snapshot
+        self.session = None
+        self.failures = 0
+
+    def target(self, container):
+        labels = container.labels or {}
+        port = labels.get(PORT_LABEL)
+        if not port:
+            return None
+        networks = (container.attrs.get('NetworkSettings') or {}).get('Networks') or {}
+        addresses = [(name, n.get('IPAddress')) for name, n in networks.items() if n.get('IPAddress')]
+        preferred = [ip for name, ip in addresses if name == self.network]
+        ip = preferred[0] if preferred else (addresses[0][1] if addresses else None)
+        if ip is None:
+            return None
+        return f"http://{ip}:{port}{labels.get(PATH_LABEL, '/latency')}"
+
+    async def fetch(self, url: str):
+        try:
+            async with self.session.get(url) as response:
+                if response.status == 200:
+                    return await response.json()
+                logger.debug(f"Latency scrape {url} returned HTTP {response.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.debug(f"Latency scrape {url} failed: {e}")
+        self.failures += 1
+        return None
+
+    def route_filter(self, container):
+        """(include, exclude) route patterns for a container"""
+        labels = container.labels or {}
+        if EXCLUDE_ROUTES_LABEL in labels:
+            exclude = route_patterns(labels[EXCLUDE_ROUTES_LABEL])
+        else:
+            exclude = self.exclude_routes
+        return route_patterns(labels.get(ROUTES_LABEL)), exclude
+
+    async def scrape(self, containers: list) -> Dict:
+        """{container_id: {'latency_p50_ms', 'latency_p95_ms', 'request_rate', 'in_flight'}} for this poll"""
+        targets = {c.id: url for c in containers if (url := self.target(c))}
+        filters = {c.id: self.route_filter(c) for c in containers if c.id in targets}
+        for container_id in [k for k in self.previous if k not in targets]:
+            del self.previous[container_id]
+        if not targets:
+            return {}
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        snapshots = await asyncio.gather(*(self.fetch(url) for url in targets.values()))
+        results = {}
+        for container_id, snapshot in zip(targets, snapshots):
+            if snapshot is None:
+                continue
+            window = self.window(self.previous.get(container_id), snapshot, *filters[container_id])
+            self.previous[container_id] = snapshot
+            if window is not None:
+                results[container_id] = window
+        return results
+
+    @staticmethod
+    def window(previous: dict, current: dict, include: tuple = (), exclude: tuple = ()):
+        if previous is None or previous.get('started') != current.get('started') \
+                or previous.get('buckets_ms') != current.get('buckets_ms'):
+            return None
+        elapsed = current['clock'] - previous['clock']
+        if elapsed <= 0:
+            return None
+        bounds = current['buckets_ms']
+        counts = [0] * (len(bounds) + 1)
+        before = previous.get('routes', {})
+        for route, stats in current.get('routes', {}).items():
+            if not route_selected(route, include, exclude):
+                continue
+            old = before.get(route, {}).get('counts') or [0] * len(counts)
+            for index, (now, then) in enumerate(zip(stats['counts'], old)):
+                counts[index] += now - then
+        if any(c < 0 for c in counts):
+            return None
+        window = {'request_rate': round(sum(counts) / elapsed, 2),
+                  'in_flight': round(max(current['in_flight_seconds'] - previous['in_flight_seconds'], 0.0) / elapsed, 2)}
+        if sum(counts):
+            window['latency_p50_ms'] = round(histogram_quantile(0.5, bounds, counts), 1)
+            window['latency_p95_ms'] = round(histogram_quantile(0.95, bounds, counts), 1)
+        return window
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
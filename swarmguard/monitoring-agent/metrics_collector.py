@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-"""Metrics Collector - Collects CPU, memory, network from Docker"""
+"""Metrics Collector - Collects CPU, memory, network from Docker (and request latency where tasks export it)"""
 
 import os
 import time
@@ -12,10 +12,18 @@ import psutil
 logger = logging.getLogger(__name__)
 
 
+def task_slot(task_name: str, service_name: str) -> str:
+    """Slot of a Swarm task named '<service>.<slot>.<task id>' (node ID for global services), '0' outside Swarm"""
+    if not task_name or not task_name.startswith(f"{service_name}."):
+        return '0'
+    return task_name[len(service_name) + 1:].rsplit('.', 1)[0] or '0'
+
+
 class MetricsCollector:
-    def __init__(self, node_name: str, net_iface: str):
+    def __init__(self, node_name: str, net_iface: str, latency_scraper=None):
         self.node_name = node_name
         self.net_iface = net_iface
+        self.latency_scraper = latency_scraper
         self.docker_client = docker.DockerClient(base_url='unix://var/run/docker.sock')
         self.prev_net_stats = {}
         self.prev_timestamp = time.time()
@@ -26,6 +34,7 @@ class MetricsCollector:
         time_delta = current_time - self.prev_timestamp
         node_metrics = self.get_node_metrics(time_delta)
         container_metrics = []
+        containers = []
 
         try:
             # Run blocking Docker API call in thread to avoid blocking event loop
@@ -41,6 +50,14 @@ class MetricsCollector:
         except Exception as e:
             logger.error(f"Error listing containers: {e}")
 
+        if self.latency_scraper is not None and container_metrics:
+            try:
+                latency = await self.latency_scraper.scrape(containers)
+                for metrics in container_metrics:
+                    metrics.update(latency.get(metrics['container_id'], {}))
+            except Exception as e:
+                logger.error(f"Error scraping request latency: {e}")
+
         self.prev_timestamp = current_time
         return {"node": node_metrics, "containers": container_metrics, "timestamp": int(current_time)}
 
@@ -100,6 +117,7 @@ class MetricsCollector:
             container_id = container.id
             container_name = container.name
             service_name = container.labels.get('com.docker.swarm.service.name', container_name)
+            slot = task_slot(container.labels.get('com.docker.swarm.task.name', container_name), service_name)
 
             cpu_percent = self.calculate_cpu_percent(stats)
             memory_stats = self.calculate_memory_usage(stats)
@@ -107,6 +125,7 @@ class MetricsCollector:
 
             return {
                 "container_id": container_id, "container_name": container_name, "service_name": service_name,
+                "task_slot": slot,
                 "cpu_percent": cpu_percent, "memory_mb": memory_stats['usage_mb'],
                 "memory_percent": memory_stats['usage_percent'],
                 "network_rx_mbps": network_stats['rx_mbps'], "network_tx_mbps": network_stats['tx_mbps']
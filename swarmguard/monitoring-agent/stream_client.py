@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Stream Client - Persistent WebSocket to the recovery manager carrying msgpack frames"""
+
+import time
+import random
+import asyncio
+import logging
+import itertools
+
+import aiohttp
+import msgpack
+
+logger = logging.getLogger(__name__)
+
+
+class StreamClient:
+    """
+    One long-lived WebSocket to the manager's /stream: a hello frame, then
+    alert, samples and heartbeat frames as {'t': type, 'id': seq, 'body'}
+    (see the manager's agent_stream.py). Replies are ack frames matched by id;
+    acks nobody awaits go to on_ack. Reconnects with jittered exponential
+    backoff; while disconnected send() returns False so callers fall back
+    to HTTP.
+    """
+
+    def __init__(self, recovery_manager_url: str, node: str, heartbeat_interval: float = 5.0,
+                 backoff_max: float = 30.0, on_ack=None):
+        self.url = recovery_manager_url.replace('http://', 'ws://', 1).replace('https://', 'wss://', 1) + '/stream'
+        self.node = node
+        self.heartbeat_interval = heartbeat_interval
+        self.backoff_max = backoff_max
+        self.on_ack = on_ack or (lambda frame: None)
+        self.summary = None  # optional metric summary sent with heartbeats
+        self.ws = None
+        self.session = None
+        self.ids = itertools.count(1)
+        self.pending = {}  # frame id -> Future awaiting its ack
+        self.running = False
+        self.task = None
+        self.connects = 0
+        self.sent = 0
+
+    @property
+    def connected(self) -> bool:
+        return self.ws is not None and not self.ws.closed
+
+    def start(self):
+        self.running = True
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        failures = 0
+        while self.running:
+            connected_at = time.time()
+            try:
+                await self.connect_and_serve()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                (logger.warning if failures == 0 else logger.debug)(f"Manager stream unavailable: {e}")
+            finally:
+                self.ws = None
+                for future in self.pending.values():
+                    if not future.done():
+                        future.set_result(None)
+                self.pending.clear()
+            if not self.running:
+                break
+            # A connection that held for a while resets the backoff
+            failures = 0 if time.time() - connected_at > self.backoff_max else failures + 1
+            delay = min(self.backoff_max, 0.5 * 2 ** min(failures, 10)) * random.uniform(0.5, 1.0)
+            logger.info(f"Reconnecting manager stream in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def connect_and_serve(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        # heartbeat= adds WebSocket pings, so a dead manager is noticed even while no frames flow
+        async with self.session.ws_connect(self.url, heartbeat=self.heartbeat_interval * 2, max_msg_size=0) as ws:
+            self.ws = ws
+            self.connects += 1
+            await self._send('hello', {'node': self.node, 'heartbeat_interval': self.heartbeat_interval})
+            logger.info(f"Manager stream connected: {self.url}")
+            heartbeats = asyncio.create_task(self.heartbeat_loop())
+            try:
+                async for message in ws:
+                    if message.type == aiohttp.WSMsgType.BINARY:
+                        self.handle(msgpack.unpackb(message.data, raw=False))
+                    elif message.type == aiohttp.WSMsgType.ERROR:
+                        break
+            finally:
+                heartbeats.cancel()
+        logger.warning("Manager stream closed")
+
+    async def heartbeat_loop(self):
+        while self.connected:
+            body = {'summary': self.summary} if self.summary is not None else {}
+            await self._send('heartbeat', body)
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def handle(self, frame: dict):
+        if frame.get('t') != 'ack':
+            return
+        future = self.pending.pop(frame.get('id'), None)
+        if future is not None and not future.done():
+            future.set_result(frame)
+        else:
+            self.on_ack(frame)
+
+    async def _send(self, kind: str, body, frame_id: int = None):
+        await self.ws.send_bytes(msgpack.packb({'t': kind, 'id': frame_id or next(self.ids), 'body': body},
+                                               use_bin_type=True))
+        self.sent += 1
+
+    async def send(self, kind: str, body) -> bool:
+        """Fire-and-forget frame (its ack goes to on_ack); False if the stream is down"""
+        if not self.connected:
+            return False
+        try:
+            await self._send(kind, body)
+            return True
+        except (aiohttp.ClientError, ConnectionError, RuntimeError) as e:
+            logger.debug(f"Stream send failed: {e}")
+            return False
+
+    async def request(self, kind: str, body, timeout: float = 1.0):
+        """
+        Send a frame and wait for its ack frame. None if it could not be sent
+        or the stream dropped before the ack; {'status': None, 'pending': True}
+        if it was sent but not answered within timeout (the ack then goes to
+        on_ack when it comes).
+        """
+        if not self.connected:
+            return None
+        frame_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[frame_id] = future
+        try:
+            await self._send(kind, body, frame_id)
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return {'t': 'ack', 'id': frame_id, 'status': None, 'pending': True}
+        except (aiohttp.ClientError, ConnectionError, RuntimeError):
+            return None
+        finally:
+            self.pending.pop(frame_id, None)
+
+    async def close(self):
+        self.running = False
+        if self.task:
+            self.task.cancel()
+        if self.ws is not None and not self.ws.closed:
+            await self.ws.close()
+        if self.session and not self.session.closed:
+            await self.session.close()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the agent's modules the way agent.py does: from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
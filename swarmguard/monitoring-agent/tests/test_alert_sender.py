@@ -0,0 +1,49 @@
+import asyncio
+
+from alert_sender import AlertSender
+
+ALERT = {'container_name': 'web.1', 'container_id': 'c1', 'scenario': 'scenario1_migration'}
+
+
+class FakeStream:
+    connected = True
+
+    def __init__(self, ack):
+        self.ack = ack
+        self.frames = []
+        self.on_ack = None
+
+    async def request(self, kind: str, body, timeout: float = 1.0):
+        self.frames.append((kind, body))
+        return self.ack
+
+
+def send(ack) -> tuple:
+    """(delivered, transport, stream) for one alert; the HTTP fallback targets a closed port and fails"""
+    stream = FakeStream(ack)
+    sender = AlertSender('http://127.0.0.1:9', stream)
+
+    async def scenario():
+        try:
+            return await sender._send_alert(ALERT)
+        finally:
+            if sender.session is not None:
+                await sender.session.close()
+
+    return (*asyncio.run(scenario()), stream)
+
+
+def test_acked_alert_is_delivered():
+    assert send({'status': 202})[:2] == (True, 'stream')
+
+
+def test_alert_still_being_handled_is_not_resent():
+    # Sent, but the manager has not answered within ack_timeout (it acks after a long migration)
+    delivered, transport, stream = send({'status': None, 'pending': True})
+    assert (delivered, transport) == (True, 'stream')
+    assert len(stream.frames) == 1
+
+
+def test_unsent_alert_falls_back_to_http():
+    delivered, transport, _ = send(None)
+    assert (delivered, transport) == (False, 'http')
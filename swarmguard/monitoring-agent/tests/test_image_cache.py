@@ -0,0 +1,44 @@
+import asyncio
+import threading
+import time
+
+from image_cache import ImageCache, pull_reference
+
+
+def test_pull_reference_pulls_pinned_images_by_digest():
+    assert pull_reference('registry.local:5000/web:1.2@sha256:abc') == 'registry.local:5000/web@sha256:abc'
+    assert pull_reference('registry.local:5000/web@sha256:abc') == 'registry.local:5000/web@sha256:abc'
+    assert pull_reference('web:1.2') == 'web:1.2'
+
+
+def test_request_pulls_each_image_once_and_one_at_a_time():
+    pulls = []
+    active = []
+    lock = threading.Lock()
+
+    def fake_pull(reference: str):
+        with lock:
+            active.append(reference)
+            assert len(active) == 1
+        time.sleep(0.02)
+        if reference == 'broken:1':
+            with lock:
+                active.remove(reference)
+            raise RuntimeError('manifest unknown')
+        with lock:
+            active.remove(reference)
+            pulls.append(reference)
+
+    async def scenario():
+        cache = ImageCache(None, pull_fn=fake_pull)
+        cache.request(['web:1.2@sha256:abc', 'broken:1'])
+        # Already in flight: not pulled twice
+        cache.request(['web:1.2@sha256:abc'])
+        assert cache.in_flight == {'web:1.2@sha256:abc', 'broken:1'}
+        await asyncio.gather(*cache.tasks)
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert pulls == ['web@sha256:abc']
+    assert (cache.pulled, cache.failed) == (1, 1)
+    assert cache.in_flight == set() and cache.changed
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+from latency_scraper import EXCLUDE_ROUTES_LABEL, ROUTES_LABEL, LatencyScraper, route_patterns
+
+BOUNDS = [10, 100, 1000]
+
+
+def snapshot(clock: float, routes: dict) -> dict:
+    return {'started': 1.0, 'clock': clock, 'buckets_ms': BOUNDS, 'in_flight': 0, 'in_flight_seconds': clock,
+            'routes': {route: {'counts': counts} for route, counts in routes.items()}}
+
+
+PREVIOUS = snapshot(0.0, {})
+# 100 fast requests to /compute/pi, 20 slow downloads
+CURRENT = snapshot(10.0, {'GET /compute/pi': [100, 0, 0, 0], 'GET /download/data': [0, 0, 0, 20]})
+
+
+def test_every_route_counts_by_default():
+    window = LatencyScraper.window(PREVIOUS, CURRENT)
+    assert window['request_rate'] == 12.0
+    assert window['latency_p95_ms'] == 1000.0
+
+
+def test_excluded_routes_leave_the_percentiles():
+    window = LatencyScraper.window(PREVIOUS, CURRENT, exclude=('GET /download/*',))
+    assert window['request_rate'] == 10.0
+    assert window['latency_p95_ms'] == 9.5
+    assert window['in_flight'] == 1.0
+    assert LatencyScraper.window(PREVIOUS, CURRENT, include=('GET /compute/pi',)) == window
+
+
+def test_container_labels_override_the_agent_default():
+    scraper = LatencyScraper(exclude_routes=route_patterns('GET /download/data, GET /stress/*'))
+    plain = SimpleNamespace(labels={})
+    assert scraper.route_filter(plain) == ((), ('GET /download/data', 'GET /stress/*'))
+    labelled = SimpleNamespace(labels={ROUTES_LABEL: 'GET /compute/pi', EXCLUDE_ROUTES_LABEL: ''})
+    assert scraper.route_filter(labelled) == (('GET /compute/pi',), ())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tracing - Starts an alert's trace at the breaching sample and records the agent's spans
+
+The span encodings (OTLP/JSON lines, InfluxDB 'spans' points) are the ones
+written by the recovery manager's tracing.py - keep the two in sync.
+"""
+
+import os
+import json
+import uuid
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+SCOPE = 'swarmguard'
+STATUS_OK, STATUS_ERROR = 1, 2
+
+
+def inject(trace: dict, sent_at: float) -> dict:
+    """
+    W3C trace context for the alert: traceparent names the trace's root span,
+    tracestate carries when the sample was taken and the alert sent (ms)
+    """
+    return {'traceparent': f"00-{trace['trace_id']}-{trace['root_id']}-01",
+            'tracestate': f"{SCOPE}=sampled:{int(trace['sampled'] * 1000)};sent:{int(sent_at * 1000)}"}
+
+
+def otlp_attributes(attributes: dict) -> list:
+    encoded = []
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            encoded.append({'key': key, 'value': {'boolValue': value}})
+        elif isinstance(value, int):
+            encoded.append({'key': key, 'value': {'intValue': str(value)}})
+        elif isinstance(value, float):
+            encoded.append({'key': key, 'value': {'doubleValue': value}})
+        else:
+            encoded.append({'key': key, 'value': {'stringValue': str(value)}})
+    return encoded
+
+
+def otlp_line(service_name: str, spans: list) -> str:
+    """One OTLP/JSON ExportTraceServiceRequest (as read by the collector's otlpjsonfile receiver)"""
+    return json.dumps({'resourceSpans': [{
+        'resource': {'attributes': otlp_attributes({'service.name': service_name})},
+        'scopeSpans': [{'scope': {'name': SCOPE}, 'spans': [{
+            'traceId': span['trace_id'], 'spanId': span['span_id'], 'parentSpanId': span['parent_id'] or '',
+            'name': span['name'], 'kind': 1,
+            'startTimeUnixNano': str(int(span['start'] * 1e9)), 'endTimeUnixNano': str(int(span['end'] * 1e9)),
+            'attributes': otlp_attributes(span['attributes']),
+            'status': {'code': STATUS_OK if span['ok'] else STATUS_ERROR}} for span in spans]}]}]},
+        separators=(',', ':'))
+
+
+def influx_line(span: dict, source: str) -> str:
+    """'spans' point: bounded tags (source, name), ids and attributes as fields, ns timestamp = span start"""
+    fields = {'trace_id': span['trace_id'], 'span_id': span['span_id'], 'parent_id': span['parent_id'] or '',
+              'duration_ms': round((span['end'] - span['start']) * 1000, 3), 'ok': span['ok']}
+    fields.update((k.replace('.', '_'), v) for k, v in span['attributes'].items() if v is not None)
+    encoded = []
+    for key, value in fields.items():
+        if isinstance(value, bool):
+            encoded.append(f"{key}={'true' if value else 'false'}")
+        elif isinstance(value, (int, float)):
+            encoded.append(f"{key}={float(value)}")
+        else:
+            encoded.append(f"{key}=\"{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}\"")
+    return f"spans,source={source},name={span['name']} {','.join(encoded)} {int(span['start'] * 1e9)}"
+
+
+class SpanRecorder:
+    """
+    new_trace() picks the trace ID and root span ID for an alert when its
+    sample breaches a rule; the manager closes the root span once it has
+    acted. record() appends a child span to the local JSONL file (if path)
+    and queues it as an InfluxDB point for the agent's next flush.
+    """
+
+    def __init__(self, node: str, path: str = None, max_buffer: int = 1000,
+                 service_name: str = 'swarmguard-monitoring-agent'):
+        self.node = node
+        self.service_name = service_name
+        self.path = path
+        self.file = self._open() if path else None
+        self.pending = deque(maxlen=max_buffer)
+        self.spans_recorded = 0
+
+    def _open(self):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            f = open(self.path, 'a', buffering=1)
+            logger.info(f"Trace spans: {self.path}")
+            return f
+        except OSError as e:
+            logger.error(f"Cannot open span file {self.path}: {e} - spans go to InfluxDB only")
+            return None
+
+    def new_trace(self, sampled_at: float) -> dict:
+        return {'trace_id': uuid.uuid4().hex, 'root_id': os.urandom(8).hex(), 'sampled': sampled_at}
+
+    def record(self, trace: dict, name: str, start: float, end: float, ok: bool = True, **attributes):
+        span = {'trace_id': trace['trace_id'], 'span_id': os.urandom(8).hex(), 'parent_id': trace['root_id'],
+                'name': name, 'start': start, 'end': max(end, start), 'ok': ok,
+                'attributes': dict(attributes, node=self.node)}
+        self.spans_recorded += 1
+        if self.file is not None:
+            try:
+                self.file.write(otlp_line(self.service_name, [span]) + '\n')
+            except OSError as e:
+                logger.error(f"Span write failed: {e}")
+        self.pending.append(influx_line(span, 'agent'))
+
+    def drain(self) -> list:
+        """InfluxDB lines of the spans recorded since the last call"""
+        lines = list(self.pending)
+        self.pending.clear()
+        return lines
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Admission Control - Rate limits, queues and sheds alerts before they reach the decision path"""
+
+import math
+import time
+import heapq
+import logging
+from collections import Counter
+from threading import Lock, Condition, Thread, current_thread
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_FIRST_BREACH = 0
+PRIORITY_REPEAT = 1
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """0 if a token was taken, else seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+class AdmissionController:
+    """
+    Alerts pass a per-node token bucket, then wait in a bounded priority queue
+    drained by a fixed pool of decision workers (instead of one request thread
+    each piling up on the manager lock). First-breach alerts outrank repeats
+    for a service that is already queued, being handled or cooling down; when
+    the queue is full a first breach displaces the newest repeat. Rejected
+    alerts get 429 with a Retry-After hint. A config reload applies 'enabled'
+    and 'workers' through apply_settings: the pool starts, grows, shrinks (idle
+    workers retire) or stops once the alerts already queued are handled.
+    """
+
+    def __init__(self, config, handler, is_repeat, metrics=None):
+        self.config = config
+        self.handler = handler
+        self.is_repeat = is_repeat
+        self.metrics = metrics
+        self.lock = Lock()
+        self.not_empty = Condition(self.lock)
+        self.queue = []  # (priority, seq, enqueued_at, service, alert)
+        self.seq = 0
+        self.buckets = {}
+        self.pending = Counter()  # service -> alerts queued or in flight
+        self.in_flight = 0
+        self.handled = 0
+        self.handle_seconds = 0.0
+        self.admitted = Counter()
+        self.shed = Counter()
+        self.running = False
+        self.draining = False  # stopped, but workers finish the queue first
+        self.workers = []
+        self.started_workers = 0
+        self.load_settings()
+
+    def load_settings(self):
+        settings = self.config.get('alert_admission', {}) or {}
+        self.enabled = settings.get('enabled', False)
+        self.rate = float(settings.get('per_node_rate', 5))
+        self.burst = float(settings.get('per_node_burst', 20))
+        self.max_queue = int(settings.get('max_queue', 200))
+        self.worker_count = int(settings.get('workers', 8))
+        with self.lock:
+            for bucket in self.buckets.values():
+                bucket.rate, bucket.burst = self.rate, self.burst
+
+    def _retry_after(self) -> int:
+        """Seconds until the queue has likely drained enough to take another alert"""
+        average = self.handle_seconds / self.handled if self.handled else 1.0
+        return max(1, math.ceil(len(self.queue) * average / max(self.worker_count, 1)))
+
+    def _shed(self, reason: str):
+        self.shed[reason] += 1
+        if self.metrics:
+            self.metrics.observe_shed(reason)
+
+    def submit(self, alert_data: dict) -> dict:
+        """{'accepted': bool, 'status', 'priority'/'reason', 'retry_after'?, 'queue_depth'}"""
+        service = alert_data.get('service_name', alert_data.get('container_name'))
+        node = alert_data.get('node') or 'unknown'
+        with self.lock:
+            bucket = self.buckets.get(node)
+            if bucket is None:
+                bucket = self.buckets[node] = TokenBucket(self.rate, self.burst)
+            wait = bucket.take()
+            if wait > 0:
+                self._shed('rate_limited')
+                return {'accepted': False, 'status': 'rejected', 'reason': 'rate_limited',
+                        'retry_after': max(1, math.ceil(wait)), 'queue_depth': len(self.queue)}
+
+            repeat = self.pending[service] > 0 or self.is_repeat(alert_data)
+            priority = PRIORITY_REPEAT if repeat else PRIORITY_FIRST_BREACH
+
+            if len(self.queue) >= self.max_queue:
+                newest_repeat = max((e for e in self.queue if e[0] == PRIORITY_REPEAT), key=lambda e: e[1], default=None)
+                if priority == PRIORITY_REPEAT or newest_repeat is None:
+                    self._shed('queue_full')
+                    return {'accepted': False, 'status': 'rejected', 'reason': 'queue_full',
+                            'retry_after': self._retry_after(), 'queue_depth': len(self.queue)}
+                self.queue.remove(newest_repeat)
+                heapq.heapify(self.queue)
+                self.pending[newest_repeat[3]] -= 1
+                if self.pending[newest_repeat[3]] <= 0:
+                    del self.pending[newest_repeat[3]]
+                self._shed('displaced')
+
+            self.seq += 1
+            heapq.heappush(self.queue, (priority, self.seq, time.time(), service, alert_data))
+            self.pending[service] += 1
+            self.admitted['repeat' if repeat else 'first_breach'] += 1
+            if self.metrics:
+                self.metrics.observe_admitted('repeat' if repeat else 'first_breach', len(self.queue))
+            self.not_empty.notify()
+            return {'accepted': True, 'status': 'queued', 'priority': 'repeat' if repeat else 'first_breach',
+                    'queue_depth': len(self.queue)}
+
+    def worker_loop(self):
+        while True:
+            with self.lock:
+                while self.running and not self.queue and len(self.workers) <= self.worker_count:
+                    self.not_empty.wait()
+                retire = len(self.workers) > self.worker_count
+                if retire or not (self.running or (self.draining and self.queue)):
+                    self.workers.remove(current_thread())
+                    return
+                priority, _, enqueued_at, service, alert_data = heapq.heappop(self.queue)
+                self.in_flight += 1
+                if self.metrics:
+                    self.metrics.observe_queue(len(self.queue), time.time() - enqueued_at)
+            start = time.time()
+            try:
+                self.handler(alert_data)
+            except Exception as e:
+                logger.error(f"Error handling queued alert for {service}: {e}", exc_info=True)
+            finally:
+                with self.lock:
+                    self.in_flight -= 1
+                    self.pending[service] -= 1
+                    if self.pending[service] <= 0:
+                        del self.pending[service]
+                    self.handled += 1
+                    self.handle_seconds += time.time() - start
+
+    def start(self):
+        with self.lock:
+            self.running = True
+            self.draining = False
+            self._spawn_workers()
+        logger.info(f"Alert admission: {self.worker_count} workers, queue {self.max_queue}, "
+                    f"{self.rate}/s per node (burst {self.burst})")
+
+    def _spawn_workers(self):
+        """Start workers up to worker_count, or wake idle ones so the surplus retires (caller holds the lock)"""
+        for _ in range(self.worker_count - len(self.workers)):
+            worker = Thread(target=self.worker_loop, daemon=True, name=f"alert-worker-{self.started_workers}")
+            self.started_workers += 1
+            self.workers.append(worker)
+            worker.start()
+        self.not_empty.notify_all()
+
+    def apply_settings(self):
+        """Start, resize or stop the worker pool after load_settings changed 'enabled' or 'workers'"""
+        if self.enabled and not self.running:
+            self.start()
+        elif not self.enabled and self.running:
+            logger.info(f"Alert admission disabled - {len(self.queue)} queued alerts are still handled")
+            self.stop(drain=True)
+        elif self.running:
+            with self.lock:
+                if len(self.workers) != self.worker_count:
+                    logger.info(f"Alert admission: {len(self.workers)} → {self.worker_count} workers")
+                self._spawn_workers()
+
+    def stop(self, drain: bool = False):
+        """Stop the workers; with drain they first handle what is queued (and stop is not waited for)"""
+        with self.lock:
+            self.running = False
+            self.draining = drain
+            self.not_empty.notify_all()
+            workers = list(self.workers)
+        if not drain:
+            for worker in workers:
+                worker.join(timeout=5)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'enabled': self.enabled, 'queue_depth': len(self.queue), 'max_queue': self.max_queue,
+                    'in_flight': self.in_flight, 'workers': len(self.workers), 'handled': self.handled,
+                    'admitted': dict(self.admitted), 'shed': dict(self.shed)}
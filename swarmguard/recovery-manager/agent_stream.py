@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Agent Stream - Long-lived WebSocket per monitoring agent carrying msgpack frames, and agent liveness"""
+
+import time
+import logging
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+import msgpack
+from simple_websocket import ConnectionClosed
+
+logger = logging.getLogger(__name__)
+
+
+def pack(frame: dict) -> bytes:
+    return msgpack.packb(frame, use_bin_type=True)
+
+
+def unpack(data) -> dict:
+    if isinstance(data, str):
+        data = data.encode()
+    return msgpack.unpackb(data, raw=False)
+
+
+class AgentStreams:
+    """
+    Each agent opens one WebSocket to /stream and sends binary msgpack frames
+    {'t': type, 'id': seq, 'body': ...}:
+
+      hello      {'node', 'heartbeat_interval'} - first frame
+      heartbeat  {'summary'?}                   - every heartbeat_interval
+      alert      alert payload (as POSTed to /alert)
+      samples    sample payload (as POSTed to /samples)
+
+    alert and samples frames are dispatched on worker pools - alerts on their
+    own, since handling one can run a whole migration - so a slow recovery
+    holds up neither the agent's other frames nor sample ingestion. Each is
+    answered with
+    {'t': 'ack', 'id', 'status', 'body', 'retry_after'?} - the HTTP status and
+    JSON body the POST would have returned. Any frame (or a POST to /samples)
+    refreshes the agent's liveness; a connection silent for heartbeat_timeout
+    is closed and its agent reported as not alive.
+    """
+
+    def __init__(self, handlers: dict, heartbeat_timeout: float = 15.0, dispatch_workers: int = 8,
+                 alert_workers: int = 8):
+        self.handlers = handlers  # frame type -> fn(body) -> (body, status, headers)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.executor = ThreadPoolExecutor(max_workers=dispatch_workers, thread_name_prefix='agent-stream')
+        self.alert_executor = ThreadPoolExecutor(max_workers=alert_workers, thread_name_prefix='agent-stream-alert')
+        self.lock = Lock()
+        self.agents = {}  # node -> liveness and counters
+        self.frames = {}  # frame type -> count
+
+    def touch(self, node: str, transport: str, summary: dict = None):
+        if not node:
+            return
+        with self.lock:
+            agent = self.agents.setdefault(node, {'connected': False, 'connections': 0, 'frames': 0,
+                                                  'heartbeat_interval': None, 'summary': None})
+            agent['last_seen'] = time.time()
+            agent['transport'] = transport
+            if summary is not None:
+                agent['summary'] = summary
+
+    def serve(self, ws, remote: str = None):
+        """Run one agent connection until it closes or goes silent (called from the WebSocket route)"""
+        node = None
+        send_lock = Lock()
+        try:
+            hello = ws.receive(timeout=self.heartbeat_timeout)
+            if hello is None:
+                return
+            frame = unpack(hello)
+            node = (frame.get('body') or {}).get('node')
+            if frame.get('t') != 'hello' or not node:
+                logger.warning(f"Agent stream from {remote} did not start with hello - closing")
+                node = None
+                return
+            self.touch(node, 'stream')
+            with self.lock:
+                agent = self.agents[node]
+                agent.update(connected=True, stream=id(ws), remote=remote, connected_at=time.time(),
+                             heartbeat_interval=frame['body'].get('heartbeat_interval'))
+                agent['connections'] += 1
+            logger.info(f"Agent {node} connected via stream from {remote}")
+
+            while True:
+                data = ws.receive(timeout=self.heartbeat_timeout)
+                if data is None:
+                    logger.warning(f"Agent {node} silent for {self.heartbeat_timeout:.0f}s - closing its stream")
+                    return
+                frame = unpack(data)
+                kind = frame.get('t')
+                body = frame.get('body') or {}
+                self.touch(node, 'stream', body.get('summary') if kind == 'heartbeat' else None)
+                with self.lock:
+                    self.agents[node]['frames'] += 1
+                    self.frames[kind] = self.frames.get(kind, 0) + 1
+                if kind == 'heartbeat':
+                    continue
+                handler = self.handlers.get(kind)
+                if handler is None:
+                    self._reply(ws, send_lock, frame, {'status': 'error', 'message': f'Unknown frame type {kind}'}, 400, {})
+                    continue
+                executor = self.alert_executor if kind == 'alert' else self.executor
+                executor.submit(self._dispatch, ws, send_lock, handler, frame)
+        except ConnectionClosed:
+            pass
+        except Exception as e:
+            logger.error(f"Agent stream error ({node or remote}): {e}")
+        finally:
+            if node:
+                with self.lock:
+                    # A reconnected agent's new stream may already have replaced this one
+                    if self.agents[node].get('stream') == id(ws):
+                        self.agents[node]['connected'] = False
+                logger.info(f"Agent {node} stream closed")
+
+    def _dispatch(self, ws, send_lock, handler, frame: dict):
+        try:
+            body, status, headers = handler(frame.get('body'))
+        except Exception as e:
+            logger.error(f"Error handling {frame.get('t')} frame: {e}")
+            body, status, headers = {'status': 'error', 'message': str(e)}, 500, {}
+        self._reply(ws, send_lock, frame, body, status, headers)
+
+    def _reply(self, ws, send_lock, frame: dict, body: dict, status: int, headers: dict):
+        reply = {'t': 'ack', 'id': frame.get('id'), 'status': status, 'body': body}
+        if 'Retry-After' in (headers or {}):
+            reply['retry_after'] = float(headers['Retry-After'])
+        try:
+            with send_lock:
+                ws.send(pack(reply))
+        except ConnectionClosed:
+            logger.debug(f"Stream closed before ack {frame.get('id')} could be sent")
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.alert_executor.shutdown(wait=False, cancel_futures=True)
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        with self.lock:
+            return {node: {'alive': now - agent['last_seen'] <= self.heartbeat_timeout,
+                           'connected': agent['connected'], 'transport': agent['transport'],
+                           'last_seen_seconds': round(now - agent['last_seen'], 1),
+                           'connections': agent['connections'], 'frames': agent['frames'],
+                           'summary': agent['summary']}
+                    for node, agent in self.agents.items()}
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self.lock:
+            return {'agents': len(self.agents),
+                    'alive': sum(1 for a in self.agents.values() if now - a['last_seen'] <= self.heartbeat_timeout),
+                    'streams': sum(1 for a in self.agents.values() if a['connected']),
+                    'frames': dict(self.frames)}
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Alert Coalescer - Merges per-replica alerts for one service into a single decision input"""
+
+import time
+import logging
+from collections import Counter
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+# Tie-break when a window holds equally many alerts of different scenarios:
+# service-wide load (scale up) first, then a per-node problem (migration)
+SCENARIO_PRIORITY = ('scenario2_scale_up', 'scenario2_scaling', 'scenario1_migration', 'scenario2_scale_down')
+
+
+class AlertBatch:
+    def __init__(self, service_name: str):
+        self.service_name = service_name
+        self.opened = time.time()
+        self.alerts = []
+
+
+class AlertCoalescer:
+    """
+    The first alert for a service opens a short window; alerts for the same
+    service arriving inside it join that batch instead of being evaluated on
+    their own. The thread that opened the window makes one decision for the
+    merged batch when it closes - it blocks for the window, so with admission
+    control on it holds a decision worker that long.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = Lock()
+        self.batches = {}  # service_name -> open AlertBatch
+        self.merged_alerts = 0
+        self.load_settings()
+
+    def load_settings(self):
+        settings = self.config.get('alert_coalescing', {}) or {}
+        self.enabled = settings.get('enabled', False)
+        self.window = float(settings.get('window_seconds', 0.5))
+
+    def submit(self, service_name: str, alert_data: dict):
+        """(batch, opened) - opened is True when this alert started the window and must close it"""
+        with self.lock:
+            batch = self.batches.get(service_name)
+            opened = batch is None
+            if opened:
+                batch = self.batches[service_name] = AlertBatch(service_name)
+            else:
+                self.merged_alerts += 1
+            batch.alerts.append(alert_data)
+            return batch, opened
+
+    def wait_and_close(self, batch: AlertBatch) -> list:
+        """Sleep out the rest of the window, then close it and return its alerts"""
+        remaining = batch.opened + self.window - time.time()
+        if remaining > 0:
+            time.sleep(remaining)
+        with self.lock:
+            if self.batches.get(batch.service_name) is batch:
+                del self.batches[batch.service_name]
+            return list(batch.alerts)
+
+    @staticmethod
+    def merge(alerts: list) -> dict:
+        """
+        One alert standing for the whole batch: metrics are the mean across the
+        alerting replicas (metrics_max keeps the peaks), the scenario is the
+        most common one, and node/container come from the hottest replica of
+        that scenario so a migration moves the worst task.
+        """
+        if len(alerts) == 1:
+            return alerts[0]
+
+        counts = Counter(a.get('scenario') for a in alerts)
+        top = max(counts.values())
+        tied = [s for s, c in counts.items() if c == top]
+        scenario = min(tied, key=lambda s: SCENARIO_PRIORITY.index(s) if s in SCENARIO_PRIORITY else len(SCENARIO_PRIORITY))
+
+        keys = {k for a in alerts for k, v in (a.get('metrics') or {}).items() if isinstance(v, (int, float))}
+        mean, peak = {}, {}
+        for key in keys:
+            values = [a['metrics'][key] for a in alerts if isinstance((a.get('metrics') or {}).get(key), (int, float))]
+            mean[key] = sum(values) / len(values)
+            peak[key] = max(values)
+
+        candidates = [a for a in alerts if a.get('scenario') == scenario]
+        hottest = max(candidates, key=lambda a: (a.get('metrics') or {}).get('cpu_percent', 0) +
+                                                (a.get('metrics') or {}).get('memory_percent', 0))
+
+        merged = dict(hottest)
+        merged.update({
+            'scenario': scenario,
+            'metrics': mean,
+            'metrics_max': peak,
+            'nodes': sorted({a.get('node') for a in alerts if a.get('node')}),
+            'container_ids': sorted({a.get('container_id') for a in alerts if a.get('container_id')}),
+            'scenarios': dict(counts),
+            'coalesced': len(alerts),
+        })
+        return merged
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'enabled': self.enabled, 'window_seconds': self.window, 'open_windows': len(self.batches),
+                    'merged_alerts': self.merged_alerts}
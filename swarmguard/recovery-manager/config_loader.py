@@ -1,16 +1,63 @@
 #!/usr/bin/env python3
 """Configuration Loader - Loads YAML configuration"""
 
+import os
+import time
+import hashlib
 import yaml
 import logging
+import threading
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
 
+class ConfigSnapshot:
+    """Immutable view of one loaded configuration version"""
+
+    def __init__(self, config: dict, version: int, checksum: str = None, mtime: float = None):
+        self.config = config
+        self.version = version
+        self.checksum = checksum
+        self.mtime = mtime
+        self.loaded_at = time.time()
+
+    def get(self, key: str, default=None):
+        keys = key.split('.')
+        value = self.config
+        for k in keys:
+            if isinstance(value, dict) and k in value:
+                value = value[k]
+            else:
+                return default
+        return value
+
+    def info(self) -> dict:
+        return {'version': self.version, 'checksum': self.checksum, 'loaded_at': self.loaded_at}
+
+
 class ConfigLoader:
-    def __init__(self, config_path: str):
+    """
+    Holds the active ConfigSnapshot. A reload swaps the snapshot reference in
+    one assignment; code running inside pinned() keeps reading the snapshot
+    that was active when it started. validate(snapshot) raises on a candidate
+    that must not become active (the recovery manager compiles its rules).
+    """
+
+    def __init__(self, config_path: str, validate=None):
         self.config_path = config_path
-        self.config = self.load_config()
+        self.validate = validate
+        self._local = threading.local()
+        self.current = ConfigSnapshot(self.load_config(), 1, *self._file_identity())
+        self.seen_mtime = self.current.mtime  # Last file version read, even if it was rejected
+
+    @property
+    def config(self) -> dict:
+        return self.snapshot().config
+
+    @property
+    def version(self) -> int:
+        return self.current.version
 
     def load_config(self) -> dict:
         try:
@@ -25,16 +72,59 @@ class ConfigLoader:
             logger.error(f"Error parsing YAML: {e}")
             return {}
 
+    def _file_identity(self):
+        """(checksum, mtime) of the config file, or (None, None) if unreadable"""
+        try:
+            with open(self.config_path, 'rb') as f:
+                checksum = hashlib.sha256(f.read()).hexdigest()[:12]
+            return checksum, os.path.getmtime(self.config_path)
+        except OSError:
+            return None, None
+
+    def read_snapshot(self) -> ConfigSnapshot:
+        """Parse the config file into a candidate snapshot (raises on any error, nothing is swapped)"""
+        with open(self.config_path, 'rb') as f:
+            raw = f.read()
+        mtime = os.path.getmtime(self.config_path)
+        self.seen_mtime = mtime
+        config = yaml.safe_load(raw)
+        if not isinstance(config, dict):
+            raise ValueError("Configuration must be a YAML mapping")
+        return ConfigSnapshot(config, self.current.version + 1, hashlib.sha256(raw).hexdigest()[:12], mtime)
+
+    def changed_on_disk(self) -> bool:
+        try:
+            return os.path.getmtime(self.config_path) != self.seen_mtime
+        except OSError:
+            return False
+
+    def swap(self, snapshot: ConfigSnapshot):
+        self.current = snapshot
+        logger.info(f"Configuration version {snapshot.version} active ({snapshot.checksum})")
+
+    def snapshot(self) -> ConfigSnapshot:
+        return getattr(self._local, 'snapshot', None) or self.current
+
+    @contextmanager
+    def pinned(self):
+        """Pin the current snapshot for this thread (nested pins keep the outer one)"""
+        if getattr(self._local, 'snapshot', None) is not None:
+            yield self._local.snapshot
+            return
+        self._local.snapshot = self.current
+        try:
+            yield self._local.snapshot
+        finally:
+            self._local.snapshot = None
+
     def get(self, key: str, default=None):
-        keys = key.split('.')
-        value = self.config
-        for k in keys:
-            if isinstance(value, dict) and k in value:
-                value = value[k]
-            else:
-                return default
-        return value
+        return self.snapshot().get(key, default)
 
-    def reload(self):
-        self.config = self.load_config()
+    def reload(self) -> ConfigSnapshot:
+        """Read, validate and swap in the config file (raises, keeping the active snapshot, if it is invalid)"""
+        candidate = self.read_snapshot()
+        if self.validate is not None:
+            self.validate(candidate)
+        self.swap(candidate)
         logger.info("Configuration reloaded")
+        return candidate
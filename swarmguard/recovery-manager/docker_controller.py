@@ -5,16 +5,49 @@ import logging
 import time
 import docker
 import os
+import requests
+from threading import Lock
+
+import tracing
 
 logger = logging.getLogger(__name__)
 
+# Migrations place tasks with a rotating per-service node label instead of
+# editing hostname constraints, so each migration is exactly one rollout.
+# The service label holds the current generation; nodes eligible for the
+# service carry 'swarmguard.placement.<service>.<gen>=true'. The constraint
+# stays on the service (removing it would be a second rollout), so every
+# schedulable node must keep carrying the current generation: nodes that join
+# later are labelled by reconcile_placement_labels (placement_sync.py), which
+# also drops the labels of older generations and removed services.
+PLACEMENT_GEN_LABEL = 'swarmguard.placement.gen'
+PLACEMENT_LABEL_PREFIX = 'swarmguard.placement'
+
+# Service labels overriding the readiness probe per service ('swarmguard.readiness=false' disables it)
+READINESS_LABEL = 'swarmguard.readiness'
+
+# Service label 'swarmguard.warm_pool=<K>': K replicas are kept booted in standby (see warm_pool.py)
+WARM_POOL_LABEL = 'swarmguard.warm_pool'
+
 
 class DockerController:
     def __init__(self, config):
         self.config = config
-        socket_path = config.get('docker.socket_path', 'unix:///var/run/docker.sock')
-        self.client = docker.DockerClient(base_url=socket_path)
-        logger.info("Docker client initialized")
+        self.socket_path = config.get('docker.socket_path', 'unix:///var/run/docker.sock')
+        self._client = None
+        # Node specs are versioned; concurrent label edits (parallel migrations) would conflict
+        self.node_label_lock = Lock()
+        self.migrating = set()  # services whose placement labels a migration is changing
+
+    @property
+    def client(self):
+        # Connect on first use: DockerClient negotiates the API version when
+        # constructed, which would stop the manager (or a shard worker) from
+        # starting while the daemon is briefly unavailable
+        if self._client is None:
+            self._client = docker.DockerClient(base_url=self.socket_path)
+            logger.info("Docker client initialized")
+        return self._client
 
     def get_service_node(self, service_name: str) -> str:
         """Get the current node where the service's task is running"""
@@ -37,7 +70,212 @@ class DockerController:
             logger.error(f"Error getting service node: {e}")
             return None
 
-    def migrate_container(self, service_name: str, from_node: str) -> dict:
+    def get_service_image(self, service_name: str):
+        """Image reference the service's tasks run (TaskTemplate.ContainerSpec.Image), or None"""
+        try:
+            service = self.client.services.get(service_name)
+            return service.attrs['Spec']['TaskTemplate']['ContainerSpec'].get('Image')
+        except Exception as e:
+            logger.error(f"Error getting image for {service_name}: {e}")
+            return None
+
+    def get_schedulable_nodes(self) -> list:
+        """Hostnames of nodes that are ready and accept new tasks"""
+        try:
+            hostnames = []
+            for node in self.client.nodes.list():
+                attrs = node.attrs
+                if attrs.get('Status', {}).get('State') != 'ready':
+                    continue
+                if attrs.get('Spec', {}).get('Availability') != 'active':
+                    continue
+                hostnames.append(attrs['Description']['Hostname'])
+            return hostnames
+        except Exception as e:
+            logger.error(f"Error listing nodes: {e}")
+            return []
+
+    def _placement_label_key(self, service_name: str, gen: int) -> str:
+        return f'{PLACEMENT_LABEL_PREFIX}.{service_name}.{gen}'
+
+    def _update_node_labels(self, hostnames: list, add: dict = None, remove_prefix: str = None, keep: set = ()):
+        """Add labels to the given nodes and/or drop labels starting with remove_prefix (except keep)"""
+        with self.node_label_lock:
+            for node in self.client.nodes.list():
+                hostname = node.attrs['Description']['Hostname']
+                if hostname not in hostnames:
+                    continue
+                node_spec = node.attrs['Spec']
+                node_labels = dict(node_spec.get('Labels') or {})
+                updated = dict(node_labels)
+                if remove_prefix:
+                    updated = {k: v for k, v in updated.items() if not k.startswith(remove_prefix) or k in keep}
+                if add:
+                    updated.update(add)
+                if updated != node_labels:
+                    node_spec['Labels'] = updated
+                    with tracing.span('docker.node_update', node=hostname):
+                        node.update(node_spec)
+
+    def sync_placement_labels(self, service_name: str, gen: int = None, keep_previous: bool = True):
+        """
+        Label every schedulable node with the service's current placement
+        generation and drop older generations. keep_previous keeps the
+        previous one too, for tasks of that generation still draining.
+        """
+        try:
+            if gen is None:
+                service = self.client.services.get(service_name)
+                gen = int((service.attrs['Spec'].get('Labels') or {}).get(PLACEMENT_GEN_LABEL, 0))
+            if not gen:
+                return
+            keep = {self._placement_label_key(service_name, gen)}
+            if keep_previous:
+                keep.add(self._placement_label_key(service_name, gen - 1))
+            self._update_node_labels(self.get_schedulable_nodes(),
+                                     add={self._placement_label_key(service_name, gen): 'true'},
+                                     remove_prefix=f'{PLACEMENT_LABEL_PREFIX}.{service_name}.', keep=keep)
+        except Exception as e:
+            logger.error(f"Error syncing placement labels for {service_name}: {e}")
+
+    def reconcile_placement_labels(self, owns=None) -> int:
+        """
+        Give every schedulable node the current placement generation of each
+        service that has one and drop placement labels of older generations and
+        of services that no longer exist. Services being migrated are left
+        alone. owns limits it to this shard's services. Returns nodes updated.
+        """
+        owns = owns or (lambda service_name: True)
+        generations = {}
+        for service in self.client.services.list():
+            spec = service.attrs.get('Spec', {})
+            gen = int((spec.get('Labels') or {}).get(PLACEMENT_GEN_LABEL, 0))
+            if gen:
+                generations[spec.get('Name', service.name)] = gen
+        prefix = f'{PLACEMENT_LABEL_PREFIX}.'
+        updated_nodes = 0
+        with self.node_label_lock:
+            skip = set(self.migrating)
+            for node in self.client.nodes.list():
+                attrs = node.attrs
+                schedulable = (attrs.get('Status', {}).get('State') == 'ready'
+                               and attrs.get('Spec', {}).get('Availability') == 'active')
+                node_spec = attrs['Spec']
+                node_labels = dict(node_spec.get('Labels') or {})
+                updated = {}
+                for key, value in node_labels.items():
+                    service_name, _, gen = key[len(prefix):].rpartition('.')
+                    if (key.startswith(prefix) and gen.isdigit() and owns(service_name) and service_name not in skip
+                            and int(gen) != generations.get(service_name)):
+                        continue
+                    updated[key] = value
+                if schedulable:
+                    for service_name, gen in generations.items():
+                        if owns(service_name) and service_name not in skip:
+                            updated[self._placement_label_key(service_name, gen)] = 'true'
+                if updated != node_labels:
+                    node_spec['Labels'] = updated
+                    with tracing.span('docker.node_update', node=attrs['Description']['Hostname']):
+                        node.update(node_spec)
+                    updated_nodes += 1
+        return updated_nodes
+
+    def node_events(self, since: float, until: float) -> list:
+        """Swarm node events (create, update, remove) between since and until"""
+        return list(self.client.events(since=since, until=until, filters={'type': 'node'}, decode=True))
+
+    def readiness_settings(self, spec: dict) -> dict:
+        """Migration readiness probe settings for a service (config defaults, overridden by service labels)"""
+        migration = self.config.get('scenarios.scenario1_migration.migration', {}) or {}
+        labels = spec.get('Labels') or {}
+        return {
+            'enabled': migration.get('wait_for_health', True) and labels.get(READINESS_LABEL, 'true').lower() != 'false',
+            'port': int(labels.get(f'{READINESS_LABEL}.port', migration.get('probe_port', 8080))),
+            'path': labels.get(f'{READINESS_LABEL}.path', migration.get('probe_path', '/health')),
+            'interval': float(migration.get('probe_interval', 0.25)),
+            'successes': int(migration.get('probe_successes', 3)),
+            'timeout': float(migration.get('health_timeout', 10)),
+            'request_timeout': float(migration.get('probe_request_timeout', 1.0)),
+            'poll_interval': float(migration.get('poll_interval', 0.5)),
+            'rollout_timeout': float(migration.get('rollout_timeout', 40)),
+            'tighten_healthcheck': migration.get('tighten_healthcheck', True),
+        }
+
+    def task_address(self, task: dict):
+        """The task's IP on the SwarmGuard overlay network (any non-ingress network as a fallback)"""
+        network_name = self.config.get('docker.swarm_network', 'swarmguard-net')
+        fallback = None
+        for attachment in task.get('NetworksAttachments') or []:
+            name = attachment.get('Network', {}).get('Spec', {}).get('Name')
+            addresses = attachment.get('Addresses') or []
+            if not addresses or name == 'ingress':
+                continue
+            address = addresses[0].split('/')[0]
+            if name == network_name:
+                return address
+            fallback = fallback or address
+        return fallback
+
+    def probe(self, url: str, timeout: float) -> bool:
+        try:
+            return requests.get(url, timeout=timeout).status_code < 400
+        except requests.RequestException:
+            return False
+
+    def warm_pool_size(self, spec: dict) -> int:
+        """Standby replicas kept for a service (0 when it has no warm pool or the pool is disabled)"""
+        if not self.config.get('warm_pool.enabled', False):
+            return 0
+        try:
+            return max(int((spec.get('Labels') or {}).get(WARM_POOL_LABEL, 0)), 0)
+        except ValueError:
+            return 0
+
+    def get_warm_pool_services(self) -> dict:
+        """{service_name: standby replicas} for services labelled with a warm pool"""
+        try:
+            pools = {}
+            for service in self.client.services.list():
+                size = self.warm_pool_size(service.attrs.get('Spec', {}))
+                if size:
+                    pools[service.name] = size
+            return pools
+        except Exception as e:
+            logger.error(f"Error listing warm pool services: {e}")
+            return {}
+
+    def get_service_tasks(self, service_name: str) -> list:
+        """Tasks Swarm wants running: [{'id', 'state', 'address', 'created'}]"""
+        try:
+            service = self.client.services.get(service_name)
+            return [{'id': task.get('ID'), 'state': task.get('Status', {}).get('State'),
+                     'address': self.task_address(task), 'created': task.get('CreatedAt', '')}
+                    for task in service.tasks(filters={'desired-state': 'running'})]
+        except Exception as e:
+            logger.error(f"Error getting tasks for {service_name}: {e}")
+            return []
+
+    def standby_state(self, address: str):
+        """True if the task at address is a standby, False if it serves, None if it did not answer"""
+        port = self.config.get('warm_pool.port', 8080)
+        try:
+            response = requests.get(f"http://{address}:{port}/standby",
+                                    timeout=self.config.get('warm_pool.request_timeout', 1.0))
+            return bool(response.json().get('standby')) if response.ok else None
+        except (requests.RequestException, ValueError):
+            return None
+
+    def promote_standby(self, address: str) -> bool:
+        """Take a standby task into service; Swarm adds it to the load balancer at its next healthy check"""
+        port = self.config.get('warm_pool.port', 8080)
+        try:
+            with tracing.span('standby.promote', address=address):
+                return requests.post(f"http://{address}:{port}/standby/promote",
+                                     timeout=self.config.get('warm_pool.request_timeout', 1.0)).ok
+        except requests.RequestException:
+            return False
+
+    def migrate_container(self, service_name: str, from_node: str, target_node: str = None) -> dict:
         start_time = time.time()
         try:
             service = self.client.services.get(service_name)
@@ -56,6 +294,7 @@ class DockerController:
             tasks = service.tasks(filters={'desired-state': 'running'})
 
             old_task_id = None
+            old_slot = None
             for task in tasks:
                 task_state = task.get('Status', {}).get('State')
                 if task_state == 'running':
@@ -65,6 +304,7 @@ class DockerController:
                         hostname = node.attrs['Description']['Hostname']
                         if hostname == from_node:
                             old_task_id = task.get('ID')
+                            old_slot = task.get('Slot')
                             logger.info(f"Found old task {old_task_id[:12]} on {from_node}")
                             break
 
@@ -79,9 +319,48 @@ class DockerController:
             current_constraints = placement.get('Constraints', [])
             current_image = spec['TaskTemplate']['ContainerSpec']['Image']
 
-            # Remove any previous migration constraints, keep only base constraints
-            base_constraints = [c for c in current_constraints if 'node.hostname!=' not in c]
-            new_constraints = base_constraints + [f'node.hostname!={from_node}']
+            # Label the eligible nodes with a NEW generation key and point the
+            # constraint at it in the same update that forces the rollout.
+            # Only new keys are added here: changing a label that a running
+            # task's constraint depends on makes Swarm's constraint enforcer
+            # kill that task immediately, which would break start-first.
+            labels = dict(spec.get('Labels') or {})
+            gen = int(labels.get(PLACEMENT_GEN_LABEL, 0)) + 1
+            placement_key = self._placement_label_key(service_name, gen)
+            # The forced update recreates every replica, so a target is only pinned for a
+            # single-replica service; otherwise pinning would stack all replicas on it and
+            # Swarm spreads them over every node but the source instead
+            if target_node and current_replicas <= 1:
+                eligible_nodes = [target_node]
+            else:
+                eligible_nodes = [n for n in self.get_schedulable_nodes() if n != from_node]
+                if target_node:
+                    logger.info(f"{service_name} has {current_replicas} replicas - {target_node} is preferred, "
+                                f"not pinned; eligible: {eligible_nodes}")
+                    target_node = None
+            if not eligible_nodes:
+                logger.warning(f"No eligible nodes to migrate {service_name} to")
+                return {'success': False, 'error': 'No eligible target nodes'}
+            with self.node_label_lock:
+                self.migrating.add(service_name)
+            self._update_node_labels(eligible_nodes, add={placement_key: 'true'})
+            labels[PLACEMENT_GEN_LABEL] = str(gen)
+
+            # Drop older migration constraints (legacy node.hostname!= and previous generations)
+            base_constraints = [c for c in current_constraints
+                                if 'node.hostname!=' not in c
+                                and not c.startswith(f'node.labels.{PLACEMENT_LABEL_PREFIX}.{service_name}.')]
+            new_constraints = base_constraints + [f'node.labels.{placement_key}==true']
+
+            # Wall-clock time each recovery phase was reached (journal / MTTR breakdown)
+            phases = {}
+
+            # Task IDs before the update, to verify the migration recreates each task once
+            tasks_before = {t.get('ID') for t in service.tasks()}
+
+            def is_replacement(task: dict) -> bool:
+                """A task this update created in the old task's slot (not another replica or its replacement)"""
+                return task.get('ID') not in tasks_before and (old_slot is None or task.get('Slot') == old_slot)
 
             logger.info(f"Step 2: Triggering rolling update with START-FIRST order")
             logger.info(f"Constraints: {current_constraints} → {new_constraints}")
@@ -91,6 +370,19 @@ class DockerController:
                 task_template['Placement'] = {}
             task_template['Placement']['Constraints'] = new_constraints
 
+            # With start-first, Swarm stops the old task once the new one is healthy. Run the
+            # service's own healthcheck at the probe interval during the start period (Docker 25+
+            # StartInterval; older engines ignore it) so that happens as soon as it serves, instead
+            # of one full health interval later. Unchanged outside the start period.
+            readiness = self.readiness_settings(spec)
+            healthcheck = task_template.get('ContainerSpec', {}).get('Healthcheck')
+            if readiness['tighten_healthcheck'] and healthcheck and (healthcheck.get('Test') or ['NONE'])[0] != 'NONE':
+                healthcheck['StartInterval'] = int(readiness['interval'] * 1e9)
+                healthcheck['StartPeriod'] = max(healthcheck.get('StartPeriod', 0), int(readiness['timeout'] * 1e9))
+            elif readiness['enabled']:
+                logger.warning(f"{service_name} has no healthcheck - Swarm stops the old task when the new one starts, "
+                               f"before the readiness probe passes")
+
             # Configure update policy: START-FIRST order + immediate updates
             update_config = {
                 'Parallelism': 1,  # Update 1 task at a time
@@ -107,76 +399,131 @@ class DockerController:
 
             try:
                 version = service.version
-                self.client.api.update_service(
-                    service.id,
-                    version=version,
-                    task_template=task_template,
-                    mode=spec.get('Mode'),
-                    name=spec.get('Name'),
-                    labels=spec.get('Labels', {}),
-                    networks=spec.get('Networks'),
-                    endpoint_spec=spec.get('EndpointSpec'),
-                    update_config=update_config
-                )
+                with tracing.span('docker.update_service', service=service_name, action='migration'):
+                    self.client.api.update_service(
+                        service.id,
+                        version=version,
+                        task_template=task_template,
+                        mode=spec.get('Mode'),
+                        name=spec.get('Name'),
+                        labels=labels,
+                        networks=spec.get('Networks'),
+                        endpoint_spec=spec.get('EndpointSpec'),
+                        update_config=update_config
+                    )
+                phases['update_issued'] = time.time()
                 logger.info(f"Step 3: Rolling update with START-FIRST initiated - new task will start before old stops")
             except Exception as e:
                 logger.error(f"Failed to trigger rolling update: {e}")
                 return {'success': False, 'error': f'Update failed: {str(e)}'}
 
             # Step 4: Wait for rolling update to complete with START-FIRST
-            # We should see: old task running → both running → new task only
+            # We should see: old task running → both running → new task only.
+            # Meanwhile the new task is probed directly on its overlay IP; the
+            # migration is complete once it passed N probes in a row and the
+            # old task is gone.
             wait_start = time.time()
-            wait_timeout = 40  # Max 40s for rolling update
+            wait_timeout = readiness['rollout_timeout']
             migration_complete = False
             seen_both_tasks = False
-
-            logger.info(f"Step 4: Monitoring START-FIRST rolling update (timeout {wait_timeout}s)")
+            swarm_done = False
+            probe = {'enabled': readiness['enabled'], 'url': None, 'attempts': 0, 'consecutive': 0, 'ready': False}
+            probe_started = None
+            new_address = None
+            # Warm pool services boot every task in standby: the new task only turns
+            # healthy (and replaces the old one) once it is promoted
+            standby = {'pending': self.warm_pool_size(spec) > 0, 'promoted': False}
+            next_poll = 0.0
+
+            logger.info(f"Step 4: Monitoring START-FIRST rolling update (timeout {wait_timeout:.0f}s, "
+                        f"readiness probe {'on' if probe['enabled'] else 'off'})")
 
             while (time.time() - wait_start) < wait_timeout:
-                time.sleep(2)
-                service.reload()
-                tasks = service.tasks(filters={'desired-state': 'running'})
-
-                running_tasks = []
-                task_nodes = {}
-                old_task_running = False
-                new_task_running = False
-
-                for task in tasks:
-                    task_state = task.get('Status', {}).get('State')
-                    task_id = task.get('ID')
-                    if task_state == 'running':
+                if time.time() >= next_poll and not swarm_done:
+                    next_poll = time.time() + readiness['poll_interval']
+                    service.reload()
+                    tasks = service.tasks(filters={'desired-state': 'running'})
+
+                    running_tasks = []
+                    old_task_running = False
+                    new_task_running = False
+                    replacement_node = None
+
+                    for task in tasks:
+                        task_state = task.get('Status', {}).get('State')
+                        task_id = task.get('ID')
                         node_id = task.get('NodeID')
-                        if node_id:
-                            node = self.client.nodes.get(node_id)
-                            hostname = node.attrs['Description']['Hostname']
-                            task_nodes[task_id] = hostname
-                            running_tasks.append((task_id, hostname))
-
-                            if task_id == old_task_id:
-                                old_task_running = True
-                            elif hostname != from_node:
-                                new_task_running = True
-
-                logger.info(f"Running tasks: {[(tid[:12], node) for tid, node in running_tasks]} (old={old_task_running}, new={new_task_running})")
-
-                # Track if we see both tasks running (zero downtime proof)
-                if old_task_running and new_task_running:
-                    if not seen_both_tasks:
-                        logger.info(f"✅ ZERO DOWNTIME: Both old and new tasks running simultaneously")
-                        seen_both_tasks = True
-
-                # Check if migration is complete: exactly 1 task on different node
-                if len(running_tasks) == 1 and not old_task_running:
-                    task_id, node = running_tasks[0]
-                    if node != from_node:
-                        logger.info(f"✅ Rolling update complete: New task {task_id[:12]} on {node}")
-                        migration_complete = True
-                        break
+                        if task_state not in ('starting', 'running') or not node_id:
+                            continue
+                        node = self.client.nodes.get(node_id)
+                        hostname = node.attrs['Description']['Hostname']
+                        if is_replacement(task) and hostname != from_node and not new_address:
+                            # Probe from 'starting': the overlay address is assigned before Swarm reports running
+                            new_address = self.task_address(task)
+                            if new_address and probe['enabled']:
+                                probe['url'] = f"http://{new_address}:{readiness['port']}{readiness['path']}"
+                                probe_started = time.time()
+                                logger.info(f"Probing new task {task_id[:12]} at {probe['url']}")
+                        if task_state != 'running':
+                            continue
+                        running_tasks.append((task_id, hostname))
+                        if task_id == old_task_id:
+                            old_task_running = True
+                        elif is_replacement(task) and hostname != from_node:
+                            new_task_running = True
+                            replacement_node = hostname
+
+                    logger.info(f"Running tasks: {[(tid[:12], node) for tid, node in running_tasks]} (old={old_task_running}, new={new_task_running})")
+                    if new_task_running:
+                        phases.setdefault('new_task_running', time.time())
+
+                    # Track if we see both tasks running (zero downtime proof)
+                    if old_task_running and new_task_running:
+                        if not seen_both_tasks:
+                            logger.info(f"✅ ZERO DOWNTIME: Both old and new tasks running simultaneously")
+                            seen_both_tasks = True
+
+                    # Swarm side is complete: the old task is gone, its replacement runs on a
+                    # different node and every replica was recreated by this update
+                    if new_task_running and not old_task_running and len(running_tasks) >= current_replicas \
+                            and all(task_id not in tasks_before for task_id, _ in running_tasks):
+                        logger.info(f"✅ Rolling update complete: replacement task on {replacement_node}")
+                        phases['old_task_gone'] = time.time()
+                        phases.setdefault('new_task_running', phases['old_task_gone'])
+                        swarm_done = True
+
+                probing = probe['url'] and not probe['ready']
+                if probing:
+                    probe['attempts'] += 1
+                    probe['consecutive'] = probe['consecutive'] + 1 if self.probe(probe['url'], readiness['request_timeout']) else 0
+                    if probe['consecutive'] >= readiness['successes']:
+                        probe['ready'] = True
+                        phases['new_task_ready'] = time.time()
+                        phases.setdefault('new_task_running', phases['new_task_ready'])
+                        logger.info(f"✅ New task ready: {probe['consecutive']} probes passed in {time.time() - probe_started:.2f}s")
+                    elif time.time() - probe_started > readiness['timeout']:
+                        logger.warning(f"New task did not pass {readiness['successes']} probes within {readiness['timeout']:.0f}s "
+                                       f"({probe['attempts']} attempts) - relying on Swarm task state")
+                        probe['url'] = None
+                        probe['enabled'] = False
+
+                if standby['pending'] and new_address and (probe['ready'] or not probe['enabled']):
+                    if self.promote_standby(new_address):
+                        standby.update(pending=False, promoted=True)
+                        logger.info(f"Promoted new standby task at {new_address}")
+
+                if swarm_done and (probe['ready'] or not probe['enabled']):
+                    migration_complete = True
+                    break
+                if swarm_done and probe['enabled'] and not probe['url']:
+                    # Old task already gone but the new one was never seen starting with an address
+                    migration_complete = True
+                    break
+                time.sleep(readiness['interval'] if probing else max(0.0, min(next_poll - time.time(), readiness['poll_interval'])))
 
             if not migration_complete:
                 logger.error(f"Rolling update did not complete within {wait_timeout}s")
-                return {'success': False, 'error': 'Rolling update timeout'}
+                return {'success': False, 'error': 'Rolling update timeout', 'phases': phases}
 
             if not seen_both_tasks:
                 logger.warning(f"⚠️  Did not observe both tasks running (may have had downtime)")
@@ -197,44 +544,44 @@ class DockerController:
                         node = self.client.nodes.get(node_id)
                         hostname = node.attrs['Description']['Hostname']
                         final_tasks[hostname] = final_tasks.get(hostname, 0) + 1
-                        new_node = hostname  # Should only be one task
+                        if is_replacement(task):
+                            new_node = hostname
 
             logger.info(f"Final task distribution: {final_tasks}")
 
-            # Step 6: Clean up migration constraints to restore normal scheduling
-            # Remove node.hostname!= constraints added during migration
-            service.reload()
-            current_spec = service.attrs['Spec']
-            current_task_template = current_spec.get('TaskTemplate', {})
-            current_placement = current_task_template.get('Placement', {})
-            current_constraints_after = current_placement.get('Constraints', [])
-
-            # Remove migration constraints (node.hostname!=...)
-            cleaned_constraints = [c for c in current_constraints_after if 'node.hostname!=' not in c]
-
-            if len(cleaned_constraints) != len(current_constraints_after):
-                logger.info(f"Step 6: Cleaning up migration constraints")
-                logger.info(f"Constraints: {current_constraints_after} → {cleaned_constraints}")
-
-                current_task_template['Placement']['Constraints'] = cleaned_constraints
-
-                # Update service with cleaned constraints
-                service.update(
-                    task_template=current_task_template,
-                    version=service.version
-                )
-                logger.info(f"✅ Migration constraints removed - normal scheduling restored")
+            # Step 6: Restore normal scheduling by labeling every schedulable node
+            # (including from_node) with the current generation. This is a node
+            # update only - the service spec is untouched, so no second rollout.
+            # The rollout is over, so the previous generation's labels go too.
+            logger.info(f"Step 6: Restoring normal scheduling via placement label generation {gen}")
+            self.sync_placement_labels(service_name, gen, keep_previous=False)
+            phases['cleanup_done'] = time.time()
 
+            # Single-rollout check: each replica must have been recreated exactly once
+            service.reload()
+            tasks_created = [t.get('ID') for t in service.tasks() if t.get('ID') not in tasks_before]
+            single_rollout = len(tasks_created) == current_replicas
             total_time = time.time() - start_time
+            if not single_rollout:
+                error = (f"Migration recreated {len(tasks_created)} task(s) for {current_replicas} replica(s) "
+                         f"- expected exactly one rollout")
+                logger.error(error)
+                return {'success': False, 'error': error, 'new_node': new_node, 'target_node': target_node,
+                        'duration_seconds': total_time, 'tasks_created': len(tasks_created),
+                        'single_rollout': False, 'phases': phases}
+            logger.info(f"✅ Single rollout: {len(tasks_created)} task(s) created for {current_replicas} replica(s)")
 
             if new_node and new_node != from_node and from_node not in final_tasks:
                 logger.info(f"✅ Migration successful: {from_node} → {new_node}")
                 logger.info(f"Zero-downtime rolling update complete: {service_name} on {new_node} ({total_time:.2f}s)")
                 logger.info(f"MTTR: {total_time:.2f}s")
-                return {'success': True, 'new_node': new_node, 'duration_seconds': total_time}
+                return {'success': True, 'new_node': new_node, 'target_node': target_node, 'duration_seconds': total_time,
+                        'tasks_created': len(tasks_created), 'single_rollout': single_rollout, 'phases': phases,
+                        'readiness': {'probed': probe['ready'] or probe['attempts'] > 0, 'ready': probe['ready'],
+                                      'attempts': probe['attempts'], 'promoted': standby['promoted']}}
             else:
                 logger.warning(f"Migration completed but final state unexpected: {final_tasks}")
-                return {'success': False, 'error': f'Unexpected final state: {final_tasks}'}
+                return {'success': False, 'error': f'Unexpected final state: {final_tasks}', 'phases': phases}
 
         except docker.errors.NotFound:
             logger.error(f"Service {service_name} not found")
@@ -242,8 +589,24 @@ class DockerController:
         except Exception as e:
             logger.error(f"Migration error: {e}")
             return {'success': False, 'error': str(e)}
+        finally:
+            with self.node_label_lock:
+                self.migrating.discard(service_name)
+
+    def get_replica_count(self, service_name: str) -> int:
+        """Current desired replica count of a replicated service (None if unavailable)"""
+        try:
+            service = self.client.services.get(service_name)
+            return service.attrs['Spec'].get('Mode', {}).get('Replicated', {}).get('Replicas', 1)
+        except Exception as e:
+            logger.error(f"Error getting replica count for {service_name}: {e}")
+            return None
 
-    def scale_up(self, service_name: str) -> dict:
+    def scale_up(self, service_name: str, target_replicas: int = None) -> dict:
+        """
+        Scale up service to target_replicas in a single service update
+        (defaults to one extra replica), bounded by max_replicas
+        """
         start_time = time.time()
         try:
             service = self.client.services.get(service_name)
@@ -255,9 +618,17 @@ class DockerController:
                 logger.warning(f"{service_name} already at max replicas ({max_replicas})")
                 return {'success': False, 'error': f'Already at max replicas ({max_replicas})'}
 
-            new_replicas = current_replicas + 1
+            if target_replicas is None:
+                target_replicas = current_replicas + 1
+            new_replicas = min(max(target_replicas, current_replicas + 1), max_replicas)
+
+            # Nodes that joined since the last migration need the placement label to take new replicas
+            gen = int((spec.get('Labels') or {}).get(PLACEMENT_GEN_LABEL, 0))
+            if gen:
+                self.sync_placement_labels(service_name, gen)
             logger.info(f"Scaling {service_name} from {current_replicas} to {new_replicas} replicas")
-            service.scale(new_replicas)
+            with tracing.span('docker.scale', service=service_name, replicas=new_replicas):
+                service.scale(new_replicas)
             total_time = time.time() - start_time
             logger.info(f"Scale-up successful: {service_name} scaled to {new_replicas} ({total_time:.2f}s)")
 
@@ -270,9 +641,9 @@ class DockerController:
             logger.error(f"Scale-up error: {e}")
             return {'success': False, 'error': str(e)}
 
-    def scale_down(self, service_name: str) -> dict:
+    def scale_down(self, service_name: str, target_replicas: int = None) -> dict:
         """
-        Scale down service by ONE replica (Scenario 2: Autoscaling)
+        Scale down service to target_replicas (default: ONE replica less) (Scenario 2: Autoscaling)
         Uses Docker Swarm's rolling scale-down to maintain zero downtime
         """
         start_time = time.time()
@@ -286,12 +657,15 @@ class DockerController:
                 logger.warning(f"{service_name} already at min replicas ({min_replicas})")
                 return {'success': False, 'error': f'Already at min replicas ({min_replicas})'}
 
-            new_replicas = current_replicas - 1
+            if target_replicas is None:
+                target_replicas = current_replicas - 1
+            new_replicas = max(min(target_replicas, current_replicas - 1), min_replicas)
             logger.info(f"Scaling {service_name} from {current_replicas} to {new_replicas} replicas")
 
             # Docker Swarm handles rolling scale-down automatically
             # It removes tasks one at a time while maintaining the remaining replicas
-            service.scale(new_replicas)
+            with tracing.span('docker.scale', service=service_name, replicas=new_replicas):
+                service.scale(new_replicas)
 
             total_time = time.time() - start_time
             logger.info(f"Scale-down successful: {service_name} scaled to {new_replicas} ({total_time:.2f}s)")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Drain Planner - Evacuates several services off one overloaded node in parallel"""
+
+import time
+import uuid
+import logging
+import contextvars
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class DrainBatch:
+    def __init__(self, node: str):
+        self.node = node
+        self.opened = time.time()
+        self.requests = {}  # service_name -> migration request (latest wins)
+
+
+class DrainPlanner:
+    """
+    Confirmed migrations off the same node within a short window are planned
+    together: each service is assigned a target from the node headroom index,
+    projecting the load already assigned so the services spread out instead of
+    all landing on the coolest node, and the rollouts run concurrently up to
+    max_parallel. Off by default: every migration then waits out the window,
+    even when nothing else joins it.
+    """
+
+    def __init__(self, config, docker_controller, node_headroom, image_prepull=None):
+        self.config = config
+        self.docker_controller = docker_controller
+        self.node_headroom = node_headroom
+        self.image_prepull = image_prepull
+        self.lock = Lock()
+        self.batches = {}  # node -> open DrainBatch
+        self.executing = {}  # service_name -> plan_id of the plan migrating it
+        self.plans_executed = 0
+        self.last_plan = None
+        self.load_settings()
+
+    def load_settings(self):
+        settings = self.config.get('scenarios.scenario1_migration.drain', {}) or {}
+        self.enabled = settings.get('enabled', False)
+        self.window = float(settings.get('window_seconds', 2.0))
+        self.max_parallel = int(settings.get('max_parallel', 3))
+        # Container percentages are relative to the container, not the node, so
+        # only this fraction of a service's load is projected onto its target
+        self.load_fraction = float(settings.get('projected_load_fraction', 0.5))
+
+    def submit(self, node: str, migration: dict):
+        """
+        (batch, opened) - opened is True when this migration started the window
+        and must run the plan; (None, False) while a plan is still migrating the service
+        """
+        with self.lock:
+            if migration['service_name'] in self.executing:
+                return None, False
+            batch = self.batches.get(node)
+            opened = batch is None
+            if opened:
+                batch = self.batches[node] = DrainBatch(node)
+            batch.requests[migration['service_name']] = migration
+            return batch, opened
+
+    def wait_and_close(self, batch: DrainBatch) -> list:
+        remaining = batch.opened + self.window - time.time()
+        if remaining > 0:
+            time.sleep(remaining)
+        with self.lock:
+            if self.batches.get(batch.node) is batch:
+                del self.batches[batch.node]
+            return list(batch.requests.values())
+
+    def build_plan(self, node: str, migrations: list) -> dict:
+        candidates = [n for n in self.docker_controller.get_schedulable_nodes() if n != node]
+        projected = {n: self.node_headroom.utilization(n) for n in candidates}
+        projected = {n: dict(u) for n, u in projected.items() if u is not None}
+
+        assignments, skipped = [], []
+        # Heaviest services pick first
+        ordered = sorted(migrations, key=lambda m: -(m['metrics'].get('cpu_percent', 0) + m['metrics'].get('memory_percent', 0)))
+        for index, migration in enumerate(ordered):
+            service_name = migration['service_name']
+            actual_node = self.docker_controller.get_service_node(service_name)
+            if actual_node != node:
+                skipped.append({'service': service_name, 'reason': 'stale_alert', 'actual_node': actual_node})
+                continue
+
+            if projected:
+                warm = self.image_prepull.warm_bonus(service_name, list(projected)) if self.image_prepull else {}
+
+                def score(n):
+                    u = projected[n]
+                    return self.node_headroom.weighted_headroom(u['cpu'], u['mem'], u['net']) + warm.get(n, 0)
+                target = max(projected, key=score)
+                target_score = round(score(target), 2)
+                projected[target]['cpu'] = min(100.0, projected[target]['cpu'] + migration['metrics'].get('cpu_percent', 0) * self.load_fraction)
+                projected[target]['mem'] = min(100.0, projected[target]['mem'] + migration['metrics'].get('memory_percent', 0) * self.load_fraction)
+            elif candidates:
+                # No fresh node metrics: spread round-robin rather than letting every rollout pick the same node
+                target, target_score = candidates[index % len(candidates)], None
+            else:
+                target, target_score = None, None
+            assignments.append({'service': service_name, 'target_node': target, 'headroom_score': target_score,
+                                'recovery_id': migration.get('recovery_id')})
+
+        return {'plan_id': uuid.uuid4().hex[:12], 'node': node, 'created': time.time(), 'max_parallel': self.max_parallel,
+                'assignments': assignments, 'skipped': skipped}
+
+    def execute(self, plan: dict) -> dict:
+        """Run the plan's migrations concurrently; returns per-service results and the overall completion time"""
+        start = time.time()
+        node = plan['node']
+        logger.info(f"Drain plan {plan['plan_id']}: evacuating {len(plan['assignments'])} services from {node} "
+                    f"(parallel={self.max_parallel}): {[(a['service'], a['target_node']) for a in plan['assignments']]}")
+
+        # Pool threads keep the caller's trace, so their Docker calls add spans to it
+        context = contextvars.copy_context()
+
+        def run(assignment):
+            return context.copy().run(self.docker_controller.migrate_container, assignment['service'], node,
+                                      assignment['target_node'])
+
+        results = {}
+        with self.lock:
+            self.executing.update({a['service']: plan['plan_id'] for a in plan['assignments']})
+        try:
+            if plan['assignments']:
+                with ThreadPoolExecutor(max_workers=max(1, self.max_parallel), thread_name_prefix='drain') as pool:
+                    for assignment, result in zip(plan['assignments'], pool.map(run, plan['assignments'])):
+                        results[assignment['service']] = result
+        finally:
+            with self.lock:
+                for assignment in plan['assignments']:
+                    self.executing.pop(assignment['service'], None)
+
+        total = time.time() - start
+        succeeded = sum(1 for r in results.values() if r.get('success'))
+        logger.info(f"Drain plan {plan['plan_id']} finished in {total:.2f}s: {succeeded}/{len(results)} migrated off {node}")
+        report = dict(plan, results=results, succeeded=succeeded, failed=len(results) - succeeded,
+                      total_seconds=round(total, 3))
+        with self.lock:
+            self.plans_executed += 1
+            self.last_plan = report
+        return report
+
+    def draining(self, service_name: str) -> bool:
+        """True while an executing plan is migrating service_name"""
+        with self.lock:
+            return service_name in self.executing
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'enabled': self.enabled, 'window_seconds': self.window, 'max_parallel': self.max_parallel,
+                    'open_windows': len(self.batches), 'executing': len(self.executing),
+                    'plans_executed': self.plans_executed}
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Event Journal - Append-only record of alerts, decisions and recovery actions"""
+
+import os
+import json
+import time
+import uuid
+import logging
+from collections import deque
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+# Recovery phases in their usual order (new_task_ready and old_task_gone may swap: Swarm
+# can retire the old task before the readiness probe has passed N times)
+PHASES = ('alert_received', 'breach_confirmed', 'update_issued', 'new_task_running', 'new_task_ready', 'old_task_gone',
+          'cleanup_done')
+
+
+def new_recovery_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def phase_durations(phases: dict) -> dict:
+    """{phase: seconds since the previous recorded phase}, phases taken in the order they were reached"""
+    durations = {}
+    previous = None
+    for phase in sorted((p for p in PHASES if p in phases), key=lambda p: (phases[p], PHASES.index(p))):
+        if previous is not None:
+            durations[phase] = round(phases[phase] - phases[previous], 3)
+        previous = phase
+    return durations
+
+
+class EventJournal:
+    """
+    One JSON line per event in journal.path, written and flushed as it
+    happens so the file survives a crash. The most recent events are also
+    kept in memory for the /events endpoint.
+    """
+
+    def __init__(self, config, source: str = None):
+        self.path = config.get('journal.path', '/app/state/events.jsonl')
+        self.source = source
+        self.recent = deque(maxlen=int(config.get('journal.recent_events', 1000)))
+        self.lock = Lock()
+        self.events_written = 0
+        self.file = self._open()
+
+    def _open(self):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            f = open(self.path, 'a', buffering=1)
+            logger.info(f"Event journal: {self.path}")
+            return f
+        except OSError as e:
+            logger.error(f"Cannot open event journal {self.path}: {e} - events kept in memory only")
+            return None
+
+    def record(self, event: str, **fields) -> dict:
+        entry = {'ts': round(time.time(), 3), 'event': event}
+        if self.source:
+            entry['source'] = self.source
+        entry.update(fields)
+        line = json.dumps(entry, default=str)
+        with self.lock:
+            self.recent.append(entry)
+            if self.file is not None:
+                try:
+                    self.file.write(line + '\n')
+                    self.events_written += 1
+                except OSError as e:
+                    logger.error(f"Event journal write failed: {e}")
+        return entry
+
+    def events(self, limit: int = 100, recovery_id: str = None, service: str = None) -> list:
+        with self.lock:
+            entries = list(self.recent)
+        if recovery_id:
+            entries = [e for e in entries if e.get('recovery_id') == recovery_id]
+        if service:
+            entries = [e for e in entries if e.get('service') == service]
+        return entries[-limit:]
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
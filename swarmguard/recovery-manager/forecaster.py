@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Forecaster - Short-horizon load forecasting for predictive scale-up"""
+
+import math
+import time
+import logging
+from collections import deque
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('cpu_percent', 'memory_percent', 'network_percent')
+
+
+class SeriesState:
+    """Per-container forecasting state for cpu/mem/net series"""
+
+    def __init__(self, service_name: str, window: int):
+        self.service_name = service_name
+        self.samples = deque(maxlen=window)  # (timestamp, {metric: value})
+        self.level = {}
+        self.trend = {}
+        self.interval = None  # EWMA of sample spacing in seconds
+        self.last_seen = 0.0
+
+
+class MetricForecaster:
+    """
+    Fits a cheap forecast over each container's recent cpu/mem/net samples.
+    Supports Holt's double exponential smoothing ('holt') or a least-squares
+    linear trend over the sample window ('linear'). One-step-ahead forecast
+    error is tracked per service so alpha/beta/horizon can be tuned against
+    recorded Scenario 2 runs.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.series = {}
+        self.errors = {}  # service_name -> {metric: {'count', 'abs_sum', 'sq_sum'}}
+        self.last_prune = time.time()
+        self.lock = Lock()
+        self.load_settings()
+        logger.info(f"Forecaster initialized: method={self.method}, alpha={self.alpha}, beta={self.beta}, window={self.window}")
+
+    def load_settings(self):
+        """(Re)read forecasting parameters; existing series keep their state"""
+        predictive = self.config.get('scenarios.scenario2_scaling.predictive', {}) or {}
+        self.method = predictive.get('method', 'holt')
+        self.alpha = float(predictive.get('alpha', 0.5))
+        self.beta = float(predictive.get('beta', 0.3))
+        self.window = int(predictive.get('window', 12))
+        self.min_samples = int(predictive.get('min_samples', 4))
+        self.series_ttl = int(predictive.get('series_ttl', 300))
+
+    def observe(self, container_id: str, service_name: str, timestamp: float, metrics: dict):
+        """Feed one sample and update the one-step-ahead forecast error"""
+        with self.lock:
+            self._observe(container_id, service_name, timestamp, metrics)
+
+    def _observe(self, container_id: str, service_name: str, timestamp: float, metrics: dict):
+        state = self.series.get(container_id)
+        if state is None:
+            state = SeriesState(service_name, self.window)
+            self.series[container_id] = state
+
+        if state.samples:
+            dt = timestamp - state.samples[-1][0]
+            if dt <= 0:
+                return  # Duplicate or out-of-order sample
+            state.interval = dt if state.interval is None else 0.8 * state.interval + 0.2 * dt
+            predicted = self._predict_at(state, timestamp)
+            for metric in METRICS:
+                if metric in predicted and metric in metrics:
+                    self._record_error(service_name, metric, predicted[metric] - metrics[metric])
+
+        values = {m: float(metrics.get(m, 0)) for m in METRICS}
+        for metric, value in values.items():
+            if metric not in state.level:
+                state.level[metric] = value
+                state.trend[metric] = 0.0
+            else:
+                prev_level = state.level[metric]
+                level = self.alpha * value + (1 - self.alpha) * (prev_level + state.trend[metric])
+                state.trend[metric] = self.beta * (level - prev_level) + (1 - self.beta) * state.trend[metric]
+                state.level[metric] = level
+
+        state.samples.append((timestamp, values))
+        state.last_seen = time.time()
+        self._maybe_prune()
+
+    def predict(self, container_id: str, horizon_seconds: float) -> dict:
+        """Predicted {metric: value} horizon_seconds after the last sample, or None if not enough data"""
+        with self.lock:
+            state = self.series.get(container_id)
+            if state is None or len(state.samples) < self.min_samples:
+                return None
+            return self._predict_at(state, state.samples[-1][0] + horizon_seconds)
+
+    def crosses_within(self, container_id: str, horizon_seconds: float, thresholds: dict):
+        """
+        Earliest predicted value crossing within the horizon.
+        thresholds: {metric: threshold}; returns {metric: predicted_value} for
+        every metric whose forecast exceeds its threshold, or None.
+        """
+        with self.lock:
+            state = self.series.get(container_id)
+            if state is None or len(state.samples) < self.min_samples:
+                return None
+            step = state.interval or horizon_seconds
+            last_ts = state.samples[-1][0]
+            h = step
+            while h <= horizon_seconds + 1e-9:
+                predicted = self._predict_at(state, last_ts + h)
+                crossed = {m: predicted[m] for m, t in thresholds.items() if predicted.get(m, 0) > t}
+                if crossed:
+                    return crossed
+                h += step
+            return None
+
+    def _predict_at(self, state: SeriesState, timestamp: float) -> dict:
+        last_ts = state.samples[-1][0]
+        if self.method == 'linear':
+            return self._linear_predict(state, timestamp)
+        steps = (timestamp - last_ts) / state.interval if state.interval else 0.0
+        return {m: state.level[m] + steps * state.trend[m] for m in state.level}
+
+    def _linear_predict(self, state: SeriesState, timestamp: float) -> dict:
+        n = len(state.samples)
+        t0 = state.samples[0][0]
+        xs = [ts - t0 for ts, _ in state.samples]
+        x_mean = sum(xs) / n
+        sxx = sum((x - x_mean) ** 2 for x in xs)
+        x = timestamp - t0
+        predicted = {}
+        for metric in METRICS:
+            ys = [values[metric] for _, values in state.samples]
+            y_mean = sum(ys) / n
+            if sxx == 0:
+                predicted[metric] = ys[-1]
+                continue
+            slope = sum((xi - x_mean) * (yi - y_mean) for xi, yi in zip(xs, ys)) / sxx
+            predicted[metric] = y_mean + slope * (x - x_mean)
+        return predicted
+
+    def _record_error(self, service_name: str, metric: str, error: float):
+        stats = self.errors.setdefault(service_name, {}).setdefault(metric, {'count': 0, 'abs_sum': 0.0, 'sq_sum': 0.0})
+        stats['count'] += 1
+        stats['abs_sum'] += abs(error)
+        stats['sq_sum'] += error * error
+
+    def error_report(self) -> dict:
+        """Per-service MAE/RMSE of the one-step-ahead forecast"""
+        report = {}
+        with self.lock:
+            errors = {s: {m: dict(v) for m, v in metrics.items()} for s, metrics in self.errors.items()}
+        for service_name, metrics in errors.items():
+            report[service_name] = {}
+            for metric, stats in metrics.items():
+                count = stats['count']
+                report[service_name][metric] = {
+                    'samples': count,
+                    'mae': round(stats['abs_sum'] / count, 3),
+                    'rmse': round(math.sqrt(stats['sq_sum'] / count), 3)
+                }
+        return report
+
+    def _maybe_prune(self):
+        now = time.time()
+        if now - self.last_prune < 60:
+            return
+        self.last_prune = now
+        stale = [cid for cid, state in self.series.items() if now - state.last_seen > self.series_ttl]
+        for cid in stale:
+            del self.series[cid]
+        if stale:
+            logger.debug(f"Pruned {len(stale)} stale forecast series")
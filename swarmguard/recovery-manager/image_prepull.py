@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Image Pre-pull - Warms candidate nodes with the images of at-risk and autoscaled services"""
+
+import time
+import logging
+from threading import Lock, Event, Thread
+
+logger = logging.getLogger(__name__)
+
+
+def image_keys(reference: str) -> set:
+    """
+    Comparable identities of an image reference: 'repo@sha256:..' when it is
+    digest-pinned (Swarm pins service images as 'repo:tag@sha256:..'),
+    otherwise 'repo:tag' with Docker's implicit ':latest'
+    """
+    name, _, digest = reference.partition('@')
+    slash = name.rfind('/')
+    colon = name.rfind(':')
+    has_tag = colon > slash
+    if digest:
+        return {f"{name[:colon] if has_tag else name}@{digest}"}
+    return {name if has_tag else f"{name}:latest"}
+
+
+class ImagePrepuller:
+    """
+    Agents report their local image inventory with the node metrics they post
+    to /samples; the response tells each agent which images to pull. Images
+    wanted are those of services that recently alerted (a migration or
+    scale-up may follow) and of autoscaled services, so a new task lands on a
+    node that already holds its image instead of waiting on a pull. Nodes
+    holding the image also get a headroom bonus in target selection.
+    """
+
+    def __init__(self, config, docker_controller, owns=None):
+        self.config = config
+        self.docker_controller = docker_controller
+        self.owns = owns or (lambda service_name: True)
+        self.lock = Lock()
+        self.inventories = {}     # node -> {'keys': set, 'updated'}
+        self.at_risk = {}         # service_name -> last alert time
+        self.autoscaled = set()
+        self.service_images = {}  # service_name -> (image, resolved_at)
+        self.requested = {}       # (node, image) -> request time
+        self.requests_sent = 0
+        self.last_autoscaled_refresh = 0.0
+        self.wake = Event()
+        self.running = False
+        self.thread = None
+        self.load_settings()
+
+    def load_settings(self):
+        settings = self.config.get('image_prepull', {}) or {}
+        self.enabled = settings.get('enabled', True)
+        self.prefer_warm_nodes = settings.get('prefer_warm_nodes', True)
+        self.warm_node_bonus = float(settings.get('warm_node_bonus', 15))
+        self.at_risk_ttl = float(settings.get('at_risk_ttl', 600))
+        self.include_autoscaled = settings.get('autoscaled_services', True)
+        self.refresh_interval = float(settings.get('refresh_interval', 60))
+        self.request_ttl = float(settings.get('request_ttl', 300))
+        self.inventory_max_age = float(settings.get('inventory_max_age', 180))
+        self.max_pulls_per_node = int(settings.get('max_pulls_per_node', 2))
+
+    def update_inventory(self, node: str, images: list):
+        keys = set()
+        for reference in images or []:
+            keys |= image_keys(reference)
+        with self.lock:
+            self.inventories[node] = {'keys': keys, 'updated': time.time()}
+            # A request is settled once the node reports the image
+            for request in [r for r in self.requested if r[0] == node and image_keys(r[1]) & keys]:
+                del self.requested[request]
+
+    def mark_at_risk(self, service_name: str):
+        """Called on every alert; the service's image is resolved and pushed out in the background"""
+        if not self.enabled or not service_name:
+            return
+        with self.lock:
+            new = service_name not in self.at_risk
+            self.at_risk[service_name] = time.time()
+        if new:
+            self.wake.set()
+
+    def _inventory(self, node: str):
+        entry = self.inventories.get(node)
+        if entry is None or time.time() - entry['updated'] > self.inventory_max_age:
+            return None
+        return entry['keys']
+
+    def is_warm(self, node: str, image: str) -> bool:
+        with self.lock:
+            keys = self._inventory(node)
+        return bool(keys and image_keys(image) & keys)
+
+    def warm_bonus(self, service_name: str, candidates: list) -> dict:
+        """{node: headroom bonus} for candidates already holding the service's image"""
+        if not (self.enabled and self.prefer_warm_nodes):
+            return {}
+        with self.lock:
+            image = (self.service_images.get(service_name) or (None,))[0]
+        if not image:
+            return {}
+        return {node: self.warm_node_bonus for node in candidates if self.is_warm(node, image)}
+
+    def pending_for(self, node: str) -> list:
+        """Images the node's agent should pull now (answered in the /samples response)"""
+        if not self.enabled or not node:
+            return []
+        now = time.time()
+        with self.lock:
+            wanted = [image for service, (image, _) in self.service_images.items()
+                      if image and (service in self.at_risk or service in self.autoscaled)]
+            keys = self._inventory(node) or set()
+            pulls = []
+            for image in dict.fromkeys(wanted):
+                if image_keys(image) & keys:
+                    continue
+                requested = self.requested.get((node, image))
+                if requested is not None and now - requested < self.request_ttl:
+                    continue
+                self.requested[(node, image)] = now
+                pulls.append(image)
+                if len(pulls) >= self.max_pulls_per_node:
+                    break
+            self.requests_sent += len(pulls)
+        if pulls:
+            logger.info(f"Pre-pull requested on {node}: {pulls}")
+        return pulls
+
+    def refresh(self):
+        """Expire at-risk services, refresh the autoscaled set and resolve service images"""
+        now = time.time()
+        with self.lock:
+            for service in [s for s, t in self.at_risk.items() if now - t > self.at_risk_ttl]:
+                del self.at_risk[service]
+            for request in [r for r, t in self.requested.items() if now - t > self.request_ttl]:
+                del self.requested[request]
+            services = set(self.at_risk)
+
+        if self.include_autoscaled and now - self.last_autoscaled_refresh >= self.refresh_interval:
+            autoscaled = {s for s in self.docker_controller.get_autoscaling_services() if self.owns(s)}
+            with self.lock:
+                self.autoscaled = autoscaled
+            self.last_autoscaled_refresh = now
+        services |= self.autoscaled
+
+        for service in services:
+            with self.lock:
+                cached = self.service_images.get(service)
+            # Re-resolve periodically: a service update may change the image
+            if cached is None or now - cached[1] >= self.refresh_interval:
+                image = self.docker_controller.get_service_image(service)
+                with self.lock:
+                    self.service_images[service] = (image, now)
+        with self.lock:
+            for service in [s for s in self.service_images if s not in services]:
+                del self.service_images[service]
+
+    def refresh_loop(self):
+        logger.info("Image pre-pull refresher started")
+        while self.running:
+            self.wake.wait(self.refresh_interval)
+            self.wake.clear()
+            if not self.running:
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing pre-pull images: {e}")
+        logger.info("Image pre-pull refresher stopped")
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.running = True
+        self.wake.set()
+        self.thread = Thread(target=self.refresh_loop, daemon=True, name='image-prepull')
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        with self.lock:
+            images = {service: image for service, (image, _) in self.service_images.items() if image}
+            return {
+                'services': {service: {'image': image, 'at_risk': service in self.at_risk,
+                                       'autoscaled': service in self.autoscaled,
+                                       'warm_nodes': sorted(n for n in self.inventories
+                                                            if image_keys(image) & (self._inventory(n) or set()))}
+                             for service, image in images.items()},
+                'nodes': {node: {'images': len(e['keys']), 'age_seconds': round(now - e['updated'], 1)}
+                          for node, e in self.inventories.items()},
+                'pending_requests': [{'node': n, 'image': i, 'age_seconds': round(now - t, 1)}
+                                     for (n, i), t in self.requested.items()],
+            }
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'enabled': self.enabled, 'at_risk_services': len(self.at_risk),
+                    'autoscaled_services': len(self.autoscaled), 'nodes_reporting': len(self.inventories),
+                    'requests_sent': self.requests_sent, 'pending_requests': len(self.requested)}
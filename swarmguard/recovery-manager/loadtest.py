@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+"""
+SwarmGuard Load Test - Drives the recovery manager's HTTP API with synthetic
+alert streams at increasing rates against an in-process fake Swarm
+
+Usage:
+    python loadtest.py [--rates 10,25,50,100,200] [--duration 10] [--services 50]
+                       [--latency update_service=0.2] [--mix scale_up=0.8,migration=0.2]
+                       [--set alert_admission.enabled=false] [--json loadtest.json]
+                       [--compare previous.json]
+
+The real Flask app, RecoveryManager and DockerController run unchanged; only
+the docker-py client underneath is replaced by FakeDockerClient, which sleeps
+a configurable latency per call (services.get, tasks, nodes.get, nodes.list,
+nodes.update, update_service, scale, ...) and applies updates to an in-memory
+cluster. Each rate step gets a fresh manager and cluster so steps do not
+share cooldowns. Alerts carry the task ID of the replica they come from, so a
+replica's second alert confirms its breach and reaches the action path; a
+step that ran no actions is reported and fails the run. Results are written
+with the commit they were measured on; --compare prints the deltas against an
+earlier run.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+import docker
+import requests
+from werkzeug.serving import make_server
+
+import manager as manager_module
+from manager import RecoveryManager
+from simulator import apply_overrides, parse_assignments
+
+logger = logging.getLogger('loadtest')
+
+DEFAULT_LATENCY = {
+    'services.get': 0.010,
+    'services.list': 0.020,
+    'tasks': 0.015,
+    'nodes.get': 0.005,
+    'nodes.list': 0.010,
+    'nodes.update': 0.020,
+    'update_service': 0.050,
+    'scale': 0.050,
+}
+
+DEFAULT_MIX = {'scale_up': 0.8, 'migration': 0.2}
+
+SCENARIOS = {'scale_up': 'scenario2_scale_up', 'migration': 'scenario1_migration',
+             'scale_down': 'scenario2_scale_down'}
+
+
+# ---------------------------------------------------------------- fake swarm
+
+class FakeCluster:
+    """In-memory Swarm state behind FakeDockerClient; every API call sleeps its configured latency"""
+
+    def __init__(self, nodes: int, services: int, replicas: int, latency: dict, jitter: float, seed: int):
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.call_seconds = Counter()
+        self.version = 0
+        self.nodes = {}
+        for i in range(nodes):
+            node_id = f'node{i:02d}' + uuid.uuid4().hex[:20]
+            self.nodes[node_id] = {'ID': node_id, 'Version': {'Index': self.next_version()},
+                                   'Description': {'Hostname': f'worker-{i}'},
+                                   'Status': {'State': 'ready'},
+                                   'Spec': {'Availability': 'active', 'Role': 'worker', 'Labels': {}}}
+        self.services = {}
+        node_ids = list(self.nodes)
+        for i in range(services):
+            name = f'loadtest-svc-{i}'
+            service = {'ID': uuid.uuid4().hex[:25], 'Version': {'Index': self.next_version()},
+                       'Spec': {'Name': name, 'Labels': {}, 'Mode': {'Replicated': {'Replicas': replicas}},
+                                'TaskTemplate': {'ContainerSpec': {'Image': 'loadtest:latest'},
+                                                 'Placement': {'Constraints': []}}},
+                       'Tasks': []}
+            for r in range(replicas):
+                service['Tasks'].append(self.new_task(node_ids[(i + r) % len(node_ids)], r + 1))
+            self.services[name] = service
+
+    def next_version(self) -> int:
+        self.version += 1
+        return self.version
+
+    @staticmethod
+    def new_task(node_id: str, slot: int = None) -> dict:
+        return {'ID': uuid.uuid4().hex[:25], 'NodeID': node_id, 'Slot': slot, 'DesiredState': 'running',
+                'Status': {'State': 'running'}, 'CreatedAt': time.time()}
+
+    def call(self, name: str):
+        """Account for and sleep out one API call"""
+        delay = self.latency.get(name, 0.0)
+        if delay and self.jitter:
+            delay *= 1 + self.random.uniform(-self.jitter, self.jitter)
+        with self.lock:
+            self.calls[name] += 1
+            self.call_seconds[name] += delay
+        if delay > 0:
+            time.sleep(delay)
+
+    def hostname(self, node_id: str) -> str:
+        return self.nodes[node_id]['Description']['Hostname']
+
+    def service_node(self, name: str) -> str:
+        """Hostname of the service's first running task (what an agent would report)"""
+        with self.lock:
+            for task in self.services[name]['Tasks']:
+                if task['DesiredState'] == 'running':
+                    return self.hostname(task['NodeID'])
+        return None
+
+    def service_task(self, name: str, replica: int):
+        """(task ID, hostname) of one running task of the service, by slot order (what a replica's agent reports)"""
+        with self.lock:
+            tasks = sorted(self.running_tasks(self.services[name]), key=lambda t: t.get('Slot') or 0)
+            if not tasks:
+                return None, None
+            task = tasks[replica % len(tasks)]
+            return task['ID'], self.hostname(task['NodeID'])
+
+    def running_tasks(self, service: dict) -> list:
+        return [t for t in service['Tasks'] if t['DesiredState'] == 'running']
+
+    def eligible_nodes(self, constraints: list) -> list:
+        """Node IDs satisfying the node.labels.<key>==true constraints (placement generations)"""
+        keys = [c[len('node.labels.'):].split('==')[0] for c in constraints
+                if c.startswith('node.labels.') and c.endswith('==true')]
+        return [node_id for node_id, node in self.nodes.items()
+                if all((node['Spec'].get('Labels') or {}).get(k) == 'true' for k in keys)]
+
+    def update_service(self, service_id: str, version: int, task_template: dict, mode: dict, labels: dict):
+        """A forced update replaces every running task at once on the eligible nodes (start-first, instant)"""
+        with self.lock:
+            service = next((s for s in self.services.values() if s['ID'] == service_id), None)
+            if service is None:
+                raise docker.errors.NotFound(f'service {service_id} not found')
+            if version != service['Version']['Index']:
+                raise docker.errors.APIError(f'update out of sequence (version {version})')
+            spec = service['Spec']
+            spec['TaskTemplate'] = json.loads(json.dumps(task_template))
+            spec['Mode'] = mode or spec['Mode']
+            spec['Labels'] = dict(labels or {})
+            eligible = self.eligible_nodes(task_template.get('Placement', {}).get('Constraints', [])) or list(self.nodes)
+            for index, task in enumerate(self.running_tasks(service)):
+                task['DesiredState'] = 'shutdown'
+                task['Status']['State'] = 'shutdown'
+                service['Tasks'].append(self.new_task(eligible[index % len(eligible)], task.get('Slot')))
+            service['Version']['Index'] = self.next_version()
+
+    def scale(self, name: str, replicas: int):
+        with self.lock:
+            service = self.services[name]
+            running = self.running_tasks(service)
+            node_ids = list(self.nodes)
+            for i in range(len(running), replicas):
+                service['Tasks'].append(self.new_task(node_ids[i % len(node_ids)], i + 1))
+            for task in running[replicas:]:
+                task['DesiredState'] = 'shutdown'
+                task['Status']['State'] = 'shutdown'
+            service['Spec']['Mode'] = {'Replicated': {'Replicas': replicas}}
+            service['Version']['Index'] = self.next_version()
+
+
+class FakeService:
+    def __init__(self, cluster: FakeCluster, name: str):
+        self.cluster = cluster
+        self.name = name
+        self.attrs = None
+        self._load()
+
+    def _load(self):
+        with self.cluster.lock:
+            service = self.cluster.services[self.name]
+            self.attrs = json.loads(json.dumps({k: v for k, v in service.items() if k != 'Tasks'}))
+        self.id = self.attrs['ID']
+
+    @property
+    def version(self) -> int:
+        return self.attrs['Version']['Index']
+
+    def reload(self):
+        self.cluster.call('services.get')
+        self._load()
+
+    def tasks(self, filters: dict = None) -> list:
+        self.cluster.call('tasks')
+        desired = (filters or {}).get('desired-state')
+        with self.cluster.lock:
+            tasks = self.cluster.services[self.name]['Tasks']
+            return [json.loads(json.dumps(t)) for t in tasks if desired is None or t['DesiredState'] == desired]
+
+    def scale(self, replicas: int) -> bool:
+        self.cluster.call('scale')
+        self.cluster.scale(self.name, replicas)
+        return True
+
+
+class FakeNode:
+    def __init__(self, cluster: FakeCluster, node_id: str):
+        self.cluster = cluster
+        self.id = node_id
+        with cluster.lock:
+            self.attrs = json.loads(json.dumps(cluster.nodes[node_id]))
+
+    def update(self, node_spec: dict) -> bool:
+        self.cluster.call('nodes.update')
+        with self.cluster.lock:
+            node = self.cluster.nodes[self.id]
+            if node['Version']['Index'] != self.attrs['Version']['Index']:
+                raise docker.errors.APIError(f'update out of sequence (node {self.id[:12]})')
+            node['Spec'] = json.loads(json.dumps(node_spec))
+            node['Version']['Index'] = self.cluster.next_version()
+        return True
+
+
+class FakeServiceCollection:
+    def __init__(self, cluster: FakeCluster):
+        self.cluster = cluster
+
+    def get(self, name: str) -> FakeService:
+        self.cluster.call('services.get')
+        if name not in self.cluster.services:
+            raise docker.errors.NotFound(f'service {name} not found')
+        return FakeService(self.cluster, name)
+
+    def list(self) -> list:
+        self.cluster.call('services.list')
+        return [FakeService(self.cluster, name) for name in list(self.cluster.services)]
+
+
+class FakeNodeCollection:
+    def __init__(self, cluster: FakeCluster):
+        self.cluster = cluster
+
+    def get(self, node_id: str) -> FakeNode:
+        self.cluster.call('nodes.get')
+        if node_id not in self.cluster.nodes:
+            raise docker.errors.NotFound(f'node {node_id} not found')
+        return FakeNode(self.cluster, node_id)
+
+    def list(self) -> list:
+        self.cluster.call('nodes.list')
+        return [FakeNode(self.cluster, node_id) for node_id in list(self.cluster.nodes)]
+
+
+class FakeAPIClient:
+    def __init__(self, cluster: FakeCluster):
+        self.cluster = cluster
+
+    def update_service(self, service, version, task_template=None, name=None, labels=None, mode=None,
+                       update_config=None, networks=None, endpoint_spec=None, **kwargs):
+        self.cluster.call('update_service')
+        self.cluster.update_service(service, version, task_template or {}, mode, labels)
+        return {'Warnings': None}
+
+
+class FakeDockerClient:
+    """The subset of docker.DockerClient that DockerController uses"""
+
+    def __init__(self, cluster: FakeCluster):
+        self.services = FakeServiceCollection(cluster)
+        self.nodes = FakeNodeCollection(cluster)
+        self.api = FakeAPIClient(cluster)
+
+    def events(self, **kwargs) -> list:
+        return []
+
+
+# ---------------------------------------------------------------- measurement
+
+class TimedLock:
+    """Drop-in for the manager lock that records how long each acquire waited and how long it was held"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._held_since = 0.0
+        self.waits = []
+        self.holds = []
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        start = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self._held_since = time.perf_counter()
+            self.waits.append(self._held_since - start)
+        return acquired
+
+    def release(self):
+        self.holds.append(time.perf_counter() - self._held_since)
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def percentile(values: list, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def summarize(values: list) -> dict:
+    ms = lambda v: None if v is None else round(v * 1000, 2)
+    return {'count': len(values), 'p50_ms': ms(percentile(values, 50)), 'p90_ms': ms(percentile(values, 90)),
+            'p99_ms': ms(percentile(values, 99)), 'max_ms': ms(max(values) if values else None),
+            'total_s': round(sum(values), 3)}
+
+
+def git_revision() -> dict:
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=here, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--', '.'], cwd=here, capture_output=True,
+                                    text=True, timeout=10).stdout.strip())
+        return {'commit': commit or None, 'dirty': dirty}
+    except Exception:
+        return {'commit': None, 'dirty': None}
+
+
+# ---------------------------------------------------------------- load steps
+
+class LoadStep:
+    """One rate step: fresh cluster and manager, open-loop alert stream, then drain"""
+
+    def __init__(self, config: dict, args, rate: float, latency: dict, mix: dict, workdir: str):
+        self.args = args
+        self.rate = rate
+        self.mix = mix
+        self.random = random.Random(args.seed)
+        self.cluster = FakeCluster(args.nodes, args.services, args.replicas, latency, args.jitter, args.seed)
+
+        config = apply_overrides(json.loads(json.dumps(config)), {
+            'state_store.path': os.path.join(workdir, f'state-{rate}.db'),
+            'journal.path': os.path.join(workdir, f'events-{rate}.jsonl'),
+            'tracing.path': os.path.join(workdir, f'spans-{rate}.jsonl'),
+            'tracing.ship_to_influxdb': False,
+            'config_reload.watch': False,
+        })
+        config_path = os.path.join(workdir, f'config-{rate}.yaml')
+        with open(config_path, 'w') as f:
+            yaml.safe_dump(config, f)
+
+        self.rm = RecoveryManager(config_path)
+        self.rm.docker_controller._client = FakeDockerClient(self.cluster)
+        self.lock = self.rm.lock = TimedLock()
+
+        self.sent_at = {}
+        self.decisions = []  # (handler seconds, end-to-end seconds, status)
+        handle_alert = self.rm.handle_alert
+
+        def timed_handle_alert(alert_data):
+            start = time.perf_counter()
+            result = handle_alert(alert_data)
+            done = time.perf_counter()
+            sent = self.sent_at.get(alert_data.get('loadtest_id'), start)
+            self.decisions.append((done - start, done - sent, result.get('status', 'unknown')))
+            return result
+
+        self.rm.handle_alert = self.rm.admission.handler = timed_handle_alert
+
+    def schedule(self) -> list:
+        """(offset seconds, service, replica, scenario, metrics) for the whole step, seeded so every run sends the same stream"""
+        count = int(self.rate * self.args.duration)
+        names = sorted(self.cluster.services)
+        kinds, weights = zip(*self.mix.items())
+        stream = []
+        for i in range(count):
+            scenario = SCENARIOS[self.random.choices(kinds, weights)[0]]
+            high = scenario != 'scenario2_scale_down'
+            metrics = {'cpu_percent': round(self.random.uniform(85, 98) if high else self.random.uniform(5, 15), 1),
+                       'memory_percent': round(self.random.uniform(60, 90) if high else self.random.uniform(10, 20), 1),
+                       'network_percent': round(self.random.uniform(70, 95) if scenario == 'scenario2_scale_up'
+                                                else self.random.uniform(1, 20), 1)}
+            stream.append((i / self.rate, self.random.choice(names), self.random.randrange(self.args.replicas),
+                           scenario, metrics))
+        return stream
+
+    def alert(self, service: str, replica: int, scenario: str, metrics: dict) -> dict:
+        # The task is looked up at send time: a migration earlier in the stream moves the service. Its
+        # task ID is the container ID, stable until the task is replaced, so repeated alerts from one
+        # replica confirm its breach like an agent's consecutive polls do
+        container_id, node = self.cluster.service_task(service, replica)
+        return {'loadtest_id': uuid.uuid4().hex, 'timestamp': time.time(), 'scenario': scenario,
+                'service_name': service, 'container_name': service, 'container_id': container_id,
+                'node': node, 'metrics': metrics}
+
+    def run(self) -> dict:
+        server = make_server('127.0.0.1', 0, manager_module.app, threaded=True)
+        url = f'http://127.0.0.1:{server.server_port}/alert'
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True, name='loadtest-http')
+        manager_module.recovery_manager = self.rm
+        self.rm.running = True
+        self.rm.state_store.start()
+        if self.rm.admission.enabled:
+            self.rm.admission.start()
+        server_thread.start()
+
+        sessions = threading.local()
+        http, send_lag, codes, errors = [], [], Counter(), Counter()
+
+        def send(scheduled: float, service: str, replica: int, scenario: str, metrics: dict):
+            session = getattr(sessions, 'session', None)
+            if session is None:
+                session = sessions.session = requests.Session()
+            alert = self.alert(service, replica, scenario, metrics)
+            start = time.perf_counter()
+            send_lag.append(start - scheduled)
+            self.sent_at[alert['loadtest_id']] = start
+            try:
+                response = session.post(url, json=alert, timeout=self.args.timeout)
+                http.append(time.perf_counter() - start)
+                codes[response.status_code] += 1
+            except requests.RequestException as e:
+                errors[type(e).__name__] += 1
+
+        schedule = self.schedule()
+        logger.info(f"Step {self.rate}/s: {len(schedule)} alerts over {self.args.duration}s "
+                    f"({self.args.services} services, {self.args.nodes} nodes)")
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency, thread_name_prefix='loadtest-client') as pool:
+            for offset, service, replica, scenario, metrics in schedule:
+                delay = began + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(send, began + offset, service, replica, scenario, metrics)
+            sent_done = time.perf_counter()
+
+        # Queued alerts (admission) finish after their HTTP 202
+        deadline = time.perf_counter() + self.args.timeout
+        while self.rm.admission.running and time.perf_counter() < deadline:
+            stats = self.rm.admission.stats()
+            if not stats['queue_depth'] and not stats['in_flight']:
+                break
+            time.sleep(0.05)
+        finished = time.perf_counter()
+
+        server.shutdown()
+        self.rm.running = False
+        self.rm.admission.stop()
+        self.rm.state_store.close()
+        self.rm.journal.close()
+        self.rm.tracer.stop()
+
+        statuses = Counter(status for _, _, status in self.decisions)
+        elapsed = finished - began
+        actions = self.cluster.calls['update_service'] + self.cluster.calls['scale']
+        if not actions:
+            logger.warning(f"Step {self.rate}/s ran NO recovery actions (decisions {dict(statuses)}) - it measured "
+                           f"breach counting only, not the cooldown/lock/Docker path; send more alerts per "
+                           f"service (--duration, --rates) or fewer --services")
+        return {
+            'offered_rate': self.rate,
+            'sent': len(schedule),
+            'http_status': {str(k): v for k, v in sorted(codes.items())},
+            'client_errors': dict(errors),
+            'decisions': len(self.decisions),
+            'decision_status': dict(statuses),
+            'actions': actions,
+            'send_seconds': round(sent_done - began, 3),
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput_per_second': round(len(self.decisions) / elapsed, 2) if elapsed else None,
+            # Time after the last send until every decision finished; grows with the backlog once saturated
+            'tail_seconds': round(finished - sent_done, 3),
+            'alert_latency': summarize([e2e for _, e2e, _ in self.decisions]),
+            'handler_latency': summarize([h for h, _, _ in self.decisions]),
+            'http_latency': summarize(http),
+            'send_lag': summarize(send_lag),
+            'lock_wait': summarize(list(self.lock.waits)),
+            'lock_hold': summarize(list(self.lock.holds)),
+            'docker_calls': dict(self.cluster.calls),
+            'docker_call_seconds': {k: round(v, 3) for k, v in self.cluster.call_seconds.items()},
+            'admission': self.rm.admission.stats(),
+        }
+
+
+def parse_pairs(text: str, cast=float) -> dict:
+    return {k.strip(): cast(v) for k, _, v in (item.partition('=') for item in text.split(',') if item.strip())}
+
+
+def print_report(results: dict, previous: dict = None):
+    header = (f"{'rate/s':>7} {'sent':>6} {'done':>6} {'429':>5} {'thr/s':>7} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'http99':>8} {'lock99':>8} {'lockΣ s':>8} {'actions':>8} {'tail s':>7}")
+    print(f"commit {results['revision']['commit']}{' (dirty)' if results['revision']['dirty'] else ''} - "
+          f"{results['parameters']['services']} services, {results['parameters']['nodes']} nodes, "
+          f"mix {results['parameters']['mix']}")
+    print(header)
+    print('-' * len(header))
+    for step in results['steps']:
+        actions = step['docker_calls'].get('update_service', 0) + step['docker_calls'].get('scale', 0)
+        print(f"{step['offered_rate']:>7g} {step['sent']:>6} {step['decisions']:>6} "
+              f"{step['http_status'].get('429', 0):>5} {step['throughput_per_second']:>7.1f} "
+              f"{step['alert_latency']['p50_ms'] or 0:>8.1f} {step['alert_latency']['p99_ms'] or 0:>8.1f} "
+              f"{step['http_latency']['p99_ms'] or 0:>8.1f} {step['lock_wait']['p99_ms'] or 0:>8.1f} "
+              f"{step['lock_wait']['total_s']:>8.2f} {actions:>8} {step['tail_seconds']:>7.2f}")
+
+    if not previous:
+        return
+    before = {step['offered_rate']: step for step in previous.get('steps', [])}
+    print(f"\nvs commit {previous.get('revision', {}).get('commit')}:")
+    for step in results['steps']:
+        old = before.get(step['offered_rate'])
+        if not old:
+            continue
+
+        def delta(path):
+            new_value, old_value = step, old
+            for key in path:
+                new_value, old_value = (new_value or {}).get(key), (old_value or {}).get(key)
+            if new_value is None or old_value is None:
+                return 'n/a'
+            change = new_value - old_value
+            return f"{change:+.1f}" + (f" ({change / old_value * 100:+.0f}%)" if old_value else '')
+
+        print(f"{step['offered_rate']:>7g}/s  thr {delta(['throughput_per_second'])}/s  "
+              f"p99 {delta(['alert_latency', 'p99_ms'])} ms  lock99 {delta(['lock_wait', 'p99_ms'])} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SwarmGuard recovery manager load test')
+    parser.add_argument('--config', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.yaml'))
+    parser.add_argument('--rates', default='10,25,50,100,200', help='comma-separated alerts/second per step')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of alerts per step')
+    parser.add_argument('--services', type=int, default=50)
+    parser.add_argument('--nodes', type=int, default=5)
+    parser.add_argument('--replicas', type=int, default=1,
+                        help='initial replicas per service (migrations expect single-replica services)')
+    parser.add_argument('--mix', default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+                        help=f'scenario weights over {sorted(SCENARIOS)}')
+    parser.add_argument('--latency', action='append', default=[], metavar='CALL=SECONDS',
+                        help=f'per-call fake Docker latency (defaults {DEFAULT_LATENCY})')
+    parser.add_argument('--jitter', type=float, default=0.2, help='uniform ± fraction applied to every call latency')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE', help='dotted config override')
+    parser.add_argument('--concurrency', type=int, default=128, help='client threads')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='earlier --json results to diff against')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', force=True)
+    logger.setLevel(logging.INFO)
+    if not args.verbose:
+        # Per-alert INFO logging would dominate the measurement
+        for name in ('manager', 'docker_controller', 'drain_planner', 'admission', 'event_journal'):
+            logging.getLogger(name).setLevel(logging.ERROR)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    latency = dict(DEFAULT_LATENCY, **{k: float(v) for k, v in parse_assignments(args.latency).items()})
+    unknown = set(latency) - set(DEFAULT_LATENCY)
+    if unknown:
+        parser.error(f"unknown Docker calls {sorted(unknown)} (known: {sorted(DEFAULT_LATENCY)})")
+    mix = parse_pairs(args.mix)
+    if not mix or set(mix) - set(SCENARIOS):
+        parser.error(f"--mix takes weights for {sorted(SCENARIOS)}")
+
+    with open(args.config) as f:
+        config = apply_overrides(yaml.safe_load(f), parse_assignments(args.set))
+
+    results = {
+        'revision': git_revision(),
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'parameters': {'duration': args.duration, 'services': args.services, 'nodes': args.nodes,
+                       'replicas': args.replicas, 'mix': mix, 'latency': latency, 'jitter': args.jitter,
+                       'overrides': parse_assignments(args.set), 'concurrency': args.concurrency, 'seed': args.seed},
+        'steps': [],
+    }
+    with tempfile.TemporaryDirectory(prefix='swarmguard-loadtest-') as workdir:
+        for rate in (float(r) for r in args.rates.split(',') if r.strip()):
+            results['steps'].append(LoadStep(config, args, rate, latency, mix, workdir).run())
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(results, previous)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    idle = [step['offered_rate'] for step in results['steps'] if not step['actions']]
+    if idle:
+        print(f"\nFAILED: step(s) {idle} alerts/s ran no recovery actions", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
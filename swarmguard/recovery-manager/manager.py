@@ -5,17 +5,37 @@ import os
 import time
 import logging
 import json
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
+from flask_sock import Sock
 from threading import Lock, Thread
 
 from config_loader import ConfigLoader
 from rule_engine import RuleEngine
+from rule_compiler import RuleError
 from docker_controller import DockerController
+from forecaster import MetricForecaster
+from replica_calculator import ReplicaCalculator
+from node_headroom import NodeHeadroomIndex
+from state_store import StateStore
+from sharding import ShardMembership
+from event_journal import EventJournal, new_recovery_id
+from recovery_metrics import RecoveryMetrics
+from alert_coalescer import AlertCoalescer
+from admission import AdmissionController
+from drain_planner import DrainPlanner
+from image_prepull import ImagePrepuller
+from warm_pool import WarmPool
+from placement_sync import PlacementSync
+from agent_stream import AgentStreams
+from timeseries import TimeSeriesStore
+from tracing import Tracer
+import tracing
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+sock = Sock(app)
 
 
 class RecoveryManager:
@@ -23,19 +43,149 @@ class RecoveryManager:
         self.lock = Lock()
         if config_path is None:
             config_path = os.getenv('CONFIG_PATH', '/app/config.yaml')
-        self.config = ConfigLoader(config_path)
+        self.config = ConfigLoader(config_path, validate=self.validate_config)
         self.rule_engine = RuleEngine(self.config)
         self.docker_controller = DockerController(self.config)
         self.metrics_cache = {}
-        self.cooldowns = {}
-        self.breach_counts = {}
-        self.scale_down_last_checked = {}
+        # Decision state is persisted (SQLite) and bounded by TTL/capacity per table
+        self.state_store = StateStore(self.config)
+        self.cooldowns = self.state_store.table('cooldowns')
+        self.breach_counts = self.state_store.table('breach_counts')
+        self.scale_down_last_checked = self.state_store.table('scale_down_last_checked')
+        self.forecaster = MetricForecaster(self.config)
+        self.replica_calculator = ReplicaCalculator(self.config)
+        self.node_headroom = NodeHeadroomIndex(self.config)
+        self.timeseries = TimeSeriesStore(self.config)
+        self.image_prepull = ImagePrepuller(self.config, self.docker_controller, owns=lambda s: self.shard.owns(s))
+        self.drain_planner = DrainPlanner(self.config, self.docker_controller, self.node_headroom, self.image_prepull)
+        # Only set when running as one worker behind router.py; otherwise this process owns every service
+        self.shard = ShardMembership(int(os.getenv('FLASK_PORT', '5000')), on_rebalance=self.state_store.refresh)
+        self.journal = EventJournal(self.config, source=self.shard.worker_id if self.shard.enabled else None)
+        self.tracer = Tracer(self.config)
+        self.metrics = RecoveryMetrics()
+        self.warm_pool = WarmPool(self.config, self.docker_controller, self.metrics, owns=lambda s: self.shard.owns(s))
+        self.placement_sync = PlacementSync(self.config, self.docker_controller, owns=lambda s: self.shard.owns(s))
+        self.coalescer = AlertCoalescer(self.config)
+        self.admission = AdmissionController(self.config, self.handle_alert, self.is_repeat_alert, self.metrics)
+        self.agent_streams = AgentStreams({'alert': lambda body: process_alert(body, 'stream'), 'samples': process_samples},
+                                          heartbeat_timeout=float(self.config.get('agent_stream.heartbeat_timeout', 15)),
+                                          dispatch_workers=int(self.config.get('agent_stream.dispatch_workers', 8)),
+                                          alert_workers=int(self.config.get('agent_stream.alert_workers', 8)))
         self.running = False
         self.monitor_thread = None
+        self.config_watch_thread = None
+        self.reload_lock = Lock()
+        self.last_reload_error = None
         logger.info("Recovery Manager initialized")
 
+    def validate_config(self, snapshot) -> RuleEngine:
+        """A candidate config's compiled rule engine (raises RuleError if its rules are invalid)"""
+        return RuleEngine(snapshot)
+
+    def reload_config(self, force: bool = False) -> dict:
+        """
+        Parse and validate config.yaml, compile its rule set, then swap both in.
+        Alerts already being handled keep the snapshot they pinned; a file that
+        fails to parse or compile leaves the active configuration untouched.
+        """
+        with self.reload_lock:
+            active = self.config.current
+            try:
+                candidate = self.config.read_snapshot()
+            except Exception as e:
+                self.last_reload_error = f"Invalid config: {e}"
+                logger.error(f"Config reload rejected: {e}")
+                return {'status': 'error', 'message': self.last_reload_error, 'active': active.info()}
+
+            if candidate.checksum == active.checksum and not force:
+                return {'status': 'unchanged', 'active': active.info()}
+
+            try:
+                rule_engine = self.config.validate(candidate)
+            except RuleError as e:
+                self.last_reload_error = f"Invalid rules: {e}"
+                logger.error(f"Config reload rejected: {e}")
+                return {'status': 'error', 'message': self.last_reload_error, 'active': active.info()}
+
+            self.config.swap(candidate)
+            self.rule_engine = rule_engine
+            self.forecaster.load_settings()
+            self.node_headroom.load_settings()
+            self.coalescer.load_settings()
+            self.admission.load_settings()
+            if self.running:
+                self.admission.apply_settings()
+            self.drain_planner.load_settings()
+            self.image_prepull.load_settings()
+            self.warm_pool.load_settings()
+            self.placement_sync.load_settings()
+            self.timeseries.load_settings()
+            self.tracer.load_settings()
+            self.last_reload_error = None
+            logger.info(f"Config reloaded: version {active.version} → {candidate.version}")
+            return {'status': 'reloaded', 'previous_version': active.version, 'active': candidate.info()}
+
+    def config_watch_loop(self):
+        """Poll config.yaml's mtime and reload when it changes"""
+        logger.info("Config watcher started")
+        while self.running:
+            time.sleep(self.config.get('config_reload.poll_interval', 5))
+            try:
+                if self.running and self.config.changed_on_disk():
+                    self.reload_config()
+            except Exception as e:
+                logger.error(f"Error in config watcher: {e}")
+        logger.info("Config watcher stopped")
+
     def handle_alert(self, alert_data: dict) -> dict:
         start_time = time.time()
+        trace = self.tracer.begin(alert_data, start_time)
+        # Pin the config snapshot so a reload mid-action does not change its settings;
+        # DockerController calls made while handling the alert add spans to its trace
+        with self.config.pinned(), tracing.activate(self.tracer, trace):
+            if self.coalescer.enabled:
+                result = self.coalesce_alert(alert_data, start_time)
+            else:
+                result = self._handle_alert(alert_data, start_time)
+        self.metrics.observe_alert(alert_data.get('scenario'), result.get('status', 'unknown'), time.time() - start_time)
+        self.tracer.finish(trace, alert_data, start_time, result)
+        return result
+
+    def is_repeat_alert(self, alert_data: dict) -> bool:
+        """True if the alert's service already has a breach counted or is cooling down (not a new incident)"""
+        service_name = alert_data.get('service_name', alert_data.get('container_name'))
+        breach_key = service_name if self.coalescer.enabled else alert_data.get('container_id')
+        return breach_key in self.breach_counts or service_name in self.cooldowns
+
+    def coalesce_alert(self, alert_data: dict, start_time: float) -> dict:
+        """
+        Replicas of an overloaded service alert together; the first alert opens
+        a window, later ones join it and return at once, and the opener decides
+        once for the merged batch.
+        """
+        service_name = alert_data.get('service_name', alert_data.get('container_name'))
+        batch, opened = self.coalescer.submit(service_name, alert_data)
+        if not opened:
+            self.journal.record('alert_coalesced', service=service_name, node=alert_data.get('node'),
+                                container_id=alert_data.get('container_id'), scenario=alert_data.get('scenario'))
+            return {'status': 'coalesced', 'service': service_name, 'window_seconds': self.coalescer.window}
+
+        alerts = self.coalescer.wait_and_close(batch)
+        merged = self.coalescer.merge(alerts)
+        if 'trace' in alert_data:
+            # The decision belongs to the opener's trace, whichever replica the merge picked
+            merged = dict(merged, trace=alert_data['trace'])
+        if len(alerts) > 1:
+            logger.info(f"Coalesced {len(alerts)} alerts for {service_name} from {merged['nodes']} → {merged['scenario']}")
+        result = self._handle_alert(merged, start_time)
+        result['coalesced'] = len(alerts)
+        return result
+
+    def _handle_alert(self, alert_data: dict, start_time: float) -> dict:
+        recovery_id = new_recovery_id()
+        trace = tracing.current()
+        if trace is not None:
+            trace['recovery_id'] = recovery_id
         try:
             container_id = alert_data.get('container_id')
             service_name = alert_data.get('service_name', alert_data.get('container_name'))
@@ -44,52 +194,65 @@ class RecoveryManager:
             metrics = alert_data.get('metrics', {})
 
             logger.info(f"Alert: {service_name} on {node} - {scenario} - CPU={metrics.get('cpu_percent')}% MEM={metrics.get('memory_percent')}%")
-
-            if container_id not in self.breach_counts:
-                self.breach_counts[container_id] = 0
-            self.breach_counts[container_id] += 1
+            self.journal.record('alert_received', recovery_id=recovery_id, service=service_name, node=node,
+                                container_id=container_id, scenario=scenario, metrics=metrics,
+                                detected_at=alert_data.get('timestamp'), nodes=alert_data.get('nodes'),
+                                coalesced=alert_data.get('coalesced', 1), trace_id=trace and trace['trace_id'])
+            # The rule an alert is named after decides the action; custom rules carry their own
+            action = self.rule_engine.action_for(scenario)
+            if action is None:
+                self.journal.record('decision', recovery_id=recovery_id, service=service_name, outcome='unknown_scenario')
+                return {'status': 'error', 'message': f'Unknown scenario {scenario!r}'}
+
+            # A migration or scale-up may follow: get the image onto candidate nodes now
+            self.image_prepull.mark_at_risk(service_name)
+
+            # A coalesced window is one observation for the whole service, so
+            # breaches are counted per service; otherwise per container
+            breach_key = service_name if self.coalescer.enabled else container_id
+            self.breach_counts[breach_key] = self.breach_counts.get(breach_key, 0) + 1
 
             required_breaches = 2
-            if self.breach_counts[container_id] < required_breaches:
-                logger.info(f"Breach {self.breach_counts[container_id]}/{required_breaches} for {service_name} - waiting")
-                return {'status': 'waiting', 'breach_count': self.breach_counts[container_id]}
+            if self.breach_counts[breach_key] < required_breaches:
+                logger.info(f"Breach {self.breach_counts[breach_key]}/{required_breaches} for {service_name} - waiting")
+                self.journal.record('decision', recovery_id=recovery_id, service=service_name, outcome='waiting',
+                                    breach_count=self.breach_counts[breach_key])
+                return {'status': 'waiting', 'breach_count': self.breach_counts[breach_key]}
 
-            self.breach_counts[container_id] = 0
+            self.breach_counts.pop(breach_key, None)
+            phases = {'alert_received': start_time, 'breach_confirmed': time.time()}
+            self.journal.record('breach_confirmed', recovery_id=recovery_id, service=service_name, scenario=scenario)
 
             current_time = int(time.time())
-            if service_name in self.cooldowns:
-                # Different cooldown periods for different scenarios:
-                # - Migration: 60s (prevent rapid re-migrations)
-                # - Scale-up: 60s (PRD requirement: scale_up_cooldown)
-                # - Scale-down: 180s (PRD requirement: scale_down_cooldown, must be conservative)
-                if scenario == 'scenario1_migration':
-                    cooldown_period = 60
-                elif scenario == 'scenario2_scale_up' or scenario == 'scenario2_scaling':
-                    cooldown_period = self.config.get('scenarios.scenario2_scaling.scale_up_cooldown', 60)
-                elif scenario == 'scenario2_scale_down':
-                    cooldown_period = self.config.get('scenarios.scenario2_scaling.scale_down_cooldown', 180)
-                else:
-                    cooldown_period = 30  # Default
-
-                time_since_last = current_time - self.cooldowns[service_name]
-                if time_since_last < cooldown_period:
-                    logger.info(f"Cooldown active for {service_name}: {time_since_last}s < {cooldown_period}s")
-                    return {'status': 'cooldown', 'message': f'Cooldown active ({time_since_last}s/{cooldown_period}s)'}
+            cooldown = self.check_cooldown(service_name, action, current_time)
+            if cooldown:
+                self.journal.record('decision', recovery_id=recovery_id, service=service_name, outcome='cooldown',
+                                    message=cooldown['message'])
+                return cooldown
+            if self.drain_planner.draining(service_name):
+                self.journal.record('decision', recovery_id=recovery_id, service=service_name, outcome='draining')
+                return {'status': 'in_progress', 'message': f'{service_name} is being migrated by a drain plan'}
+
+            if action == 'migration' and self.drain_planner.enabled:
+                # Planned outside the lock so other migrations off the same node can join the window
+                self.journal.record('decision', recovery_id=recovery_id, service=service_name, outcome='migration',
+                                    planner='drain')
+                result = self.plan_migration(recovery_id, service_name, container_id, node, alert_data, phases, current_time)
+                result['recovery_id'] = recovery_id
+                return result
 
             with self.lock:
-                if scenario == 'scenario1_migration':
+                self.journal.record('decision', recovery_id=recovery_id, service=service_name, outcome=action)
+                if action == 'migration':
                     result = self.execute_migration(service_name, container_id, node, alert_data)
-                elif scenario == 'scenario2_scale_up':
-                    result = self.execute_scale_up(service_name, alert_data)
-                elif scenario == 'scenario2_scale_down':
-                    result = self.execute_scale_down(service_name, alert_data)
-                elif scenario == 'scenario2_scaling':
-                    # Legacy support for old scenario name (defaults to scale-up)
+                elif action == 'scale_up':
                     result = self.execute_scale_up(service_name, alert_data)
                 else:
-                    return {'status': 'error', 'message': 'Unknown scenario'}
+                    result = self.execute_scale_down(service_name, alert_data)
 
                 self.cooldowns[service_name] = current_time
+                self.record_action(recovery_id, service_name, action, result, phases, trace)
+                result['recovery_id'] = recovery_id
                 total_time = (time.time() - start_time) * 1000
                 logger.info(f"Alert processed in {total_time:.0f}ms")
                 if total_time > 1000:
@@ -98,8 +261,129 @@ class RecoveryManager:
 
         except Exception as e:
             logger.error(f"Error handling alert: {e}", exc_info=True)
+            self.journal.record('error', recovery_id=recovery_id, message=str(e))
             return {'status': 'error', 'message': str(e)}
 
+    def record_action(self, recovery_id: str, service_name: str, action: str, result: dict, phases: dict,
+                      trace: dict = None):
+        """Journal a finished recovery action with its phase timestamps, trace its phases and feed the Prometheus histograms"""
+        outcome = result.get('result') or {}
+        phases = dict(phases, **(outcome.get('phases') or {}))
+        if outcome.get('success'):
+            phases.setdefault('update_issued', time.time())
+        status = 'success' if outcome.get('success') else result.get('status', 'error')
+
+        self.journal.record('action_completed', recovery_id=recovery_id, service=service_name, action=action,
+                            status=status, phases={p: round(t, 3) for p, t in phases.items()},
+                            error=outcome.get('error') or result.get('message') or result.get('reason'),
+                            duration_seconds=outcome.get('duration_seconds'))
+        self.metrics.observe_recovery(action, status, phases)
+        self.tracer.record_phases(trace, phases, recovery_id=recovery_id, service=service_name, action=action, status=status)
+        if action in ('scale_up', 'scale_down') and outcome.get('duration_seconds') is not None:
+            self.metrics.observe_scale(action, bool(outcome.get('success')), outcome['duration_seconds'])
+
+    def check_cooldown(self, service_name: str, action: str, current_time: int):
+        """Returns a cooldown response if an action for service_name is still cooling down, else None"""
+        last_action = self.cooldowns.get(service_name)
+        if last_action is None:
+            return None
+
+        # Different cooldown periods for different actions:
+        # - Migration: 60s (prevent rapid re-migrations)
+        # - Scale-up: 60s (PRD requirement: scale_up_cooldown)
+        # - Scale-down: 180s (PRD requirement: scale_down_cooldown, must be conservative)
+        if action == 'migration':
+            cooldown_period = 60
+        elif action == 'scale_up':
+            cooldown_period = self.config.get('scenarios.scenario2_scaling.scale_up_cooldown', 60)
+        elif action == 'scale_down':
+            cooldown_period = self.config.get('scenarios.scenario2_scaling.scale_down_cooldown', 180)
+        else:
+            cooldown_period = 30  # Default
+
+        time_since_last = current_time - last_action
+        if time_since_last < cooldown_period:
+            logger.info(f"Cooldown active for {service_name}: {time_since_last}s < {cooldown_period}s")
+            return {'status': 'cooldown', 'message': f'Cooldown active ({time_since_last}s/{cooldown_period}s)'}
+        return None
+
+    def handle_samples(self, sample_data: dict) -> dict:
+        """
+        Ingest periodic per-container samples from an agent and, in predictive
+        mode, start scale_up when the forecast crosses the Scenario 2 thresholds
+        within the configured horizon.
+        """
+        with self.config.pinned():
+            return self._handle_samples(sample_data)
+
+    def _handle_samples(self, sample_data: dict) -> dict:
+        predictive = self.config.get('scenarios.scenario2_scaling.predictive', {}) or {}
+        enabled = predictive.get('enabled', False)
+        horizon = predictive.get('horizon_seconds', 15)
+        timestamp = sample_data.get('timestamp', time.time())
+        node = sample_data.get('node')
+        triggered = []
+
+        if node and sample_data.get('node_metrics'):
+            self.node_headroom.update(node, sample_data['node_metrics'])
+            self.timeseries.record('node', node, timestamp, sample_data['node_metrics'])
+        # Per-service means over this node's replicas; raw container samples when agents send no summary
+        summaries = sample_data.get('services')
+        if summaries:
+            for service_name, summary in summaries.items():
+                if self.shard.owns(service_name):
+                    self.timeseries.record('service', service_name, timestamp, summary, summary.get('replicas', 1))
+        if node and sample_data.get('images') is not None:
+            self.image_prepull.update_inventory(node, sample_data['images'])
+
+        for sample in sample_data.get('samples', []):
+            container_id = sample.get('container_id')
+            service_name = sample.get('service_name') or sample.get('container_name')
+            if not container_id or not service_name:
+                continue
+            self.forecaster.observe(container_id, service_name, sample.get('timestamp', timestamp), sample)
+            if not summaries:
+                self.timeseries.record('service', service_name, sample.get('timestamp', timestamp), sample)
+
+            if not enabled or service_name in triggered:
+                continue
+
+            thresholds = {
+                'cpu_percent': self.config.get('scenarios.scenario2_scaling.cpu_threshold', 75),
+                'memory_percent': self.config.get('scenarios.scenario2_scaling.memory_threshold', 80)
+            }
+            crossed = self.forecaster.crosses_within(container_id, horizon, thresholds)
+            if not crossed:
+                continue
+
+            # Only Scenario 2 load (high traffic) is a scale-up candidate; a
+            # CPU/MEM climb with low network is a migration case
+            predicted = self.forecaster.predict(container_id, horizon)
+            network_min = self.config.get('scenarios.scenario2_scaling.network_threshold_min', 65)
+            if predicted['network_percent'] <= network_min:
+                continue
+
+            current_time = int(time.time())
+            if self.check_cooldown(service_name, 'scale_up', current_time):
+                continue
+
+            logger.info(f"Predictive scale-up: {service_name} on {node} forecast to cross {crossed} within {horizon}s")
+            recovery_id = new_recovery_id()
+            decided = time.time()
+            self.journal.record('decision', recovery_id=recovery_id, service=service_name, outcome='scale_up',
+                                trigger='forecast', forecast=crossed)
+            with self.lock:
+                result = self.execute_scale_up(service_name, {'scenario': 'scenario2_scale_up', 'predictive': True,
+                                                              'forecast': crossed, 'metrics': predicted})
+                self.cooldowns[service_name] = current_time
+                self.record_action(recovery_id, service_name, 'scale_up', result, {'breach_confirmed': decided})
+            triggered.append(service_name)
+            logger.info(f"Predictive scale-up result for {service_name}: {result.get('status')}")
+
+        # The agent pulls these in the background before they are needed
+        return {'status': 'ok', 'predictive_enabled': enabled, 'triggered': triggered,
+                'prepull': self.image_prepull.pending_for(node)}
+
     def execute_migration(self, service_name: str, container_id: str, node: str, alert_data: dict) -> dict:
         logger.info(f"Executing migration for {service_name} from {node}")
         try:
@@ -110,31 +394,123 @@ class RecoveryManager:
                 logger.warning(f"Stale alert ignored: {service_name} reported on {node}, actually on {actual_node}")
                 return {'status': 'ignored', 'reason': 'stale_alert', 'reported_node': node, 'actual_node': actual_node}
 
-            result = self.docker_controller.migrate_container(service_name, node)
+            target_node = self.select_migration_target(service_name, node)
+            result = self.docker_controller.migrate_container(service_name, node, target_node)
 
             # SUCCESS: Extend cooldown to 60s after successful migration
             if result.get('success'):
                 self.cooldowns[service_name] = int(time.time())  # Reset cooldown after success
                 logger.info(f"Migration succeeded - cooldown extended to 60s")
 
-            return {'status': 'success', 'action': 'migration', 'service': service_name, 'from_node': node, 'result': result}
+            return {'status': 'success' if result.get('success') else 'error', 'action': 'migration', 'service': service_name,
+                    'from_node': node, 'result': result}
         except Exception as e:
             logger.error(f"Migration failed for {service_name}: {e}")
             return {'status': 'error', 'action': 'migration', 'message': str(e)}
 
+    def plan_migration(self, recovery_id: str, service_name: str, container_id: str, node: str, alert_data: dict,
+                       phases: dict, current_time: int) -> dict:
+        """
+        Join (or open) the drain window for node. The alert that opened it runs
+        a single migration if nothing else joined, otherwise one evacuation
+        plan for every service that did.
+        """
+        batch, opened = self.drain_planner.submit(node, {'service_name': service_name, 'container_id': container_id,
+                                                         'metrics': alert_data.get('metrics', {}),
+                                                         'recovery_id': recovery_id, 'phases': phases,
+                                                         'trace': tracing.current()})
+        if batch is None:
+            self.journal.record('decision', recovery_id=recovery_id, service=service_name, outcome='draining')
+            return {'status': 'in_progress', 'message': f'{service_name} is being migrated by a drain plan'}
+        if not opened:
+            self.journal.record('drain_joined', recovery_id=recovery_id, service=service_name, node=node)
+            return {'status': 'planned', 'action': 'migration', 'service': service_name, 'from_node': node}
+
+        migrations = self.drain_planner.wait_and_close(batch)
+        if len(migrations) == 1:
+            with self.lock:
+                result = self.execute_migration(service_name, container_id, node, alert_data)
+                self.cooldowns[service_name] = current_time
+                self.record_action(recovery_id, service_name, 'migration', result, phases, tracing.current())
+            return result
+
+        # The rollouts run without the manager lock (the planner keeps the
+        # services it is migrating out of other actions); only the bookkeeping takes it
+        plan = self.drain_planner.build_plan(node, migrations)
+        self.journal.record('drain_planned', recovery_id=recovery_id, plan_id=plan['plan_id'], node=node,
+                            assignments=plan['assignments'], skipped=plan['skipped'])
+        report = self.drain_planner.execute(plan)
+
+        with self.lock:
+            by_service = {m['service_name']: m for m in migrations}
+            for service, result in report['results'].items():
+                migration = by_service[service]
+                if result.get('success'):
+                    self.cooldowns[service] = int(time.time())
+                self.record_action(migration['recovery_id'], service, 'migration',
+                                   {'status': 'success' if result.get('success') else 'error', 'result': result},
+                                   migration['phases'], migration['trace'])
+            self.journal.record('drain_completed', recovery_id=recovery_id, plan_id=plan['plan_id'], node=node,
+                                succeeded=report['succeeded'], failed=report['failed'], total_seconds=report['total_seconds'])
+            self.metrics.observe_drain(len(report['results']), report['total_seconds'])
+
+        return {'status': 'success', 'action': 'drain', 'service': service_name, 'from_node': node, 'result': report}
+
+    def select_migration_target(self, service_name: str, from_node: str):
+        """
+        Schedulable node with the most cpu/mem/net headroom (nodes already
+        holding the service's image get a bonus), or None to let Swarm choose.
+        Only a single-replica service is pinned to it; a multi-replica one
+        stays eligible for every node but the source (see migrate_container)
+        """
+        candidates = [n for n in self.docker_controller.get_schedulable_nodes() if n != from_node]
+        warm = self.image_prepull.warm_bonus(service_name, candidates)
+        target_node, ranking = self.node_headroom.select_target(candidates, warm)
+        if target_node:
+            logger.info(f"Migration target for {service_name}: {target_node} (headroom scores: {ranking}, warm: {sorted(warm)})")
+        elif warm:
+            target_node = sorted(warm)[0]
+            logger.info(f"No fresh node metrics for {service_name} - choosing {target_node}, which holds its image")
+        else:
+            logger.info(f"No fresh node metrics for {service_name} candidates {candidates} - letting Swarm place the task")
+        return target_node
+
     def execute_scale_up(self, service_name: str, alert_data: dict) -> dict:
         logger.info(f"Executing scale-up for {service_name}")
         try:
-            result = self.docker_controller.scale_up(service_name)
+            # Warm pool services scale on their serving replicas; standbys take the new load at once
+            active = self.warm_pool.active_replicas(service_name) if self.warm_pool.pool_size(service_name) else None
+            if active is not None:
+                target = self.compute_target_replicas(service_name, alert_data.get('metrics', {}), active)
+                result = self.warm_pool.scale_up(service_name, active, target)
+            else:
+                started = time.time()
+                target = self.compute_target_replicas(service_name, alert_data.get('metrics', {}))
+                result = self.docker_controller.scale_up(service_name, target)
+                if result.get('success'):
+                    self.warm_pool.watch(service_name, 'cold', result['new_replicas'], started)
             return {'status': 'success', 'action': 'scale_up', 'service': service_name, 'result': result}
         except Exception as e:
             logger.error(f"Scale-up failed for {service_name}: {e}")
             return {'status': 'error', 'action': 'scale_up', 'message': str(e)}
 
+    def compute_target_replicas(self, service_name: str, metrics: dict, current_replicas: int = None):
+        """Proportional replica target for the observed per-replica utilization (None if replicas unknown)"""
+        if current_replicas is None:
+            current_replicas = self.docker_controller.get_replica_count(service_name)
+        if current_replicas is None:
+            return None
+        return self.replica_calculator.desired_replicas(service_name, current_replicas,
+                                                        metrics.get('cpu_percent', 0), metrics.get('memory_percent', 0),
+                                                        metrics.get('latency_p95_ms'), metrics.get('in_flight'))
+
     def execute_scale_down(self, service_name: str, alert_data: dict) -> dict:
         logger.info(f"Executing scale-down for {service_name}")
         try:
-            result = self.docker_controller.scale_down(service_name)
+            pool_size = self.warm_pool.pool_size(service_name)
+            active = self.warm_pool.active_replicas(service_name) if pool_size else None
+            target = self.compute_target_replicas(service_name, alert_data.get('metrics', {}), active)
+            result = self.docker_controller.scale_down(service_name, target + pool_size if target is not None else None)
             return {'status': 'success', 'action': 'scale_down', 'service': service_name, 'result': result}
         except Exception as e:
             logger.error(f"Scale-down failed for {service_name}: {e}")
@@ -154,76 +530,113 @@ class RecoveryManager:
                 if not self.running:
                     break
 
-                # Get list of services to monitor for autoscaling
-                # For now, we'll monitor all services that have >1 replica
-                services_to_check = self.docker_controller.get_autoscaling_services()
-
-                for service_name in services_to_check:
-                    try:
-                        # Get all tasks and their aggregate metrics
-                        aggregate = self.docker_controller.get_service_aggregate_metrics(service_name)
-                        if not aggregate:
-                            continue
-
-                        current_replicas = aggregate['replica_count']
-                        if current_replicas <= 1:
-                            continue  # Cannot scale below 1
-
-                        # PRD Formula: Scale down if total_usage < threshold * (N - 1)
-                        # This ensures remaining replicas can handle the load
-                        cpu_threshold = self.config.get('scenarios.scenario2_scaling.cpu_threshold', 75)
-                        mem_threshold = self.config.get('scenarios.scenario2_scaling.memory_threshold', 80)
-
-                        total_cpu = aggregate['total_cpu_percent']
-                        total_mem = aggregate['total_memory_percent']
-
-                        # Calculate if we can safely scale down
-                        # After removing 1 replica, the load would be distributed across (N-1) replicas
-                        can_scale_down_cpu = total_cpu < (cpu_threshold * (current_replicas - 1))
-                        can_scale_down_mem = total_mem < (mem_threshold * (current_replicas - 1))
-
-                        if can_scale_down_cpu and can_scale_down_mem:
-                            # Check cooldown (180s for scale-down per PRD)
-                            current_time = int(time.time())
-                            scale_down_cooldown = self.config.get('scenarios.scenario2_scaling.scale_down_cooldown', 180)
-
-                            if service_name in self.cooldowns:
-                                time_since_last = current_time - self.cooldowns[service_name]
-                                if time_since_last < scale_down_cooldown:
-                                    logger.debug(f"Scale-down cooldown active for {service_name}: {time_since_last}s < {scale_down_cooldown}s")
-                                    continue
+                with self.config.pinned():
+                    # Get list of services to monitor for autoscaling
+                    # For now, we'll monitor all services that have >1 replica
+                    services_to_check = [s for s in self.docker_controller.get_autoscaling_services() if self.shard.owns(s)]
 
-                            # Also check scale_down_last_checked to ensure idle for sustained period
-                            if service_name not in self.scale_down_last_checked:
-                                # First time seeing idle state, mark the time
-                                self.scale_down_last_checked[service_name] = current_time
-                                logger.info(f"Scale-down candidate: {service_name} idle detected (will scale down after {scale_down_cooldown}s)")
+                    for service_name in services_to_check:
+                        try:
+                            # Get all tasks and their aggregate metrics
+                            aggregate = self.docker_controller.get_service_aggregate_metrics(service_name)
+                            if not aggregate:
                                 continue
-                            else:
-                                # Check if idle for full cooldown period
-                                idle_duration = current_time - self.scale_down_last_checked[service_name]
-                                if idle_duration >= scale_down_cooldown:
-                                    # Scale down!
-                                    logger.info(f"Scale-down triggered: {service_name} idle for {idle_duration}s (threshold: {scale_down_cooldown}s)")
-                                    logger.info(f"Current: {current_replicas} replicas, CPU={total_cpu:.1f}%, MEM={total_mem:.1f}%")
-                                    logger.info(f"After scale-down: {current_replicas-1} replicas can handle load (CPU<{cpu_threshold*(current_replicas-1):.1f}%, MEM<{mem_threshold*(current_replicas-1):.1f}%)")
-
-                                    with self.lock:
-                                        result = self.docker_controller.scale_down(service_name)
-                                        if result.get('success'):
-                                            self.cooldowns[service_name] = current_time
-                                            self.scale_down_last_checked.pop(service_name, None)
-                                            logger.info(f"✅ Scale-down successful: {service_name} {current_replicas} → {current_replicas-1}")
+                            # Prefer the load agents actually reported over the last window
+                            observed = self.timeseries.aggregate('service', service_name)
+                            if observed and observed['mean']['cpu_percent'] is not None \
+                                    and observed['mean']['memory_percent'] is not None:
+                                aggregate = dict(aggregate, avg_cpu_percent=observed['mean']['cpu_percent'],
+                                                 avg_memory_percent=observed['mean']['memory_percent'],
+                                                 total_cpu_percent=observed['mean']['cpu_percent'] * aggregate['replica_count'],
+                                                 total_memory_percent=observed['mean']['memory_percent'] * aggregate['replica_count'])
+                            latency_p95 = observed['mean']['latency_p95_ms'] if observed else None
+                            in_flight = observed['mean']['in_flight'] if observed else None
+
+                            # Standby replicas of a warm pool are not serving capacity
+                            pool_size = self.warm_pool.pool_size(service_name)
+                            current_replicas = aggregate['replica_count'] - pool_size
+                            if current_replicas <= 1:
+                                continue  # Cannot scale below 1
+
+                            # PRD Formula: Scale down if total_usage < threshold * (N - 1)
+                            # This ensures remaining replicas can handle the load
+                            cpu_threshold = self.config.get('scenarios.scenario2_scaling.cpu_threshold', 75)
+                            mem_threshold = self.config.get('scenarios.scenario2_scaling.memory_threshold', 80)
+
+                            total_cpu = aggregate['total_cpu_percent']
+                            total_mem = aggregate['total_memory_percent']
+
+                            # Record a recommendation every check so the scale-down
+                            # stabilization window sees the whole idle period
+                            target_replicas = self.compute_target_replicas(
+                                service_name,
+                                {'cpu_percent': aggregate['avg_cpu_percent'], 'memory_percent': aggregate['avg_memory_percent'],
+                                 'latency_p95_ms': latency_p95, 'in_flight': in_flight},
+                                current_replicas)
+
+                            # Calculate if we can safely scale down
+                            # After removing 1 replica, the load would be distributed across (N-1) replicas
+                            can_scale_down_cpu = total_cpu < (cpu_threshold * (current_replicas - 1))
+                            can_scale_down_mem = total_mem < (mem_threshold * (current_replicas - 1))
+                            # Services scaled on latency: only while the p95 SLO holds and N-1 replicas
+                            # stay under the per-replica concurrency target
+                            target_latency = self.config.get('scenarios.scenario2_scaling.scaling.target_latency_p95_ms')
+                            target_in_flight = self.config.get('scenarios.scenario2_scaling.scaling.target_in_flight')
+                            can_scale_down_latency = not (target_latency and latency_p95 and latency_p95 >= target_latency)
+                            can_scale_down_concurrency = not (target_in_flight and in_flight and
+                                                              in_flight * current_replicas >= target_in_flight * (current_replicas - 1))
+
+                            if can_scale_down_cpu and can_scale_down_mem and can_scale_down_latency and can_scale_down_concurrency:
+                                # Check cooldown (180s for scale-down per PRD)
+                                current_time = int(time.time())
+                                scale_down_cooldown = self.config.get('scenarios.scenario2_scaling.scale_down_cooldown', 180)
+
+                                last_action = self.cooldowns.get(service_name)
+                                if last_action is not None:
+                                    time_since_last = current_time - last_action
+                                    if time_since_last < scale_down_cooldown:
+                                        logger.debug(f"Scale-down cooldown active for {service_name}: {time_since_last}s < {scale_down_cooldown}s")
+                                        continue
+
+                                # Also check scale_down_last_checked to ensure idle for sustained period
+                                idle_since = self.scale_down_last_checked.get(service_name)
+                                if idle_since is None:
+                                    # First time seeing idle state, mark the time
+                                    self.scale_down_last_checked[service_name] = current_time
+                                    logger.info(f"Scale-down candidate: {service_name} idle detected (will scale down after {scale_down_cooldown}s)")
+                                    continue
                                 else:
-                                    logger.debug(f"Scale-down candidate: {service_name} idle for {idle_duration}s (need {scale_down_cooldown}s)")
-                        else:
-                            # Not eligible for scale-down, reset idle timer
-                            if service_name in self.scale_down_last_checked:
-                                self.scale_down_last_checked.pop(service_name)
-                                logger.debug(f"Scale-down reset: {service_name} no longer idle (CPU={total_cpu:.1f}%, MEM={total_mem:.1f}%)")
+                                    # Check if idle for full cooldown period
+                                    idle_duration = current_time - idle_since
+                                    if idle_duration >= scale_down_cooldown:
+                                        # Scale down!
+                                        logger.info(f"Scale-down triggered: {service_name} idle for {idle_duration}s (threshold: {scale_down_cooldown}s)")
+                                        logger.info(f"Current: {current_replicas} replicas, CPU={total_cpu:.1f}%, MEM={total_mem:.1f}%")
+                                        logger.info(f"After scale-down: {current_replicas-1} replicas can handle load (CPU<{cpu_threshold*(current_replicas-1):.1f}%, MEM<{mem_threshold*(current_replicas-1):.1f}%)")
+
+                                        recovery_id = new_recovery_id()
+                                        decided = time.time()
+                                        self.journal.record('decision', recovery_id=recovery_id, service=service_name,
+                                                            outcome='scale_down', trigger='idle', idle_seconds=idle_duration)
+                                        with self.lock:
+                                            result = self.docker_controller.scale_down(
+                                                service_name, target_replicas + pool_size if target_replicas is not None else None)
+                                            self.record_action(recovery_id, service_name, 'scale_down',
+                                                               {'status': 'success' if result.get('success') else 'error',
+                                                                'result': result}, {'breach_confirmed': decided})
+                                            if result.get('success'):
+                                                self.cooldowns[service_name] = current_time
+                                                self.scale_down_last_checked.pop(service_name, None)
+                                                logger.info(f"✅ Scale-down successful: {service_name} {current_replicas} → {result['new_replicas']}")
+                                    else:
+                                        logger.debug(f"Scale-down candidate: {service_name} idle for {idle_duration}s (need {scale_down_cooldown}s)")
+                            else:
+                                # Not eligible for scale-down, reset idle timer
+                                if self.scale_down_last_checked.pop(service_name, None) is not None:
+                                    logger.debug(f"Scale-down reset: {service_name} no longer idle (CPU={total_cpu:.1f}%, MEM={total_mem:.1f}%)")
 
-                    except Exception as e:
-                        logger.error(f"Error checking scale-down for {service_name}: {e}")
+                        except Exception as e:
+                            logger.error(f"Error checking scale-down for {service_name}: {e}")
 
             except Exception as e:
                 logger.error(f"Error in scale-down monitoring thread: {e}", exc_info=True)
@@ -233,15 +646,35 @@ class RecoveryManager:
     def start_background_monitoring(self):
         """Start background thread for scale-down monitoring"""
         self.running = True
+        self.state_store.start()
+        self.shard.start()
+        self.image_prepull.start()
+        self.warm_pool.start()
+        self.placement_sync.start()
+        self.tracer.start()
+        if self.admission.enabled:
+            self.admission.start()
         self.monitor_thread = Thread(target=self.monitor_scale_down_thread, daemon=True)
         self.monitor_thread.start()
+        if self.config.get('config_reload.watch', True):
+            self.config_watch_thread = Thread(target=self.config_watch_loop, daemon=True)
+            self.config_watch_thread.start()
         logger.info("Background monitoring started")
 
     def stop_background_monitoring(self):
         """Stop background thread"""
         self.running = False
+        self.shard.stop()
+        self.admission.stop()
+        self.image_prepull.stop()
+        self.warm_pool.stop()
+        self.placement_sync.stop()
+        self.agent_streams.close()
         if self.monitor_thread:
             self.monitor_thread.join(timeout=5)
+        self.state_store.close()
+        self.journal.close()
+        self.tracer.stop()
         logger.info("Background monitoring stopped")
 
 
@@ -253,22 +686,165 @@ def health_check():
     return jsonify({'status': 'healthy', 'service': 'recovery-manager'})
 
 
-@app.route('/alert', methods=['POST'])
-def receive_alert():
+def process_alert(alert_data: dict, transport: str = 'http'):
+    """(body, status, headers) for an alert - shared by POST /alert and agent streams"""
     try:
-        alert_data = request.get_json()
         if not alert_data:
-            return jsonify({'status': 'error', 'message': 'No data provided'}), 400
+            return {'status': 'error', 'message': 'No data provided'}, 400, {}
+        # Stamped before admission, so the trace shows the time spent queued
+        recovery_manager.tracer.received(alert_data, transport)
+        if recovery_manager.admission.running:
+            admission = recovery_manager.admission.submit(alert_data)
+            if not admission.pop('accepted'):
+                return admission, 429, {'Retry-After': str(admission['retry_after'])}
+            return admission, 202, {}
         result = recovery_manager.handle_alert(alert_data)
-        return jsonify(result), 200
+        if recovery_manager.shard.enabled:
+            result['shard'] = recovery_manager.shard.worker_id
+        return result, 200, {}
     except Exception as e:
         logger.error(f"Error processing alert: {e}")
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        return {'status': 'error', 'message': str(e)}, 500, {}
+
+
+def process_samples(sample_data: dict):
+    """(body, status, headers) for a poll's samples - shared by POST /samples and agent streams"""
+    try:
+        if not sample_data:
+            return {'status': 'error', 'message': 'No data provided'}, 400, {}
+        return recovery_manager.handle_samples(sample_data), 200, {}
+    except Exception as e:
+        logger.error(f"Error processing samples: {e}")
+        return {'status': 'error', 'message': str(e)}, 500, {}
+
+
+@app.route('/alert', methods=['POST'])
+def receive_alert():
+    alert_data = request.get_json(silent=True)
+    # HTTP alerts carry their trace context as W3C traceparent/tracestate headers
+    if alert_data and 'trace' not in alert_data and tracing.carrier(request.headers):
+        alert_data['trace'] = tracing.carrier(request.headers)
+    body, status, headers = process_alert(alert_data)
+    return jsonify(body), status, headers
+
+
+@app.route('/samples', methods=['POST'])
+def receive_samples():
+    sample_data = request.get_json(silent=True)
+    # Agents without a stream post samples every poll; that is their liveness signal
+    recovery_manager.agent_streams.touch((sample_data or {}).get('node'), 'http')
+    body, status, headers = process_samples(sample_data)
+    return jsonify(body), status, headers
+
+
+@sock.route('/stream')
+def agent_stream(ws):
+    """Long-lived agent connection carrying msgpack alert/samples/heartbeat frames"""
+    recovery_manager.agent_streams.serve(ws, request.remote_addr)
+
+
+@app.route('/agents', methods=['GET'])
+def get_agents():
+    return jsonify({'agents': recovery_manager.agent_streams.snapshot()})
+
+
+@app.route('/forecast', methods=['GET'])
+def get_forecast_errors():
+    return jsonify({'method': recovery_manager.forecaster.method, 'series': len(recovery_manager.forecaster.series),
+                    'errors': recovery_manager.forecaster.error_report()})
+
+
+@app.route('/rules', methods=['GET'])
+def get_rules():
+    return jsonify({'version': recovery_manager.config.version, 'rules': recovery_manager.rule_engine.definitions})
+
+
+@app.route('/config', methods=['GET'])
+def get_config_version():
+    return jsonify({'active': recovery_manager.config.current.info(), 'path': recovery_manager.config.config_path,
+                    'last_reload_error': recovery_manager.last_reload_error})
+
+
+@app.route('/config/reload', methods=['POST'])
+def trigger_config_reload():
+    result = recovery_manager.reload_config(force=request.args.get('force', 'false').lower() == 'true')
+    return jsonify(result), (400 if result['status'] == 'error' else 200)
+
+
+@app.route('/drain', methods=['GET'])
+def get_last_drain_plan():
+    return jsonify({'planner': recovery_manager.drain_planner.stats(), 'last_plan': recovery_manager.drain_planner.last_plan})
+
+
+@app.route('/images', methods=['GET'])
+def get_image_prepull():
+    return jsonify(recovery_manager.image_prepull.snapshot())
+
+
+@app.route('/warm-pool', methods=['GET'])
+def get_warm_pool():
+    return jsonify(recovery_manager.warm_pool.snapshot())
+
+
+@app.route('/timeseries', methods=['GET'])
+def get_timeseries():
+    """Windowed aggregates: ?kind=service|node&name=..&window=seconds (every series of the kind without name)"""
+    store = recovery_manager.timeseries
+    kind = request.args.get('kind', 'service')
+    if kind not in ('service', 'node'):
+        return jsonify({'status': 'error', 'message': 'kind must be service or node'}), 400
+    window = request.args.get('window', type=float)
+    names = [request.args['name']] if request.args.get('name') else store.names(kind)
+    return jsonify({'kind': kind, 'window_seconds': window or store.default_window,
+                    'series': {name: store.aggregate(kind, name, window) for name in names},
+                    'store': store.stats()})
+
+
+@app.route('/nodes', methods=['GET'])
+def get_node_headroom():
+    return jsonify({'nodes': recovery_manager.node_headroom.snapshot()})
+
+
+@app.route('/shards', methods=['GET'])
+def get_shard_membership():
+    return jsonify(recovery_manager.shard.info())
+
+
+@app.route('/events', methods=['GET'])
+def get_events():
+    events = recovery_manager.journal.events(limit=int(request.args.get('limit', 100)),
+                                             recovery_id=request.args.get('recovery_id'),
+                                             service=request.args.get('service'))
+    return jsonify({'events': events, 'journal': recovery_manager.journal.path})
+
+
+@app.route('/traces', methods=['GET'])
+def get_traces():
+    """Recent spans, optionally of one trace (?trace_id=) or recovery (?recovery_id=); trace_view.py renders them"""
+    spans = recovery_manager.tracer.spans(trace_id=request.args.get('trace_id'),
+                                          recovery_id=request.args.get('recovery_id'),
+                                          limit=int(request.args.get('limit', 500)))
+    return jsonify({'spans': spans, 'tracing': recovery_manager.tracer.stats()})
+
+
+@app.route('/metrics/prometheus', methods=['GET'])
+def get_prometheus_metrics():
+    body, content_type = recovery_manager.metrics.exposition()
+    return Response(body, content_type=content_type)
 
 
 @app.route('/metrics', methods=['GET'])
 def get_metrics():
-    return jsonify({'metrics_cache_size': len(recovery_manager.metrics_cache), 'active_cooldowns': len(recovery_manager.cooldowns)})
+    return jsonify({'metrics_cache_size': len(recovery_manager.metrics_cache), 'active_cooldowns': len(recovery_manager.cooldowns),
+                    'state_store': recovery_manager.state_store.stats(), 'alert_coalescing': recovery_manager.coalescer.stats(),
+                    'alert_admission': recovery_manager.admission.stats(),
+                    'drain_planner': recovery_manager.drain_planner.stats(),
+                    'image_prepull': recovery_manager.image_prepull.stats(),
+                    'warm_pool': recovery_manager.warm_pool.stats(),
+                    'placement_sync': recovery_manager.placement_sync.stats(),
+                    'agent_stream': recovery_manager.agent_streams.stats(),
+                    'timeseries': recovery_manager.timeseries.stats(),
+                    'tracing': recovery_manager.tracer.stats()})
 
 
 def main():
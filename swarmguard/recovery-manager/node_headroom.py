@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Node Headroom Index - Live per-node cpu/mem/net headroom for migration target selection"""
+
+import time
+import logging
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+
+class NodeHeadroomIndex:
+    """
+    Keeps a smoothed view of each node's utilization from the node metrics
+    agents report every poll, and ranks candidate nodes by weighted headroom
+    (100 - utilization) so migrations land on the coolest node.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.nodes = {}  # hostname -> {'cpu', 'mem', 'net', 'updated'}
+        self.lock = Lock()
+        self.load_settings()
+        logger.info("Node headroom index initialized")
+
+    def load_settings(self):
+        selection = self.config.get('scenarios.scenario1_migration.target_selection', {}) or {}
+        self.enabled = selection.get('enabled', True)
+        self.cpu_weight = float(selection.get('cpu_weight', 0.5))
+        self.memory_weight = float(selection.get('memory_weight', 0.3))
+        self.network_weight = float(selection.get('network_weight', 0.2))
+        self.max_metric_age = float(selection.get('max_metric_age', 30))
+        self.smoothing = float(selection.get('smoothing', 0.5))
+        self.interface_capacity_mbps = float(selection.get('interface_capacity_mbps', 100.0))
+
+    def update(self, node: str, node_metrics: dict):
+        cpu = float(node_metrics.get('cpu_percent', 0))
+        mem = float(node_metrics.get('memory_percent', 0))
+        net_mbps = float(node_metrics.get('network_rx_mbps', 0)) + float(node_metrics.get('network_tx_mbps', 0))
+        net = min(100.0, net_mbps / self.interface_capacity_mbps * 100)
+
+        with self.lock:
+            entry = self.nodes.get(node)
+            if entry is None or time.time() - entry['updated'] > self.max_metric_age:
+                self.nodes[node] = {'cpu': cpu, 'mem': mem, 'net': net, 'updated': time.time()}
+                return
+            a = self.smoothing
+            entry['cpu'] = a * cpu + (1 - a) * entry['cpu']
+            entry['mem'] = a * mem + (1 - a) * entry['mem']
+            entry['net'] = a * net + (1 - a) * entry['net']
+            entry['updated'] = time.time()
+
+    def utilization(self, node: str):
+        """{'cpu', 'mem', 'net'} smoothed utilization, or None if no fresh metrics"""
+        with self.lock:
+            entry = self.nodes.get(node)
+            if entry is None or time.time() - entry['updated'] > self.max_metric_age:
+                return None
+            return {'cpu': entry['cpu'], 'mem': entry['mem'], 'net': entry['net']}
+
+    def weighted_headroom(self, cpu: float, mem: float, net: float) -> float:
+        total_weight = self.cpu_weight + self.memory_weight + self.network_weight
+        headroom = (self.cpu_weight * (100 - cpu) +
+                    self.memory_weight * (100 - mem) +
+                    self.network_weight * (100 - net))
+        return headroom / total_weight if total_weight > 0 else 0.0
+
+    def score(self, node: str):
+        """Weighted headroom 0-100 (higher is better), or None if no fresh metrics"""
+        entry = self.utilization(node)
+        if entry is None:
+            return None
+        return self.weighted_headroom(entry['cpu'], entry['mem'], entry['net'])
+
+    def rank(self, candidates: list, bonus: dict = None) -> list:
+        """[(node, score)] for candidates with fresh metrics, best first; bonus adds points per node"""
+        bonus = bonus or {}
+        scored = [(node, self.score(node)) for node in candidates]
+        scored = [(node, round(s + bonus.get(node, 0), 2)) for node, s in scored if s is not None]
+        return sorted(scored, key=lambda item: item[1], reverse=True)
+
+    def select_target(self, candidates: list, bonus: dict = None):
+        """(best_node, ranking) - best_node is None when no candidate has fresh metrics"""
+        if not self.enabled:
+            return None, []
+        ranking = self.rank(candidates, bonus)
+        return (ranking[0][0] if ranking else None), ranking
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            now = time.time()
+            return {node: {'cpu_percent': round(e['cpu'], 1), 'memory_percent': round(e['mem'], 1),
+                           'network_percent': round(e['net'], 1), 'age_seconds': round(now - e['updated'], 1)}
+                    for node, e in self.nodes.items()}
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Placement Sync - Keeps migration placement labels in step with the nodes of the swarm"""
+
+import time
+import logging
+from threading import Event, Thread
+
+logger = logging.getLogger(__name__)
+
+
+class PlacementSync:
+    """
+    A migrated service keeps its node.labels.swarmguard.placement.<service>.<gen>
+    constraint, so a node only takes its tasks while it carries that label.
+    Node events (a node joining, turning ready or active again) trigger a
+    reconcile that labels it; a full reconcile every reconcile_interval also
+    drops the labels of older generations and of removed services.
+    """
+
+    def __init__(self, config, docker_controller, owns=None):
+        self.config = config
+        self.docker_controller = docker_controller
+        self.owns = owns or (lambda service_name: True)
+        self.last_event_check = time.time()
+        self.last_reconcile = 0.0
+        self.reconciles = 0
+        self.nodes_updated = 0
+        self.failures = 0
+        self.wake = Event()
+        self.running = False
+        self.thread = None
+        self.load_settings()
+
+    def load_settings(self):
+        settings = self.config.get('placement_sync', {}) or {}
+        self.enabled = settings.get('enabled', True)
+        self.event_interval = float(settings.get('event_interval', 5.0))
+        self.reconcile_interval = float(settings.get('reconcile_interval', 300.0))
+
+    def reconcile(self, reason: str):
+        updated = self.docker_controller.reconcile_placement_labels(self.owns)
+        self.reconciles += 1
+        self.nodes_updated += updated
+        self.last_reconcile = time.time()
+        if updated:
+            logger.info(f"Placement labels reconciled on {updated} node(s) ({reason})")
+
+    def poll(self):
+        now = time.time()
+        events = self.docker_controller.node_events(self.last_event_check, now)
+        self.last_event_check = now
+        if events:
+            self.reconcile(f"{len(events)} node event(s)")
+        elif now - self.last_reconcile >= self.reconcile_interval:
+            self.reconcile('periodic')
+
+    def loop(self):
+        while self.running:
+            if self.enabled:
+                try:
+                    self.poll()
+                except Exception as e:
+                    self.failures += 1
+                    logger.error(f"Placement label sync failed: {e}")
+            self.wake.wait(self.event_interval)
+
+    def start(self):
+        self.running = True
+        self.thread = Thread(target=self.loop, daemon=True, name='placement-sync')
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+    def stats(self) -> dict:
+        return {'enabled': self.enabled, 'reconciles': self.reconciles, 'nodes_updated': self.nodes_updated,
+                'failures': self.failures}
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Recovery Metrics - Prometheus histograms for alert handling, recovery phases and scale operations"""
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+from event_journal import phase_durations
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60)
+RECOVERY_BUCKETS = (0.25, 0.5, 1, 2, 4, 6, 8, 10, 15, 20, 30, 45, 60, 90, 120)
+
+
+class RecoveryMetrics:
+    """Own registry so only SwarmGuard series are exported (no process/platform collectors)"""
+
+    def __init__(self):
+        self.registry = CollectorRegistry()
+        self.alerts = Counter('swarmguard_alerts_total', 'Alerts received by outcome',
+                              ['scenario', 'status'], registry=self.registry)
+        self.alert_handling = Histogram('swarmguard_alert_handling_seconds', 'Time to handle one alert request',
+                                        ['scenario', 'status'], buckets=LATENCY_BUCKETS, registry=self.registry)
+        self.recovery = Histogram('swarmguard_recovery_seconds', 'Alert received to recovery action finished (MTTR)',
+                                  ['action', 'status'], buckets=RECOVERY_BUCKETS, registry=self.registry)
+        self.phase = Histogram('swarmguard_recovery_phase_seconds', 'Time spent reaching each recovery phase',
+                               ['action', 'phase'], buckets=RECOVERY_BUCKETS, registry=self.registry)
+        self.scale_operation = Histogram('swarmguard_scale_operation_seconds', 'Docker scale call latency',
+                                         ['direction', 'status'], buckets=LATENCY_BUCKETS, registry=self.registry)
+        self.scale_ready = Histogram('swarmguard_scale_up_ready_seconds',
+                                     'Scale-up decision to the added replicas running, by warm_pool/partial/cold path',
+                                     ['path'], buckets=RECOVERY_BUCKETS, registry=self.registry)
+        self.drain = Histogram('swarmguard_drain_seconds', 'Overall completion time of a node evacuation plan',
+                               buckets=RECOVERY_BUCKETS, registry=self.registry)
+        self.drain_services = Histogram('swarmguard_drain_services', 'Services evacuated per drain plan',
+                                        buckets=(1, 2, 3, 5, 8, 13, 21), registry=self.registry)
+        self.queue_depth = Gauge('swarmguard_alert_queue_depth', 'Alerts waiting for a decision worker',
+                                 registry=self.registry)
+        self.queue_wait = Histogram('swarmguard_alert_queue_wait_seconds', 'Time an admitted alert waited in the queue',
+                                    buckets=LATENCY_BUCKETS, registry=self.registry)
+        self.admitted = Counter('swarmguard_alerts_admitted_total', 'Alerts admitted to the queue',
+                                ['priority'], registry=self.registry)
+        self.shed = Counter('swarmguard_alerts_shed_total', 'Alerts rejected or displaced by admission control',
+                            ['reason'], registry=self.registry)
+
+    def observe_alert(self, scenario: str, status: str, seconds: float):
+        scenario = scenario or 'unknown'
+        self.alerts.labels(scenario, status).inc()
+        self.alert_handling.labels(scenario, status).observe(seconds)
+
+    def observe_recovery(self, action: str, status: str, phases: dict):
+        """phases: {phase: wall-clock time}; MTTR runs from the first to the last recorded phase"""
+        if len(phases) < 2:
+            return
+        self.recovery.labels(action, status).observe(max(phases.values()) - min(phases.values()))
+        for phase, seconds in phase_durations(phases).items():
+            self.phase.labels(action, phase).observe(max(seconds, 0.0))
+
+    def observe_scale(self, direction: str, success: bool, seconds: float):
+        self.scale_operation.labels(direction, 'success' if success else 'failure').observe(seconds)
+
+    def observe_scale_ready(self, path: str, seconds: float):
+        self.scale_ready.labels(path).observe(seconds)
+
+    def observe_drain(self, services: int, seconds: float):
+        self.drain.observe(seconds)
+        self.drain_services.observe(services)
+
+    def observe_admitted(self, priority: str, depth: int):
+        self.admitted.labels(priority).inc()
+        self.queue_depth.set(depth)
+
+    def observe_queue(self, depth: int, waited: float):
+        self.queue_depth.set(depth)
+        self.queue_wait.observe(waited)
+
+    def observe_shed(self, reason: str):
+        self.shed.labels(reason).inc()
+
+    def exposition(self):
+        """(body, content_type) in the Prometheus text format"""
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
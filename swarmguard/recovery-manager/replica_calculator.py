@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Replica Calculator - Proportional target-replica computation (HPA-style)"""
+
+import math
+import time
+import logging
+from collections import deque
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaCalculator:
+    """
+    desired = ceil(current * observed / target), using the most loaded of
+    cpu/mem - and of p95 latency and concurrency per replica when
+    target_latency_p95_ms / target_in_flight are set and the alert carries
+    them. Changes within `tolerance` of the target are ignored, each step
+    is capped by max_scale_up_step / max_scale_down_step, and recommendations
+    are stabilized over a window (lowest recent one for scale-up, highest
+    recent one for scale-down) before being bounded by min/max_replicas.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.recommendations = {}  # service_name -> deque of (timestamp, desired)
+        self.lock = Lock()
+        logger.info("Replica calculator initialized")
+
+    def _scaling(self, key: str, default):
+        return self.config.get(f'scenarios.scenario2_scaling.scaling.{key}', default)
+
+    def raw_desired(self, current_replicas: int, cpu_percent: float, memory_percent: float,
+                    latency_p95_ms: float = None, in_flight: float = None) -> int:
+        target_cpu = self._scaling('target_cpu_percent', 60)
+        target_mem = self._scaling('target_memory_percent', 65)
+        target_latency = self._scaling('target_latency_p95_ms', None)
+        target_in_flight = self._scaling('target_in_flight', None)
+        tolerance = self._scaling('tolerance', 0.1)
+
+        ratios = [cpu_percent / target_cpu, memory_percent / target_mem]
+        if target_latency and latency_p95_ms is not None:
+            ratios.append(latency_p95_ms / target_latency)
+        if target_in_flight and in_flight is not None:
+            ratios.append(in_flight / target_in_flight)
+        ratio = max(ratios)
+        if abs(ratio - 1.0) <= tolerance:
+            return current_replicas
+        return max(1, math.ceil(current_replicas * ratio))
+
+    def desired_replicas(self, service_name: str, current_replicas: int, cpu_percent: float, memory_percent: float,
+                         latency_p95_ms: float = None, in_flight: float = None) -> int:
+        """
+        Stabilized, step-limited and bounded replica count for the observed
+        per-replica average cpu/mem utilization (and latency/concurrency).
+        """
+        min_replicas = self._scaling('min_replicas', 1)
+        max_replicas = self._scaling('max_replicas', 10)
+        up_window = self._scaling('scale_up_stabilization_seconds', 0)
+        down_window = self._scaling('scale_down_stabilization_seconds', 180)
+
+        raw = self.raw_desired(current_replicas, cpu_percent, memory_percent, latency_p95_ms, in_flight)
+        now = time.time()
+
+        with self.lock:
+            history = self.recommendations.setdefault(service_name, deque())
+            history.append((now, raw))
+            horizon = max(up_window, down_window)
+            while history and now - history[0][0] > horizon:
+                history.popleft()
+
+            if raw > current_replicas:
+                recent = [d for ts, d in history if now - ts <= up_window]
+                desired = min(recent) if recent else raw
+                desired = max(desired, current_replicas)
+            elif raw < current_replicas:
+                recent = [d for ts, d in history if now - ts <= down_window]
+                desired = max(recent) if recent else raw
+                desired = min(desired, current_replicas)
+            else:
+                desired = current_replicas
+
+        if desired > current_replicas:
+            desired = min(desired, current_replicas + self._scaling('max_scale_up_step', 4))
+        elif desired < current_replicas:
+            desired = max(desired, current_replicas - self._scaling('max_scale_down_step', 1))
+
+        desired = max(min_replicas, min(max_replicas, desired))
+        logger.info(f"Replica target for {service_name}: current={current_replicas}, raw={raw}, desired={desired} "
+                    f"(CPU={cpu_percent:.1f}%, MEM={memory_percent:.1f}%"
+                    + (f", p95={latency_p95_ms:.0f}ms" if latency_p95_ms is not None else '')
+                    + (f", in-flight={in_flight:.1f}" if in_flight is not None else '') + ")")
+        return desired
+
+    def forget(self, service_name: str):
+        with self.lock:
+            self.recommendations.pop(service_name, None)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""SwarmGuard Shard Router - Forwards alerts to the recovery manager worker owning the service"""
+
+import os
+import time
+import logging
+from collections import Counter
+from threading import Lock
+
+import requests
+from flask import Flask, request, jsonify
+from flask_sock import Sock
+
+from sharding import ConsistentHashRing
+from agent_stream import AgentStreams
+from tracing import carrier
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+sock = Sock(app)
+
+
+class ShardRouter:
+    """
+    Tracks live workers from their heartbeats, keeps a consistent-hash ring of
+    them and forwards each request to the owner of its service. Membership
+    changes (join, deregister, missed heartbeats, failed forward) bump the
+    epoch so workers rebuild their own view of the ring.
+    """
+
+    def __init__(self):
+        self.member_ttl = float(os.getenv('SHARD_MEMBER_TTL', '6'))
+        self.forward_timeout = float(os.getenv('SHARD_FORWARD_TIMEOUT', '60'))
+        self.members = {}  # worker_id -> {'url', 'last_seen'}
+        self.ring = ConsistentHashRing()
+        self.epoch = 0
+        self.lock = Lock()
+        self.session = requests.Session()
+        self.forwarded = Counter()  # worker_id -> requests forwarded (updated from request threads)
+        logger.info("Shard router initialized")
+
+    def _rebuild(self):
+        self.ring = ConsistentHashRing(self.members.keys())
+        self.epoch += 1
+        logger.info(f"Membership epoch {self.epoch}: {sorted(self.members)}")
+
+    def _expire(self):
+        now = time.time()
+        expired = [w for w, m in self.members.items() if now - m['last_seen'] > self.member_ttl]
+        for worker_id in expired:
+            logger.warning(f"Worker {worker_id} missed heartbeats - removing")
+            del self.members[worker_id]
+        if expired:
+            self._rebuild()
+
+    def register(self, worker_id: str, url: str) -> dict:
+        with self.lock:
+            self._expire()
+            known = self.members.get(worker_id)
+            self.members[worker_id] = {'url': url, 'last_seen': time.time()}
+            if known is None or known['url'] != url:
+                self._rebuild()
+            return {'epoch': self.epoch, 'members': sorted(self.members)}
+
+    def deregister(self, worker_id: str):
+        with self.lock:
+            if self.members.pop(worker_id, None) is not None:
+                self._rebuild()
+
+    def owner(self, service_name: str):
+        """(worker_id, url) owning the service, or (None, None) with no live workers"""
+        with self.lock:
+            self._expire()
+            worker_id = self.ring.get(service_name)
+            if worker_id is None:
+                return None, None
+            return worker_id, self.members[worker_id]['url']
+
+    def any_worker(self):
+        with self.lock:
+            self._expire()
+            for worker_id in sorted(self.members):
+                return worker_id, self.members[worker_id]['url']
+            return None, None
+
+    def mark_dead(self, worker_id: str):
+        with self.lock:
+            if self.members.pop(worker_id, None) is not None:
+                logger.warning(f"Worker {worker_id} unreachable - removing")
+                self._rebuild()
+
+    def forward(self, service_name: str, path: str, payload: dict):
+        """POST payload to the owning worker, retrying once on a new owner if it is unreachable"""
+        for _ in range(2):
+            worker_id, url = self.owner(service_name)
+            if worker_id is None:
+                return {'status': 'error', 'message': 'No recovery manager workers available'}, 503, {}
+            try:
+                response = self.session.post(f"{url}{path}", json=payload, timeout=self.forward_timeout)
+            except requests.ConnectionError:
+                self.mark_dead(worker_id)
+                continue
+            with self.lock:
+                self.forwarded[worker_id] += 1
+            headers = {'Retry-After': response.headers['Retry-After']} if 'Retry-After' in response.headers else {}
+            try:
+                return response.json(), response.status_code, headers
+            except ValueError:
+                logger.error(f"Worker {worker_id} answered {path} with HTTP {response.status_code} and no JSON body")
+                return {'status': 'error', 'message': f'Worker {worker_id} returned HTTP {response.status_code} '
+                                                      f'without a JSON body'}, 502, headers
+        return {'status': 'error', 'message': 'Owning worker unreachable'}, 503, {}
+
+    def broadcast(self, path: str, payloads: dict) -> dict:
+        """POST a payload per worker ({worker_id: payload}) - best effort; {worker_id: response JSON}"""
+        with self.lock:
+            targets = {w: self.members[w]['url'] for w in payloads if w in self.members}
+        responses = {}
+        for worker_id, url in targets.items():
+            try:
+                response = self.session.post(f"{url}{path}", json=payloads[worker_id], timeout=2)
+                if response.ok:
+                    responses[worker_id] = response.json()
+            except (requests.RequestException, ValueError) as e:
+                logger.warning(f"Forward to {worker_id} failed: {e}")
+        return responses
+
+    def info(self) -> dict:
+        with self.lock:
+            self._expire()
+            now = time.time()
+            return {'epoch': self.epoch,
+                    'members': {w: {'url': m['url'], 'last_seen_seconds': round(now - m['last_seen'], 1),
+                                    'forwarded': self.forwarded.get(w, 0)} for w, m in self.members.items()}}
+
+
+shard_router = ShardRouter()
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    info = shard_router.info()
+    return jsonify({'status': 'healthy' if info['members'] else 'degraded', 'service': 'recovery-manager-router',
+                    'workers': len(info['members'])})
+
+
+@app.route('/shards', methods=['GET'])
+def get_shards():
+    info = shard_router.info()
+    service = request.args.get('service')
+    if service:
+        info['owner'] = shard_router.owner(service)[0]
+    return jsonify(info)
+
+
+@app.route('/shards/register', methods=['POST'])
+def register_worker():
+    data = request.get_json() or {}
+    if not data.get('worker_id') or not data.get('url'):
+        return jsonify({'status': 'error', 'message': 'worker_id and url required'}), 400
+    return jsonify(shard_router.register(data['worker_id'], data['url']))
+
+
+@app.route('/shards/deregister', methods=['POST'])
+def deregister_worker():
+    data = request.get_json() or {}
+    shard_router.deregister(data.get('worker_id'))
+    return jsonify({'status': 'ok'})
+
+
+def forward_alert(alert_data: dict):
+    if not alert_data:
+        return {'status': 'error', 'message': 'No data provided'}, 400, {}
+    service_name = alert_data.get('service_name') or alert_data.get('container_name')
+    return shard_router.forward(service_name, '/alert', alert_data)
+
+
+def forward_samples(sample_data: dict):
+    """Split container samples by owning worker; node metrics go to every worker"""
+    if not sample_data:
+        return {'status': 'error', 'message': 'No data provided'}, 400, {}
+    base = {k: v for k, v in sample_data.items() if k != 'samples'}
+    payloads = {w: dict(base, samples=[]) for w in shard_router.info()['members']}
+    for sample in sample_data.get('samples', []):
+        worker_id, _ = shard_router.owner(sample.get('service_name') or sample.get('container_name') or '')
+        if worker_id in payloads:
+            payloads[worker_id]['samples'].append(sample)
+    responses = shard_router.broadcast('/samples', payloads)
+    # Each worker asks for the images of the services it owns
+    prepull = list(dict.fromkeys(image for r in responses.values() for image in r.get('prepull') or []))
+    return {'status': 'ok', 'workers': len(payloads), 'prepull': prepull}, 200, {}
+
+
+# Agents stream to the router, which forwards each frame to the owning worker over HTTP keep-alive
+agent_streams = AgentStreams({'alert': forward_alert, 'samples': forward_samples},
+                             heartbeat_timeout=float(os.getenv('STREAM_HEARTBEAT_TIMEOUT', '15')),
+                             dispatch_workers=int(os.getenv('STREAM_DISPATCH_WORKERS', '8')),
+                             alert_workers=int(os.getenv('STREAM_ALERT_WORKERS', '8')))
+
+
+@app.route('/alert', methods=['POST'])
+def route_alert():
+    alert_data = request.get_json(silent=True)
+    # Keep the agent's trace context on the hop to the worker
+    if alert_data and 'trace' not in alert_data and carrier(request.headers):
+        alert_data['trace'] = carrier(request.headers)
+    result, status, headers = forward_alert(alert_data)
+    return jsonify(result), status, headers
+
+
+@app.route('/samples', methods=['POST'])
+def route_samples():
+    sample_data = request.get_json(silent=True)
+    agent_streams.touch((sample_data or {}).get('node'), 'http')
+    result, status, headers = forward_samples(sample_data)
+    return jsonify(result), status, headers
+
+
+@sock.route('/stream')
+def route_stream(ws):
+    agent_streams.serve(ws, request.remote_addr)
+
+
+@app.route('/agents', methods=['GET'])
+def get_agents():
+    return jsonify({'agents': agent_streams.snapshot(), 'stream': agent_streams.stats()})
+
+
+@app.route('/rules', methods=['GET'])
+@app.route('/config', methods=['GET'])
+def route_any_worker():
+    worker_id, url = shard_router.any_worker()
+    if worker_id is None:
+        return jsonify({'status': 'error', 'message': 'No recovery manager workers available'}), 503
+    try:
+        response = shard_router.session.get(f"{url}{request.path}", timeout=2)
+        return jsonify(response.json()), response.status_code
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"{request.path} from {worker_id} failed: {e}")
+        return jsonify({'status': 'error', 'message': f'Worker {worker_id} failed: {e}'}), 502
+
+
+def main():
+    host = os.getenv('FLASK_HOST', '0.0.0.0')
+    port = int(os.getenv('FLASK_PORT', '5000'))
+    logger.info(f"Starting shard router on {host}:{port}")
+    app.run(host=host, port=port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Rule Compiler - Compiles declarative threshold rules into fast callables
+
+This is the only copy: the monitoring agent image copies it in from this
+directory (see BUILD_AND_PUSH.md) and agent.py imports it from here when run
+from a source checkout.
+
+A rule is {'name', 'action', 'when', 'enabled', 'params'}. 'action' is what
+the recovery manager does when the rule fires (migration, scale_up or
+scale_down); rules named after a built-in scenario may leave it out. 'when' is a boolean
+expression over the latest sample and rolling statistics, e.g.
+
+    (cpu > cpu_threshold or mem > memory_threshold) and net < network_threshold_max
+    avg(cpu, 3) > 80 and delta(mem, 6) > 10
+
+Names: cpu, mem, net (percent of the latest sample), p95 (request latency,
+ms) and inflight (mean concurrent requests) over the last poll, and any key
+in 'params'. p95 and inflight exist only for tasks that export latency
+(web-stress latency.py); elsewhere they are NaN, so comparisons on them are
+false and a latency rule never fires for a task that cannot measure it.
+Rolling functions: avg, min, max, std, delta (last - first) over the last N
+samples. Until N samples exist a rolling value is NaN, so comparisons on it
+are false. Each rule is validated once against a whitelisted AST and compiled
+into a scalar callable and a vectorized NumPy callable.
+"""
+
+import ast
+import math
+import logging
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+METRIC_NAMES = ('cpu', 'mem', 'net', 'p95', 'inflight')
+OPTIONAL_METRICS = ('p95', 'inflight')  # NaN when a sample does not carry them
+ROLLING_FUNCTIONS = ('avg', 'min', 'max', 'std', 'delta')
+ACTIONS = ('migration', 'scale_up', 'scale_down')
+
+# Action of the scenario names alerts have always carried
+SCENARIO_ACTIONS = {'scenario1_migration': 'migration', 'scenario2_scaling': 'scale_up',
+                    'scenario2_scale_up': 'scale_up', 'scenario2_scale_down': 'scale_down'}
+
+# Built-in scenario rules; thresholds come from params
+DEFAULT_RULES = [
+    {'name': 'scenario1_migration', 'action': 'migration',
+     'when': '(cpu > cpu_threshold or mem > memory_threshold) and net < network_threshold_max'},
+    {'name': 'scenario2_scaling', 'action': 'scale_up',
+     'when': '(cpu > cpu_threshold or mem > memory_threshold) and net > network_threshold_min'},
+]
+
+
+class RuleError(ValueError):
+    """Raised when a rule definition is invalid"""
+
+
+def metrics_to_sample(metrics: dict) -> dict:
+    """Map alert/agent metric keys onto rule variable names"""
+    return {'cpu': float(metrics.get('cpu_percent', 0)),
+            'mem': float(metrics.get('memory_percent', 0)),
+            'net': float(metrics.get('network_percent', 0)),
+            'p95': float(metrics.get('latency_p95_ms', math.nan)),
+            'inflight': float(metrics.get('in_flight', math.nan))}
+
+
+def _window(seq, n):
+    values = list(seq)[-n:]
+    return values if len(values) == n else None
+
+
+def _avg(seq, n):
+    w = _window(seq, n)
+    return sum(w) / n if w else math.nan
+
+
+def _min(seq, n):
+    w = _window(seq, n)
+    return min(w) if w else math.nan
+
+
+def _max(seq, n):
+    w = _window(seq, n)
+    return max(w) if w else math.nan
+
+
+def _std(seq, n):
+    w = _window(seq, n)
+    if not w:
+        return math.nan
+    mean = sum(w) / n
+    return math.sqrt(sum((x - mean) ** 2 for x in w) / n)
+
+
+def _delta(seq, n):
+    w = _window(seq, n)
+    return w[-1] - w[0] if w else math.nan
+
+
+def _vavg(h, n):
+    return np.mean(h[:, -n:], axis=1)
+
+
+def _vmin(h, n):
+    return np.min(h[:, -n:], axis=1)
+
+
+def _vmax(h, n):
+    return np.max(h[:, -n:], axis=1)
+
+
+def _vstd(h, n):
+    return np.std(h[:, -n:], axis=1)
+
+
+def _vdelta(h, n):
+    return h[:, -1] - h[:, -n]
+
+
+_SCALAR_NAMESPACE = {'_avg': _avg, '_min': _min, '_max': _max, '_std': _std, '_delta': _delta, '_nan': math.nan}
+_VECTOR_NAMESPACE = {'_vavg': _vavg, '_vmin': _vmin, '_vmax': _vmax, '_vstd': _vstd, '_vdelta': _vdelta}
+
+_COMPARE_OPS = {ast.Gt: '>', ast.GtE: '>=', ast.Lt: '<', ast.LtE: '<=', ast.Eq: '==', ast.NotEq: '!='}
+_BIN_OPS = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/'}
+
+
+class _Translator:
+    """Translates a validated rule AST into scalar or vectorized Python source"""
+
+    def __init__(self, name: str, params: dict, vector: bool):
+        self.name = name
+        self.params = params
+        self.vector = vector
+        self.window = 1
+
+    def fail(self, message: str):
+        raise RuleError(f"Rule '{self.name}': {message}")
+
+    def visit(self, node) -> str:
+        if isinstance(node, ast.BoolOp):
+            parts = [self.visit(v) for v in node.values]
+            if self.vector:
+                fn = 'logical_and' if isinstance(node.op, ast.And) else 'logical_or'
+                return f"_np.{fn}.reduce([{', '.join(parts)}])"
+            joiner = ' and ' if isinstance(node.op, ast.And) else ' or '
+            return f"({joiner.join(parts)})"
+        if isinstance(node, ast.UnaryOp):
+            operand = self.visit(node.operand)
+            if isinstance(node.op, ast.Not):
+                return f"_np.logical_not({operand})" if self.vector else f"(not {operand})"
+            if isinstance(node.op, ast.USub):
+                return f"(-{operand})"
+            self.fail(f"unsupported unary operator {type(node.op).__name__}")
+        if isinstance(node, ast.Compare):
+            terms = [self.visit(node.left)] + [self.visit(c) for c in node.comparators]
+            pairs = []
+            for i, op in enumerate(node.ops):
+                if type(op) not in _COMPARE_OPS:
+                    self.fail(f"unsupported comparison {type(op).__name__}")
+                pairs.append(f"({terms[i]} {_COMPARE_OPS[type(op)]} {terms[i + 1]})")
+            if len(pairs) == 1:
+                return pairs[0]
+            if self.vector:
+                return f"_np.logical_and.reduce([{', '.join(pairs)}])"
+            return f"({' and '.join(pairs)})"
+        if isinstance(node, ast.BinOp):
+            if type(node.op) not in _BIN_OPS:
+                self.fail(f"unsupported operator {type(node.op).__name__}")
+            return f"({self.visit(node.left)} {_BIN_OPS[type(node.op)]} {self.visit(node.right)})"
+        if isinstance(node, ast.Name):
+            if node.id in OPTIONAL_METRICS and not self.vector:
+                return f"cur.get({node.id!r}, _nan)"
+            if node.id in METRIC_NAMES:
+                return f"cur[{node.id!r}]"
+            if node.id in self.params:
+                try:
+                    return repr(float(self.params[node.id]))
+                except (TypeError, ValueError):
+                    self.fail(f"param '{node.id}' is not numeric")
+            self.fail(f"unknown name '{node.id}'")
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                self.fail(f"unsupported constant {node.value!r}")
+            return repr(float(node.value))
+        if isinstance(node, ast.Call):
+            return self.visit_call(node)
+        self.fail(f"unsupported syntax {type(node).__name__}")
+
+    def visit_call(self, node) -> str:
+        if not isinstance(node.func, ast.Name) or node.func.id not in ROLLING_FUNCTIONS:
+            self.fail(f"unknown function (allowed: {', '.join(ROLLING_FUNCTIONS)})")
+        if node.keywords or len(node.args) != 2:
+            self.fail(f"{node.func.id}() takes (metric, samples)")
+        metric, size = node.args
+        if not isinstance(metric, ast.Name) or metric.id not in METRIC_NAMES:
+            self.fail(f"{node.func.id}() metric must be one of {', '.join(METRIC_NAMES)}")
+        if isinstance(size, ast.Name) and size.id in self.params:
+            n = self.params[size.id]
+        elif isinstance(size, ast.Constant):
+            n = size.value
+        else:
+            self.fail(f"{node.func.id}() window must be an integer")
+        if isinstance(n, bool) or not isinstance(n, int) or n < 1:
+            self.fail(f"{node.func.id}() window must be a positive integer")
+        self.window = max(self.window, n)
+        prefix = '_v' if self.vector else '_'
+        return f"{prefix}{node.func.id}(hist[{metric.id!r}], {n})"
+
+
+class CompiledRule:
+    def __init__(self, definition: dict):
+        self.name = definition.get('name')
+        if not self.name:
+            raise RuleError("Rule without a name")
+        self.expression = definition.get('when')
+        if not self.expression:
+            raise RuleError(f"Rule '{self.name}': missing 'when' expression")
+        self.action = definition.get('action') or SCENARIO_ACTIONS.get(self.name)
+        if self.action not in ACTIONS:
+            raise RuleError(f"Rule '{self.name}': action must be one of {', '.join(ACTIONS)}"
+                            f"{f' (got {self.action!r})' if self.action else ''}")
+        self.enabled = bool(definition.get('enabled', True))
+        self.params = dict(definition.get('params') or {})
+
+        try:
+            tree = ast.parse(self.expression, mode='eval')
+        except SyntaxError as e:
+            raise RuleError(f"Rule '{self.name}': {e.msg}")
+
+        scalar = _Translator(self.name, self.params, vector=False)
+        scalar_src = scalar.visit(tree.body)
+        self.window = scalar.window
+        self.scalar = eval(compile(f"lambda cur, hist: {scalar_src}", f"<rule {self.name}>", 'eval'),
+                           dict(_SCALAR_NAMESPACE))
+
+        self.vector = None
+        if np is not None:
+            vector_src = _Translator(self.name, self.params, vector=True).visit(tree.body)
+            namespace = dict(_VECTOR_NAMESPACE)
+            namespace['_np'] = np
+            self.vector = eval(compile(f"lambda cur, hist: {vector_src}", f"<rule {self.name}>", 'eval'), namespace)
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'action': self.action, 'when': self.expression, 'enabled': self.enabled, 'params': self.params}
+
+
+class RuleSet:
+    """An ordered, compiled set of rules; the first enabled match wins"""
+
+    def __init__(self, rules: list):
+        self.rules = rules
+        self.enabled_rules = [r for r in rules if r.enabled]
+        self.by_name = {r.name: r for r in rules}
+        self.history_size = max([r.window for r in rules] + [1])
+
+    def action_for(self, name: str):
+        """Action of the rule (or built-in scenario) an alert is named after, None if unknown"""
+        rule = self.by_name.get(name)
+        return rule.action if rule is not None else SCENARIO_ACTIONS.get(name)
+
+    def matches(self, name: str, sample: dict, history: dict = None) -> bool:
+        rule = self.by_name.get(name)
+        if rule is None or not rule.enabled:
+            return False
+        return bool(rule.scalar(sample, history or {m: [sample.get(m, math.nan)] for m in METRIC_NAMES}))
+
+    def evaluate(self, sample: dict, history: dict = None):
+        """Name of the first enabled rule matching one sample, or None"""
+        if history is None:
+            history = {m: [sample.get(m, math.nan)] for m in METRIC_NAMES}
+        for rule in self.enabled_rules:
+            if rule.scalar(sample, history):
+                return rule.name
+        return None
+
+    def evaluate_batch(self, columns: dict, history: dict = None) -> dict:
+        """
+        Vectorized evaluation over a batch of samples.
+        columns: {'cpu': array(n), 'mem': array(n), 'net': array(n), ...} (missing p95/inflight are NaN)
+        history: {metric: array(n, history_size)}, oldest first, NaN-padded
+        Returns {rule_name: bool array(n)} for enabled rules.
+        """
+        if np is None:
+            raise RuntimeError("NumPy is required for batch rule evaluation")
+        size = len(columns['cpu'])
+        cur = {m: np.asarray(columns[m], dtype=float) if m in columns else np.full(size, np.nan) for m in METRIC_NAMES}
+        if history is None:
+            history = {}
+            for m in METRIC_NAMES:
+                history[m] = np.full((len(cur[m]), self.history_size), np.nan)
+                history[m][:, -1] = cur[m]
+        masks = {}
+        with np.errstate(invalid='ignore'):
+            for rule in self.enabled_rules:
+                masks[rule.name] = np.broadcast_to(np.asarray(rule.vector(cur, history), dtype=bool), cur['cpu'].shape)
+        return masks
+
+    def first_match_batch(self, columns: dict, history: dict = None) -> list:
+        """Per-row name of the first matching rule (or None), in rule order"""
+        masks = self.evaluate_batch(columns, history)
+        first = np.full(len(columns['cpu']), -1)
+        for index in range(len(self.enabled_rules) - 1, -1, -1):
+            first[masks[self.enabled_rules[index].name]] = index
+        names = [rule.name for rule in self.enabled_rules]
+        return [names[i] if i >= 0 else None for i in first.tolist()]
+
+    def to_list(self) -> list:
+        return [r.to_dict() for r in self.rules]
+
+
+def compile_rules(definitions: list) -> RuleSet:
+    """Validate and compile rule definitions (raises RuleError)"""
+    if not isinstance(definitions, list):
+        raise RuleError("Rules must be a list")
+    rules = [CompiledRule(d) for d in definitions]
+    names = [r.name for r in rules]
+    duplicates = {n for n in names if names.count(n) > 1}
+    if duplicates:
+        raise RuleError(f"Duplicate rule names: {sorted(duplicates)}")
+    logger.info(f"Compiled {len(rules)} rules (history window {max([r.window for r in rules] + [1])})")
+    return RuleSet(rules)
+
+
+class RollingHistory:
+    """Bounded per-key sample history feeding rolling rule functions"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.samples = {}  # key -> {metric: deque}
+
+    def resize(self, size: int):
+        if size != self.size:
+            self.size = size
+            self.samples = {k: {m: deque(v, maxlen=size) for m, v in h.items()} for k, h in self.samples.items()}
+
+    def push(self, key: str, sample: dict) -> dict:
+        history = self.samples.get(key)
+        if history is None:
+            history = {m: deque(maxlen=self.size) for m in METRIC_NAMES}
+            self.samples[key] = history
+        for m in METRIC_NAMES:
+            history[m].append(sample.get(m, math.nan))
+        return history
+
+    def matrix(self, keys: list) -> dict:
+        """{metric: array(len(keys), size)} with NaN left-padding for short histories"""
+        out = {m: np.full((len(keys), self.size), np.nan) for m in METRIC_NAMES}
+        for row, key in enumerate(keys):
+            history = self.samples.get(key)
+            if not history:
+                continue
+            for m in METRIC_NAMES:
+                values = history[m]
+                if values:
+                    out[m][row, self.size - len(values):] = list(values)
+        return out
+
+    def prune(self, active_keys):
+        active = set(active_keys)
+        for key in [k for k in self.samples if k not in active]:
+            del self.samples[key]
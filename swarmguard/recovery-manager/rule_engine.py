@@ -3,32 +3,52 @@
 
 import logging
 
+from rule_compiler import DEFAULT_RULES, SCENARIO_ACTIONS, compile_rules, metrics_to_sample
+
 logger = logging.getLogger(__name__)
 
 
+def resolve_rule_definitions(config) -> list:
+    """
+    Rule definitions from the 'rules' config section (or the built-in scenario
+    rules). A rule named after a scenario takes its enabled flag and numeric
+    params from scenarios.<name>; the rule's own 'params' override them.
+    """
+    definitions = config.get('rules') or DEFAULT_RULES
+    resolved = []
+    for definition in definitions:
+        scenario = config.get(f"scenarios.{definition.get('name')}", {}) or {}
+        params = {k: v for k, v in scenario.items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+        params.update(definition.get('params') or {})
+        resolved.append({
+            'name': definition.get('name'),
+            'action': definition.get('action') or SCENARIO_ACTIONS.get(definition.get('name')),
+            'when': definition.get('when'),
+            'enabled': definition.get('enabled', scenario.get('enabled', True)),
+            'params': params
+        })
+    return resolved
+
+
 class RuleEngine:
     def __init__(self, config):
         self.config = config
-        self.scenario1_config = config.get('scenarios.scenario1_migration', {})
-        self.scenario2_config = config.get('scenarios.scenario2_scaling', {})
-        logger.info("Rule engine initialized")
+        self.definitions = resolve_rule_definitions(config)
+        self.rule_set = compile_rules(self.definitions)
+        logger.info(f"Rule engine initialized: {[r.name for r in self.rule_set.rules]}")
+
+    def evaluate(self, metrics: dict, history: dict = None):
+        """Name of the first matching rule for one container's metrics, or None"""
+        return self.rule_set.evaluate(metrics_to_sample(metrics), history)
+
+    def action_for(self, scenario: str):
+        return self.rule_set.action_for(scenario)
+
+    def evaluate_batch(self, columns: dict, history: dict = None) -> dict:
+        return self.rule_set.evaluate_batch(columns, history)
 
     def evaluate_scenario1(self, metrics: dict) -> bool:
-        if not self.scenario1_config.get('enabled', True):
-            return False
-        cpu = metrics.get('cpu_percent', 0)
-        mem = metrics.get('memory_percent', 0)
-        net = metrics.get('network_percent', 0)
-        return ((cpu > self.scenario1_config.get('cpu_threshold', 75) or
-                mem > self.scenario1_config.get('memory_threshold', 80)) and
-                net < self.scenario1_config.get('network_threshold_max', 35))
+        return self.rule_set.matches('scenario1_migration', metrics_to_sample(metrics))
 
     def evaluate_scenario2(self, metrics: dict) -> bool:
-        if not self.scenario2_config.get('enabled', True):
-            return False
-        cpu = metrics.get('cpu_percent', 0)
-        mem = metrics.get('memory_percent', 0)
-        net = metrics.get('network_percent', 0)
-        return ((cpu > self.scenario2_config.get('cpu_threshold', 75) or
-                mem > self.scenario2_config.get('memory_threshold', 80)) and
-                net > self.scenario2_config.get('network_threshold_min', 65))
+        return self.rule_set.matches('scenario2_scaling', metrics_to_sample(metrics))
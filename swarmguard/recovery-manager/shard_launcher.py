@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Shard Launcher - Runs the shard router plus N recovery manager workers as local processes"""
+
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import subprocess
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def spawn(script: str, env: dict) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, os.path.join(HERE, script)], env=dict(os.environ, **env))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a sharded recovery manager on this host')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('MANAGER_WORKERS', '2')))
+    parser.add_argument('--router-port', type=int, default=int(os.getenv('FLASK_PORT', '5000')))
+    parser.add_argument('--worker-base-port', type=int, default=5101)
+    parser.add_argument('--host', default='127.0.0.1', help='Address workers listen on and advertise')
+    parser.add_argument('--restart', action='store_true', help='Restart workers that exit')
+    args = parser.parse_args()
+
+    router_url = f"http://127.0.0.1:{args.router_port}"
+    router = spawn('router.py', {'FLASK_PORT': str(args.router_port)})
+    workers = {}
+
+    def start_worker(index: int):
+        port = args.worker_base_port + index
+        workers[index] = spawn('manager.py', {
+            'FLASK_HOST': args.host,
+            'FLASK_PORT': str(port),
+            'SHARD_ROUTER_URL': router_url,
+            'SHARD_WORKER_ID': f"worker-{index}",
+            'SHARD_ADVERTISE_URL': f"http://{args.host}:{port}",
+        })
+        logger.info(f"Started worker-{index} on port {port} (pid {workers[index].pid})")
+
+    for index in range(args.workers):
+        start_worker(index)
+
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    # A worker that exits is dropped by the router after missed heartbeats and
+    # its services rebalance onto the others (and back when it is restarted)
+    while not stopping:
+        time.sleep(1)
+        if router.poll() is not None and not stopping:
+            logger.error(f"Router exited ({router.returncode}) - restarting")
+            router = spawn('router.py', {'FLASK_PORT': str(args.router_port)})
+        for index, process in list(workers.items()):
+            if process.poll() is not None and args.restart:
+                logger.warning(f"worker-{index} exited ({process.returncode}) - restarting")
+                start_worker(index)
+
+    logger.info("Stopping shards")
+    for process in list(workers.values()) + [router]:
+        process.terminate()
+    for process in list(workers.values()) + [router]:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+if __name__ == '__main__':
+    main()
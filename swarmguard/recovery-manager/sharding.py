@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Sharding - Consistent-hash ownership of services across recovery manager workers"""
+
+import os
+import bisect
+import socket
+import hashlib
+import logging
+from threading import Lock, Thread, Event
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class ConsistentHashRing:
+    """Maps keys (service names) onto members with virtual nodes for an even spread"""
+
+    def __init__(self, members=(), vnodes: int = 100):
+        self.vnodes = vnodes
+        self.members = set()
+        self.hashes = []
+        self.owners = {}
+        for member in members:
+            self.add(member)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int(hashlib.md5(value.encode()).hexdigest()[:16], 16)
+
+    def add(self, member: str):
+        if member in self.members:
+            return
+        self.members.add(member)
+        for i in range(self.vnodes):
+            h = self._hash(f"{member}#{i}")
+            self.owners[h] = member
+            bisect.insort(self.hashes, h)
+
+    def remove(self, member: str):
+        if member not in self.members:
+            return
+        self.members.discard(member)
+        for i in range(self.vnodes):
+            h = self._hash(f"{member}#{i}")
+            del self.owners[h]
+            self.hashes.remove(h)
+
+    def get(self, key: str):
+        """Owning member for key, or None if the ring is empty"""
+        if not self.hashes:
+            return None
+        index = bisect.bisect(self.hashes, self._hash(key)) % len(self.hashes)
+        return self.owners[self.hashes[index]]
+
+
+class ShardMembership:
+    """
+    Worker side of sharding: heartbeats to the router, mirrors the member list
+    it returns into a local ring, and answers whether this worker owns a
+    service. Until the first heartbeat returns the membership it owns nothing,
+    so a joining worker cannot act on services another worker owns. Without
+    SHARD_ROUTER_URL the worker owns everything.
+    """
+
+    def __init__(self, port: int, on_rebalance=None):
+        self.router_url = os.getenv('SHARD_ROUTER_URL')
+        self.worker_id = os.getenv('SHARD_WORKER_ID', f"{socket.gethostname()}:{port}")
+        self.advertise_url = os.getenv('SHARD_ADVERTISE_URL', f"http://{socket.gethostname()}:{port}")
+        self.heartbeat_interval = float(os.getenv('SHARD_HEARTBEAT_INTERVAL', '2'))
+        self.on_rebalance = on_rebalance
+        self.ring = ConsistentHashRing()  # empty until the router answers
+        self.epoch = None
+        self.lock = Lock()
+        self.stop_event = Event()
+        self.thread = None
+        self.session = requests.Session()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.router_url)
+
+    def owns(self, service_name: str) -> bool:
+        if not self.enabled:
+            return True
+        with self.lock:
+            return self.ring.get(service_name) == self.worker_id
+
+    def heartbeat(self):
+        response = self.session.post(f"{self.router_url}/shards/register",
+                                     json={'worker_id': self.worker_id, 'url': self.advertise_url}, timeout=1)
+        response.raise_for_status()
+        membership = response.json()
+        if membership.get('epoch') != self.epoch:
+            with self.lock:
+                self.ring = ConsistentHashRing(membership.get('members', []))
+                self.epoch = membership.get('epoch')
+            logger.info(f"Shard membership epoch {self.epoch}: {sorted(membership.get('members', []))}")
+            if self.on_rebalance:
+                self.on_rebalance()
+
+    def heartbeat_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.warning(f"Shard heartbeat to {self.router_url} failed: {e}")
+            self.stop_event.wait(self.heartbeat_interval)
+
+    def start(self):
+        if not self.enabled:
+            return
+        logger.info(f"Shard worker {self.worker_id} joining router {self.router_url}")
+        self.thread = Thread(target=self.heartbeat_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.stop_event.set()
+        try:
+            self.session.post(f"{self.router_url}/shards/deregister", json={'worker_id': self.worker_id}, timeout=1)
+        except Exception as e:
+            logger.warning(f"Shard deregister failed: {e}")
+
+    def info(self) -> dict:
+        with self.lock:
+            return {'enabled': self.enabled, 'worker_id': self.worker_id, 'epoch': self.epoch,
+                    'members': sorted(self.ring.members)}
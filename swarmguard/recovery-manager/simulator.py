@@ -0,0 +1,711 @@
+#!/usr/bin/env python3
+"""
+SwarmGuard Policy Simulator - Replays recorded metrics through the agent rules
+and the RecoveryManager decision logic in virtual time against a modelled Swarm
+
+Usage:
+    python simulator.py --samples capture.jsonl [--samples influx_export.lp]
+                        [--config config.yaml] [--variants variants.yaml]
+                        [--set scenarios.scenario2_scaling.cpu_threshold=70]
+                        [--model task_start_seconds=8] [--timeline] [--json report.json]
+
+Inputs are agent captures (CAPTURE_FILE, one poll per line) or InfluxDB line
+protocol exports of the 'containers'/'nodes' measurements. A variants file
+maps a name to dotted config overrides; every variant replays the same data.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+
+import yaml
+
+import manager as manager_module
+import alert_coalescer
+import drain_planner
+import state_store
+import replica_calculator
+import forecaster
+import node_headroom
+import event_journal
+import admission
+import timeseries
+import tracing
+from manager import RecoveryManager
+from rule_compiler import RollingHistory
+
+logger = logging.getLogger('simulator')
+
+DEFAULT_MODEL = {
+    'task_start_seconds': 6.0,     # new task scheduled → running (image present)
+    'task_start_jitter': 2.0,      # uniform ± jitter around task_start_seconds
+    'update_latency': 0.3,         # service update API call
+    'readiness_seconds': 0.75,     # new task running → readiness probes passed
+    'old_task_stop_seconds': 2.0,  # old task stopped after the new one is ready (start-first)
+    'label_update_seconds': 0.1,   # node label sync after a migration
+    'scale_call_seconds': 0.2,     # service.scale API call
+    'rollout_timeout': 40.0,       # migrate_container gives up after this
+    'migration_relief': 0.5,       # cpu/mem multiplier for a container once moved off its hot node
+    'start_first': True,           # False models stop-first rollouts (downtime = task start time)
+    'drain_seconds': 120.0,        # virtual time allowed after the last sample for actions to finish
+    'seed': 1,
+}
+
+
+# ---------------------------------------------------------------- virtual time
+
+class SimClock:
+    """
+    Discrete-event clock shared by cooperating threads. Time only moves when
+    every participant thread is sleeping or blocked on a SimLock; it then
+    jumps to the earliest wake-up. Real-time cost is independent of the
+    virtual durations involved.
+    """
+
+    def __init__(self, start: float):
+        self.now = start
+        self.cond = threading.Condition()
+        self.active = 0
+        self.blocked = 0
+        self.wakes = []
+
+    # time-module compatible surface
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def _maybe_advance(self):
+        if self.active and len(self.wakes) + self.blocked >= self.active and self.wakes:
+            earliest = min(self.wakes)
+            if earliest > self.now:
+                self.now = earliest
+            self.cond.notify_all()
+
+    def sleep(self, seconds: float):
+        with self.cond:
+            wake = self.now + max(seconds, 0)
+            self.wakes.append(wake)
+            self._maybe_advance()
+            while self.now < wake:
+                self.cond.wait(0.5)
+                self._maybe_advance()
+            self.wakes.remove(wake)
+            self.cond.notify_all()
+
+    def block_until(self, predicate):
+        """Wait (as a blocked participant) until predicate() is true; predicate is called under the clock lock"""
+        with self.cond:
+            self.blocked += 1
+            try:
+                while not predicate():
+                    self._maybe_advance()
+                    self.cond.wait(0.5)
+            finally:
+                self.blocked -= 1
+
+    def spawn(self, target, *args) -> threading.Thread:
+        with self.cond:
+            self.active += 1
+
+        def run():
+            try:
+                target(*args)
+            except Exception as e:
+                logger.error(f"Simulated thread failed: {e}", exc_info=True)
+            finally:
+                with self.cond:
+                    self.active -= 1
+                    self._maybe_advance()
+                    self.cond.notify_all()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def wait_idle(self):
+        """Block (outside the simulation) until every participant has exited"""
+        with self.cond:
+            while self.active:
+                self._maybe_advance()
+                self.cond.wait(0.5)
+
+
+class SimLock:
+    """Lock whose waiters count as blocked for the clock, so holders may sleep in virtual time"""
+
+    def __init__(self, clock: SimClock):
+        self.clock = clock
+        self.owner = None
+
+    def acquire(self):
+        me = threading.get_ident()
+        with self.clock.cond:
+            if self.owner is None:
+                self.owner = me
+                return True
+
+        def free():
+            if self.owner is None:
+                self.owner = me
+                return True
+            return False
+
+        self.clock.block_until(free)
+        return True
+
+    def release(self):
+        with self.clock.cond:
+            self.owner = None
+            self.clock.cond.notify_all()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class SimThreadPool:
+    """Stand-in for ThreadPoolExecutor whose workers are clock participants"""
+
+    def __init__(self, clock: SimClock):
+        self.clock = clock
+
+    def __call__(self, max_workers=None, thread_name_prefix=''):
+        self.max_workers = max_workers or 1
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, items):
+        items = list(items)
+        results = [None] * len(items)
+        state = {'next': 0, 'done': 0}
+
+        def worker():
+            while True:
+                with self.clock.cond:
+                    index = state['next']
+                    if index >= len(items):
+                        return
+                    state['next'] += 1
+                results[index] = fn(items[index])
+                with self.clock.cond:
+                    state['done'] += 1
+                    self.clock.cond.notify_all()
+
+        for _ in range(min(self.max_workers, len(items))):
+            self.clock.spawn(worker)
+        self.clock.block_until(lambda: state['done'] >= len(items))
+        return results
+
+
+# ------------------------------------------------------------ modelled swarm
+
+class SimDockerController:
+    """
+    DockerController stand-in backed by the replayed placement. Operations take
+    modelled virtual time (task start latency with jitter, API latency) and
+    their effects - a moved container, a new replica count - apply to the
+    samples replayed after they land.
+    """
+
+    def __init__(self, clock: SimClock, model: dict, config):
+        self.clock = clock
+        self.model = model
+        self.config = config
+        self.rng = random.Random(model['seed'])
+        self.placement = {}          # container_id -> node
+        self.service_containers = defaultdict(set)
+        self.nodes = set()
+        self.replicas = {}           # service -> spec replicas
+        self.replica_changes = defaultdict(list)  # service -> [(effective_time, running_replicas)]
+        self.relieved = {}           # container_id -> time the container left its hot node
+        self.latest = {}             # container_id -> latest effective sample
+        self.effects = []            # [{'service', 'action', 'effective'}] - closes incidents
+        self.operations = []         # timeline
+        self.downtime = defaultdict(float)
+
+    def observe_node(self, node: str):
+        """Every node that reports a poll is schedulable, whether or not it hosts a container yet"""
+        self.nodes.add(node)
+
+    def observe(self, node: str, container: dict, observed_replicas: int):
+        cid = container['container_id']
+        service = container['service_name']
+        self.nodes.add(node)
+        self.placement.setdefault(cid, node)
+        self.service_containers[service].add(cid)
+        if service not in self.replicas:
+            self.replicas[service] = observed_replicas
+            self.replica_changes[service].append((self.clock.now, observed_replicas))
+
+    def running_replicas(self, service: str, at: float) -> int:
+        running = None
+        for effective, count in self.replica_changes[service]:
+            if effective <= at:
+                running = count
+        return running or 1
+
+    def _task_start(self) -> float:
+        jitter = self.model['task_start_jitter']
+        return max(0.5, self.model['task_start_seconds'] + self.rng.uniform(-jitter, jitter))
+
+    # DockerController surface used by the manager
+
+    def get_service_node(self, service_name: str):
+        for cid in sorted(self.service_containers.get(service_name, ())):
+            return self.placement[cid]
+        return None
+
+    def get_schedulable_nodes(self) -> list:
+        return sorted(self.nodes)
+
+    def get_replica_count(self, service_name: str):
+        return self.replicas.get(service_name)
+
+    def sync_placement_labels(self, service_name: str, gen: int = None):
+        self.clock.sleep(self.model['label_update_seconds'])
+
+    def migrate_container(self, service_name: str, from_node: str, target_node: str = None) -> dict:
+        start = self.clock.time()
+        moving = [cid for cid in sorted(self.service_containers.get(service_name, ())) if self.placement[cid] == from_node]
+        if not moving:
+            return {'success': False, 'error': f'No task on {from_node}'}
+        cid = moving[0]
+        if target_node is None:
+            load = defaultdict(int)
+            for c, n in self.placement.items():
+                load[n] += 1
+            candidates = [n for n in sorted(self.nodes) if n != from_node]
+            target_node = min(candidates, key=lambda n: load[n]) if candidates else None
+        if target_node is None or target_node == from_node:
+            # Like DockerController: no node but the source to move to is a failed migration, not a relief
+            self.operations.append({'t': start, 'op': 'migrate', 'service': service_name, 'from': from_node,
+                                    'to': None, 'success': False})
+            return {'success': False, 'error': 'No eligible target nodes'}
+
+        phases = {}
+        self.clock.sleep(self.model['update_latency'])
+        phases['update_issued'] = self.clock.time()
+        start_delay = self._task_start()
+        if start_delay > self.model['rollout_timeout']:
+            self.clock.sleep(self.model['rollout_timeout'])
+            self.operations.append({'t': start, 'op': 'migrate', 'service': service_name, 'from': from_node,
+                                    'to': target_node, 'success': False, 'phases': phases})
+            return {'success': False, 'error': 'Rolling update timeout', 'phases': phases}
+        if not self.model['start_first']:
+            self.downtime[service_name] += start_delay
+        self.clock.sleep(start_delay)
+        phases['new_task_running'] = self.clock.time()
+        self.clock.sleep(self.model['readiness_seconds'])
+        phases['new_task_ready'] = self.clock.time()
+        self.placement[cid] = target_node
+        self.relieved[cid] = self.clock.time()
+        self.effects.append({'service': service_name, 'action': 'migration', 'effective': self.clock.time()})
+        self.clock.sleep(self.model['old_task_stop_seconds'])
+        phases['old_task_gone'] = self.clock.time()
+        self.sync_placement_labels(service_name)
+        phases['cleanup_done'] = self.clock.time()
+        duration = self.clock.time() - start
+        self.operations.append({'t': start, 'op': 'migrate', 'service': service_name, 'from': from_node,
+                                'to': target_node, 'success': True, 'duration': round(duration, 2)})
+        return {'success': True, 'new_node': target_node, 'target_node': target_node, 'duration_seconds': duration,
+                'tasks_created': 1, 'single_rollout': True, 'phases': phases}
+
+    def scale_up(self, service_name: str, target_replicas: int = None) -> dict:
+        current = self.replicas.get(service_name, 1)
+        max_replicas = self.config.get('scenarios.scenario2_scaling.scaling.max_replicas', 10)
+        if current >= max_replicas:
+            return {'success': False, 'error': f'Already at max replicas ({max_replicas})'}
+        new = min(max(target_replicas or current + 1, current + 1), max_replicas)
+        start = self.clock.time()
+        self.clock.sleep(self.model['scale_call_seconds'])
+        self.replicas[service_name] = new
+        effective = self.clock.time() + self._task_start()
+        self.replica_changes[service_name].append((effective, new))
+        self.effects.append({'service': service_name, 'action': 'scale_up', 'effective': effective})
+        self.operations.append({'t': start, 'op': 'scale_up', 'service': service_name, 'from': current, 'to': new,
+                                'success': True, 'effective': round(effective - start, 2)})
+        return {'success': True, 'previous_replicas': current, 'new_replicas': new,
+                'duration_seconds': self.clock.time() - start}
+
+    def scale_down(self, service_name: str, target_replicas: int = None) -> dict:
+        current = self.replicas.get(service_name, 1)
+        min_replicas = self.config.get('scenarios.scenario2_scaling.scaling.min_replicas', 1)
+        if current <= min_replicas:
+            return {'success': False, 'error': f'Already at min replicas ({min_replicas})'}
+        new = max(min(target_replicas or current - 1, current - 1), min_replicas)
+        start = self.clock.time()
+        self.clock.sleep(self.model['scale_call_seconds'])
+        self.replicas[service_name] = new
+        self.replica_changes[service_name].append((self.clock.time(), new))
+        self.operations.append({'t': start, 'op': 'scale_down', 'service': service_name, 'from': current, 'to': new,
+                                'success': True})
+        return {'success': True, 'previous_replicas': current, 'new_replicas': new,
+                'duration_seconds': self.clock.time() - start}
+
+    def get_autoscaling_services(self) -> list:
+        return [s for s, n in self.replicas.items() if n > 1]
+
+    def get_service_aggregate_metrics(self, service_name: str):
+        samples = [self.latest[c] for c in self.service_containers.get(service_name, ()) if c in self.latest]
+        if not samples:
+            return None
+        replicas = self.running_replicas(service_name, self.clock.time())
+        total_cpu = sum(s['cpu_percent'] for s in samples)
+        total_mem = sum(s['memory_percent'] for s in samples)
+        return {'replica_count': replicas, 'total_cpu_percent': total_cpu, 'total_memory_percent': total_mem,
+                'avg_cpu_percent': total_cpu / replicas, 'avg_memory_percent': total_mem / replicas}
+
+
+# ------------------------------------------------------------------ inputs
+
+def _parse_line_protocol(line: str):
+    """(measurement, tags, fields, timestamp) for one InfluxDB line protocol record"""
+    head, fields, ts = line.rsplit(' ', 2) if line.count(' ') >= 2 else (line, '', '0')
+    measurement, *tag_parts = head.split(',')
+    tags = dict(part.split('=', 1) for part in tag_parts)
+    values = {}
+    for part in fields.split(','):
+        key, _, value = part.partition('=')
+        try:
+            values[key] = float(value.rstrip('i'))
+        except ValueError:
+            values[key] = value.strip('"')
+    timestamp = float(ts)
+    if timestamp > 1e14:  # ns precision
+        timestamp /= 1e9
+    return measurement, tags, values, timestamp
+
+
+def load_polls(paths: list) -> list:
+    """Polls [{'timestamp', 'node', 'node_metrics', 'containers'}] sorted by time"""
+    polls = {}
+
+    def poll(ts, node):
+        return polls.setdefault((ts, node), {'timestamp': ts, 'node': node, 'node_metrics': {}, 'containers': []})
+
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('{'):
+                    record = json.loads(line)
+                    p = poll(float(record['timestamp']), record.get('node', 'unknown'))
+                    p['node_metrics'] = record.get('node_metrics') or p['node_metrics']
+                    p['containers'].extend(record.get('containers') or record.get('samples') or [])
+                    continue
+                measurement, tags, values, ts = _parse_line_protocol(line)
+                if measurement == 'nodes':
+                    poll(ts, tags.get('node', 'unknown'))['node_metrics'] = {
+                        'cpu_percent': values.get('cpu', 0), 'memory_percent': values.get('mem', 0),
+                        'network_rx_mbps': values.get('net_in', 0), 'network_tx_mbps': values.get('net_out', 0)}
+                elif measurement in ('containers', 'tasks'):
+                    # 'tasks' is the agent's INFLUX_SCHEMA=task layout: service/slot tags, IDs as fields
+                    name = tags.get('container') or values.get('container') or ''
+                    poll(ts, tags.get('node', 'unknown'))['containers'].append({
+                        'container_id': tags.get('cid') or values.get('cid') or name, 'container_name': name,
+                        'service_name': tags.get('service') or name.split('.')[0], 'cpu_percent': values.get('cpu', 0),
+                        'memory_percent': values.get('mem', 0), 'memory_mb': values.get('mem_mb', 0),
+                        'network_rx_mbps': values.get('net_in', 0), 'network_tx_mbps': values.get('net_out', 0)})
+
+    for p in polls.values():
+        for c in p['containers']:
+            c.setdefault('service_name', (c.get('container_name') or '').split('.')[0])
+            c['service_name'] = c['service_name'] or (c.get('container_name') or '').split('.')[0]
+    return sorted(polls.values(), key=lambda p: (p['timestamp'], p['node']))
+
+
+def apply_overrides(config: dict, overrides: dict) -> dict:
+    for dotted, value in overrides.items():
+        target = config
+        keys = dotted.split('.')
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = value
+    return config
+
+
+def parse_assignments(items: list) -> dict:
+    return {k: yaml.safe_load(v) for k, _, v in (item.partition('=') for item in items or [])}
+
+
+# --------------------------------------------------------------- simulation
+
+class PolicySimulator:
+    """One replay of the polls under one configuration variant"""
+
+    PATCHED_MODULES = (manager_module, alert_coalescer, drain_planner, state_store, replica_calculator,
+                       forecaster, node_headroom, event_journal, admission, timeseries, tracing)
+
+    def __init__(self, polls: list, config: dict, model: dict, workdir: str):
+        self.polls = polls
+        self.model = model
+        self.clock = SimClock(polls[0]['timestamp'] if polls else 0.0)
+        self.base_time = self.clock.now
+
+        config = json.loads(json.dumps(config))
+        apply_overrides(config, {
+            'state_store.path': ':memory:',
+            'journal.path': os.path.join(workdir, 'events.jsonl'),
+            'journal.recent_events': 1000000,
+            'tracing.path': os.path.join(workdir, 'spans.jsonl'),
+            'tracing.ship_to_influxdb': False,
+            'config_reload.watch': False,
+            'alert_admission.enabled': False,
+        })
+        config_path = os.path.join(workdir, 'config.yaml')
+        with open(config_path, 'w') as f:
+            yaml.safe_dump(config, f)
+
+        self.saved_time = {m: m.time for m in self.PATCHED_MODULES}
+        for module in self.PATCHED_MODULES:
+            module.time = self.clock
+        self.saved_pool = drain_planner.ThreadPoolExecutor
+        drain_planner.ThreadPoolExecutor = SimThreadPool(self.clock)
+
+        self.manager = RecoveryManager(config_path)
+        self.manager.lock = SimLock(self.clock)
+        self.swarm = SimDockerController(self.clock, model, self.manager.config)
+        self.manager.docker_controller = self.swarm
+        self.manager.drain_planner.docker_controller = self.swarm
+
+        self.rule_set = self.manager.rule_engine.rule_set
+        self.history = RollingHistory(self.rule_set.history_size)
+        self.alerts_sent = 0
+        self.incidents = []
+        self.open_incidents = {}  # service -> incident
+        self.breach_seconds = defaultdict(float)
+        self.poll_interval = self._poll_interval()
+
+    def _poll_interval(self) -> float:
+        times = sorted({p['timestamp'] for p in self.polls})
+        gaps = [b - a for a, b in zip(times, times[1:]) if b > a]
+        return sorted(gaps)[len(gaps) // 2] if gaps else 5.0
+
+    def restore(self):
+        for module, original in self.saved_time.items():
+            module.time = original
+        drain_planner.ThreadPoolExecutor = self.saved_pool
+        self.manager.journal.close()
+        self.manager.tracer.stop()
+
+    def effective_sample(self, poll: dict, container: dict, observed: dict) -> dict:
+        """The recorded sample adjusted for simulated actions (replica count, migration)"""
+        sample = dict(container)
+        service = sample['service_name']
+        cid = sample['container_id']
+        running = self.swarm.running_replicas(service, self.clock.now)
+        factor = observed[service] / running if running else 1.0
+        relief = self.model['migration_relief'] if cid in self.swarm.relieved else 1.0
+        sample['cpu_percent'] = sample.get('cpu_percent', 0) * factor * relief
+        sample['memory_percent'] = sample.get('memory_percent', 0) * factor * relief
+        sample['network_rx_mbps'] = sample.get('network_rx_mbps', 0) * factor
+        sample['network_tx_mbps'] = sample.get('network_tx_mbps', 0) * factor
+        if 'in_flight' in sample:
+            sample['in_flight'] = sample['in_flight'] * factor
+        return sample
+
+    def process_poll(self, poll: dict):
+        self.swarm.observe_node(poll['node'])
+        observed = defaultdict(int)
+        for c in poll['containers']:
+            observed[c['service_name']] += 1
+        for c in poll['containers']:
+            self.swarm.observe(poll['node'], c, observed[c['service_name']])
+
+        samples = [self.effective_sample(poll, container, observed) for container in poll['containers']]
+        # What the agent reports every poll: node metrics and per-service means
+        services = defaultdict(lambda: {'cpu_percent': 0.0, 'memory_percent': 0.0, 'network_percent': 0.0, 'replicas': 0})
+        for sample in samples:
+            summary = services[sample['service_name']]
+            summary['cpu_percent'] += sample['cpu_percent']
+            summary['memory_percent'] += sample['memory_percent']
+            summary['network_percent'] += sample['network_rx_mbps'] + sample['network_tx_mbps']
+            summary['replicas'] += 1
+        for summary in services.values():
+            for metric in ('cpu_percent', 'memory_percent', 'network_percent'):
+                summary[metric] /= summary['replicas']
+        if poll.get('node_metrics') or services:
+            self.manager.handle_samples({'timestamp': poll['timestamp'], 'node': poll['node'],
+                                         'node_metrics': poll.get('node_metrics'), 'services': dict(services)})
+
+        breached = set()
+        for sample in samples:
+            self.swarm.latest[sample['container_id']] = sample
+            net = (sample['network_rx_mbps'] + sample['network_tx_mbps']) / 100.0 * 100
+            point = {'cpu': sample['cpu_percent'], 'mem': sample['memory_percent'], 'net': net,
+                     'p95': sample.get('latency_p95_ms', math.nan), 'inflight': sample.get('in_flight', math.nan)}
+            scenario = self.rule_set.evaluate(point, self.history.push(sample['container_id'], point))
+            if scenario is None:
+                continue
+            service = sample['service_name']
+            breached.add(service)
+            node = self.swarm.placement.get(sample['container_id'], poll['node'])
+            alert = {'timestamp': int(self.clock.now), 'node': node, 'container_id': sample['container_id'],
+                     'container_name': sample.get('container_name'), 'service_name': service, 'scenario': scenario,
+                     'metrics': {'cpu_percent': round(sample['cpu_percent'], 2),
+                                 'memory_percent': round(sample['memory_percent'], 2),
+                                 'memory_mb': sample.get('memory_mb', 0),
+                                 'network_rx_mbps': round(sample['network_rx_mbps'], 2),
+                                 'network_tx_mbps': round(sample['network_tx_mbps'], 2),
+                                 'network_percent': round(net, 2)}}
+            self.alerts_sent += 1
+            self.clock.spawn(self.manager.handle_alert, alert)
+        return breached
+
+    def update_incidents(self, ts: float, breached: set, services: set):
+        for service in services:
+            incident = self.open_incidents.get(service)
+            effect = next((e for e in self.swarm.effects
+                           if incident and e['service'] == service and incident['start'] <= e['effective'] <= ts), None)
+            if incident and effect:
+                incident.update(end=effect['effective'], resolved_by=effect['action'])
+                self.incidents.append(self.open_incidents.pop(service))
+            elif incident and service not in breached:
+                incident.update(end=ts, resolved_by='cleared')
+                self.incidents.append(self.open_incidents.pop(service))
+            if service in breached:
+                self.breach_seconds[service] += self.poll_interval
+                if service not in self.open_incidents:
+                    self.open_incidents[service] = {'service': service, 'start': ts}
+
+    def replay(self):
+        ticks = defaultdict(list)
+        for poll in self.polls:
+            ticks[poll['timestamp']].append(poll)
+        for ts in sorted(ticks):
+            self.clock.sleep(ts - self.clock.now)
+            breached, services = set(), set()
+            for poll in ticks[ts]:
+                breached |= self.process_poll(poll)
+                services |= {c['service_name'] for c in poll['containers']}
+            self.update_incidents(ts, breached, services)
+        self.clock.sleep(self.model['drain_seconds'])
+        self.manager.running = False
+
+    def run(self) -> dict:
+        wall_start = time.time()
+        self.manager.running = True
+        # Replay first: a lone participant would free-run the clock
+        self.clock.spawn(self.replay)
+        self.clock.spawn(self.manager.monitor_scale_down_thread)
+        self.clock.wait_idle()
+        for service, incident in self.open_incidents.items():
+            incident.update(end=None, resolved_by=None)
+            self.incidents.append(incident)
+        return self.report(time.time() - wall_start)
+
+    def report(self, wall_seconds: float) -> dict:
+        actions = [e for e in self.manager.journal.events(limit=10 ** 9) if e['event'] == 'action_completed']
+        resolved = sorted(i['end'] - i['start'] for i in self.incidents if i['resolved_by'] in ('migration', 'scale_up'))
+        simulated = (self.polls[-1]['timestamp'] - self.polls[0]['timestamp']) if self.polls else 0
+        counts = defaultdict(int)
+        for op in self.swarm.operations:
+            counts[op['op']] += 1
+        return {
+            'simulated_seconds': round(simulated, 1),
+            'wall_seconds': round(wall_seconds, 3),
+            'speedup': round(simulated / wall_seconds, 1) if wall_seconds else None,
+            'alerts': self.alerts_sent,
+            'actions': dict(counts),
+            'incidents': len(self.incidents),
+            'incidents_unresolved': sum(1 for i in self.incidents if i['resolved_by'] is None),
+            'mttr_mean': round(sum(resolved) / len(resolved), 2) if resolved else None,
+            'mttr_p95': round(resolved[min(len(resolved) - 1, int(len(resolved) * 0.95))], 2) if resolved else None,
+            'mttr_max': round(resolved[-1], 2) if resolved else None,
+            'breach_seconds': round(sum(self.breach_seconds.values()), 1),
+            'downtime_seconds': round(sum(self.swarm.downtime.values()), 1),
+            'final_replicas': dict(self.swarm.replicas),
+            'timeline': [dict(op, t=round(op['t'] - self.base_time, 2)) for op in sorted(self.swarm.operations, key=lambda o: o['t'])],
+            'action_events': len(actions),
+        }
+
+
+def run_variant(polls: list, config: dict, model: dict) -> dict:
+    with tempfile.TemporaryDirectory(prefix='swarmguard-sim-') as workdir:
+        simulator = PolicySimulator(polls, config, model, workdir)
+        try:
+            return simulator.run()
+        finally:
+            simulator.restore()
+
+
+def print_report(results: dict, timeline: bool):
+    header = f"{'variant':<20} {'alerts':>6} {'migr':>5} {'up':>4} {'down':>5} {'incid':>6} {'open':>5} " \
+             f"{'mttr':>7} {'p95':>7} {'breach_s':>9} {'down_s':>7} {'speedup':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        a = r['actions']
+        fmt = lambda v: f"{v:.1f}" if v is not None else '-'
+        print(f"{name:<20} {r['alerts']:>6} {a.get('migrate', 0):>5} {a.get('scale_up', 0):>4} {a.get('scale_down', 0):>5} "
+              f"{r['incidents']:>6} {r['incidents_unresolved']:>5} {fmt(r['mttr_mean']):>7} {fmt(r['mttr_p95']):>7} "
+              f"{r['breach_seconds']:>9.1f} {r['downtime_seconds']:>7.1f} {fmt(r['speedup']):>7}x")
+    if timeline:
+        for name, r in results.items():
+            print(f"\n{name} timeline (seconds from first sample):")
+            for op in r['timeline']:
+                detail = {k: v for k, v in op.items() if k not in ('t', 'op', 'service', 'phases')}
+                print(f"  {op['t']:>9.2f}  {op['op']:<10} {op['service']:<24} {detail}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded metrics through SwarmGuard policies in virtual time')
+    parser.add_argument('--samples', action='append', required=True, help='Agent capture (JSONL) or InfluxDB line protocol')
+    parser.add_argument('--config', default=os.getenv('CONFIG_PATH', os.path.join(os.path.dirname(__file__), 'config.yaml')))
+    parser.add_argument('--variants', help='YAML mapping variant name -> {dotted.config.key: value}')
+    parser.add_argument('--set', action='append', help='Config override for the baseline (dotted.key=value)')
+    parser.add_argument('--model', action='append', help=f'Swarm model parameter (key=value), defaults {DEFAULT_MODEL}')
+    parser.add_argument('--timeline', action='store_true', help='Print each variant\'s action timeline')
+    parser.add_argument('--json', help='Write the full report to this file')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', force=True)
+    if not args.verbose:
+        # Latency warnings are measured in virtual time and stale alerts are expected in a replay
+        logging.getLogger('manager').setLevel(logging.ERROR)
+
+    polls = load_polls(args.samples)
+    if not polls:
+        sys.exit('No samples found')
+    with open(args.config) as f:
+        base_config = apply_overrides(yaml.safe_load(f), parse_assignments(args.set))
+    model = dict(DEFAULT_MODEL, **parse_assignments(args.model))
+
+    variants = {'baseline': {}}
+    if args.variants:
+        with open(args.variants) as f:
+            variants.update(yaml.safe_load(f) or {})
+
+    results = {}
+    for name, overrides in variants.items():
+        config = apply_overrides(json.loads(json.dumps(base_config)), overrides or {})
+        results[name] = run_variant(polls, config, model)
+
+    print_report(results, args.timeline)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'model': model, 'variants': variants, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
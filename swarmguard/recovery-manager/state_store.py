@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""State Store - Persistent, bounded decision state (cooldowns, breach counts, idle timers)"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+from collections import OrderedDict
+from threading import RLock, Lock, Thread, Event
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class StateTable:
+    """
+    Dict-like table with per-entry TTL and a capacity bound (least recently
+    written entries are evicted first). Writes are queued on the store and
+    persisted in batches.
+    """
+
+    def __init__(self, store, namespace: str, ttl: float, max_entries: int):
+        self.store = store
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (value, updated)
+        self.evictions = {'ttl': 0, 'capacity': 0}
+
+    def _expired(self, updated: float, now: float) -> bool:
+        return bool(self.ttl) and now - updated > self.ttl
+
+    def _evict(self, key, reason: str):
+        del self.entries[key]
+        self.evictions[reason] += 1
+        self.store._mark(self.namespace, key, None)
+
+    def get(self, key, default=None):
+        with self.store.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return default
+            if self._expired(item[1], time.time()):
+                self._evict(key, 'ttl')
+                return default
+            return item[0]
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        with self.store.lock:
+            now = time.time()
+            self.entries[key] = (value, now)
+            self.entries.move_to_end(key)
+            self.store._mark(self.namespace, key, (value, now))
+            while len(self.entries) > self.max_entries:
+                self._evict(next(iter(self.entries)), 'capacity')
+
+    def pop(self, key, default=None):
+        with self.store.lock:
+            item = self.entries.pop(key, None)
+            if item is None:
+                return default
+            self.store._mark(self.namespace, key, None)
+            return default if self._expired(item[1], time.time()) else item[0]
+
+    def __delitem__(self, key):
+        with self.store.lock:
+            if key not in self.entries:
+                raise KeyError(key)
+            del self.entries[key]
+            self.store._mark(self.namespace, key, None)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def sweep(self, now: float):
+        with self.store.lock:
+            for key in [k for k, (_, updated) in self.entries.items() if self._expired(updated, now)]:
+                self._evict(key, 'ttl')
+
+    def stats(self) -> dict:
+        return {'size': len(self.entries), 'max_entries': self.max_entries, 'ttl_seconds': self.ttl,
+                'evictions_ttl': self.evictions['ttl'], 'evictions_capacity': self.evictions['capacity']}
+
+
+class StateStore:
+    """
+    SQLite (WAL) backed store for the manager's decision state so cooldowns
+    and idle timers survive restarts. Writes are coalesced per key and flushed
+    in one transaction every flush_interval seconds; expired entries are swept
+    on the same cadence. Falls back to memory-only if the database cannot be
+    opened.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.path = config.get('state_store.path', '/app/state/manager_state.db')
+        self.flush_interval = float(config.get('state_store.flush_interval', 1.0))
+        self.lock = RLock()
+        self.db_lock = Lock()
+        self.tables = {}
+        self.dirty = {}  # (namespace, key) -> (value, updated) or None for delete
+        self.flushes = 0
+        self.rows_written = 0
+        self.stop_event = Event()
+        self.flush_thread = None
+        self.db = self._open()
+
+    def _open(self):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Sharded workers share the file; wait out another writer's lock instead of failing
+            db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute('CREATE TABLE IF NOT EXISTS state ('
+                       'namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated REAL NOT NULL, '
+                       'PRIMARY KEY (namespace, key))')
+            logger.info(f"State store opened: {self.path} (WAL)")
+            return db
+        except Exception as e:
+            logger.error(f"Cannot open state store {self.path}: {e} - decision state will not survive restarts")
+            return None
+
+    def table(self, namespace: str) -> StateTable:
+        """Create (or return) a table, restoring its unexpired rows from disk"""
+        with self.lock:
+            if namespace in self.tables:
+                return self.tables[namespace]
+            settings = self.config.get(f'state_store.tables.{namespace}', {}) or {}
+            table = StateTable(self, namespace, float(settings.get('ttl', 3600)), int(settings.get('max_entries', 10000)))
+            self.tables[namespace] = table
+
+            if self.db is not None:
+                now = time.time()
+                with self.db_lock:
+                    rows = self.db.execute('SELECT key, value, updated FROM state WHERE namespace = ? ORDER BY updated',
+                                           (namespace,)).fetchall()
+                restored = 0
+                for key, value, updated in rows:
+                    if table._expired(updated, now):
+                        self.dirty[(namespace, key)] = None
+                        continue
+                    table.entries[key] = (json.loads(value), updated)
+                    restored += 1
+                while len(table.entries) > table.max_entries:
+                    table._evict(next(iter(table.entries)), 'capacity')
+                logger.info(f"State table '{namespace}': restored {restored} entries")
+            return table
+
+    def refresh(self):
+        """
+        Pull rows written by other processes sharing the database (sharded
+        workers) that are newer than what this process holds - called when
+        service ownership moves so a new owner sees the old owner's cooldowns.
+        """
+        if self.db is None:
+            return
+        self.flush()
+        now = time.time()
+        with self.db_lock:
+            rows = self.db.execute('SELECT namespace, key, value, updated FROM state').fetchall()
+        pulled = 0
+        with self.lock:
+            for namespace, key, value, updated in rows:
+                table = self.tables.get(namespace)
+                if table is None or table._expired(updated, now):
+                    continue
+                item = table.entries.get(key)
+                if item is None or item[1] < updated:
+                    table.entries[key] = (json.loads(value), updated)
+                    pulled += 1
+        logger.info(f"State store refreshed: {pulled} entries updated from disk")
+
+    def _mark(self, namespace: str, key, item):
+        self.dirty[(namespace, key)] = item
+
+    def flush(self):
+        with self.lock:
+            pending, self.dirty = self.dirty, {}
+        if not pending or self.db is None:
+            return
+        upserts = [(ns, key, json.dumps(item[0]), item[1]) for (ns, key), item in pending.items() if item is not None]
+        deletes = [(ns, key) for (ns, key), item in pending.items() if item is None]
+        try:
+            with self.db_lock:
+                self.db.execute('BEGIN')
+                if upserts:
+                    self.db.executemany('INSERT OR REPLACE INTO state (namespace, key, value, updated) VALUES (?, ?, ?, ?)', upserts)
+                if deletes:
+                    self.db.executemany('DELETE FROM state WHERE namespace = ? AND key = ?', deletes)
+                self.db.execute('COMMIT')
+            self.flushes += 1
+            self.rows_written += len(pending)
+        except Exception as e:
+            logger.error(f"State store flush failed: {e}")
+            with self.db_lock:
+                try:
+                    self.db.execute('ROLLBACK')
+                except Exception:
+                    pass
+            with self.lock:
+                # Re-queue, keeping anything written since
+                for k, item in pending.items():
+                    self.dirty.setdefault(k, item)
+
+    def flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            now = time.time()
+            for table in list(self.tables.values()):
+                table.sweep(now)
+            self.flush()
+
+    def start(self):
+        self.stop_event.clear()
+        self.flush_thread = Thread(target=self.flush_loop, daemon=True)
+        self.flush_thread.start()
+
+    def close(self):
+        self.stop_event.set()
+        if self.flush_thread:
+            self.flush_thread.join(timeout=5)
+        self.flush()
+        if self.db is not None:
+            with self.db_lock:
+                self.db.close()
+            self.db = None
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'persistent': self.db is not None,
+                'path': self.path,
+                'pending_writes': len(self.dirty),
+                'flushes': self.flushes,
+                'rows_written': self.rows_written,
+                'tables': {name: table.stats() for name, table in self.tables.items()}
+            }
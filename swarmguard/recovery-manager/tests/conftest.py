@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the manager's modules the way manager.py does: from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,88 @@
+import time
+import threading
+
+from admission import AdmissionController
+from config_loader import ConfigSnapshot
+
+
+def make_admission(**settings):
+    settings = dict({'enabled': True, 'per_node_rate': 1000, 'per_node_burst': 1000, 'max_queue': 2}, **settings)
+    handled = []
+    controller = AdmissionController(ConfigSnapshot({'alert_admission': settings}, 1), handled.append,
+                                     is_repeat=lambda alert: alert.get('repeat', False))
+    return controller, handled
+
+
+def alert(service: str, repeat: bool = False) -> dict:
+    return {'service_name': service, 'node': 'worker-0', 'repeat': repeat}
+
+
+def test_disabled_by_default():
+    assert not AdmissionController(ConfigSnapshot({}, 1), None, None).enabled
+
+
+def test_displaced_repeat_leaves_no_pending_entry():
+    controller, _ = make_admission()
+    assert controller.submit(alert('a'))['accepted']
+    assert controller.submit(alert('b', repeat=True))['accepted']
+    assert controller.submit(alert('c'))['accepted']  # displaces b's repeat
+    assert dict(controller.pending) == {'a': 1, 'c': 1}
+    assert controller.shed['displaced'] == 1
+
+
+def test_full_queue_rejects_repeats_with_retry_after():
+    controller, _ = make_admission()
+    controller.submit(alert('a'))
+    controller.submit(alert('b'))
+    result = controller.submit(alert('c', repeat=True))
+    assert not result['accepted'] and result['reason'] == 'queue_full' and result['retry_after'] >= 1
+
+
+def wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def reload(controller, **settings):
+    current = dict(controller.config.get('alert_admission'), **settings)
+    controller.config = ConfigSnapshot({'alert_admission': current}, 2)
+    controller.load_settings()
+    controller.apply_settings()
+
+
+def test_reload_resizes_and_stops_the_worker_pool():
+    controller, handled = make_admission(workers=2, max_queue=50)
+    controller.start()
+    try:
+        assert wait_for(lambda: len(controller.workers) == 2)
+        reload(controller, workers=4)
+        assert wait_for(lambda: len(controller.workers) == 4)
+        reload(controller, workers=1)
+        assert wait_for(lambda: len(controller.workers) == 1)
+        assert controller.submit(alert('a'))['accepted']
+        assert wait_for(lambda: len(handled) == 1)
+    finally:
+        controller.stop()
+
+
+def test_disabling_on_reload_handles_the_queue_first():
+    gate = threading.Event()
+    handled = []
+    controller = AdmissionController(
+        ConfigSnapshot({'alert_admission': {'enabled': True, 'workers': 1, 'per_node_burst': 100}}, 1),
+        lambda alert_data: (gate.wait(2), handled.append(alert_data)), is_repeat=lambda alert_data: False)
+    controller.start()
+    for service in 'abc':
+        controller.submit(alert(service))
+    reload(controller, enabled=False)
+    assert not controller.running
+    gate.set()
+    assert wait_for(lambda: len(handled) == 3 and not controller.workers)
+
+    reload(controller, enabled=True)
+    assert controller.running and wait_for(lambda: len(controller.workers) == 1)
+    controller.stop()
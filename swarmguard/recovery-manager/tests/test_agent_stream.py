@@ -0,0 +1,49 @@
+import queue
+import threading
+
+from agent_stream import AgentStreams, pack, unpack
+
+
+class FakeSocket:
+    def __init__(self, frames: list):
+        self.incoming = queue.Queue()
+        for frame in frames:
+            self.incoming.put(pack(frame))
+        self.sent = queue.Queue()
+
+    def receive(self, timeout: float = None):
+        try:
+            return self.incoming.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def send(self, data):
+        self.sent.put(unpack(data))
+
+
+def test_slow_alerts_do_not_hold_up_samples():
+    release = threading.Event()
+
+    def slow_alert(body):
+        release.wait(5)  # a migration in progress
+        return {'status': 'success'}, 200, {}
+
+    streams = AgentStreams({'alert': slow_alert, 'samples': lambda body: ({'status': 'ok'}, 200, {})},
+                           heartbeat_timeout=0.5, dispatch_workers=1, alert_workers=2)
+    frames = [{'t': 'hello', 'id': 0, 'body': {'node': 'worker-1'}}]
+    frames += [{'t': 'alert', 'id': i, 'body': {}} for i in (1, 2)]
+    frames += [{'t': 'samples', 'id': i, 'body': {}} for i in (3, 4)]
+    ws = FakeSocket(frames)
+    thread = threading.Thread(target=streams.serve, args=(ws,), daemon=True)
+    thread.start()
+    try:
+        # Both alert workers are busy, yet the samples frames are answered
+        acks = [ws.sent.get(timeout=2) for _ in range(2)]
+        assert sorted(a['id'] for a in acks) == [3, 4]
+        release.set()
+        acks = [ws.sent.get(timeout=2) for _ in range(2)]
+        assert sorted(a['id'] for a in acks) == [1, 2]
+    finally:
+        release.set()
+        thread.join(timeout=2)
+        streams.close()
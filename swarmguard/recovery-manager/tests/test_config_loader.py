@@ -0,0 +1,25 @@
+import pytest
+import yaml
+
+from config_loader import ConfigLoader
+from rule_compiler import RuleError
+from rule_engine import RuleEngine
+
+
+def write(path, config: dict):
+    path.write_text(yaml.safe_dump(config))
+
+
+def test_reload_validates_before_swapping(tmp_path):
+    path = tmp_path / 'config.yaml'
+    write(path, {'rules': [{'name': 'scenario1_migration', 'when': 'cpu > 90'}]})
+    loader = ConfigLoader(str(path), validate=RuleEngine)
+
+    write(path, {'rules': [{'name': 'custom', 'when': 'cpu > 90'}]})  # no action
+    with pytest.raises(RuleError):
+        loader.reload()
+    assert loader.version == 1 and loader.get('rules')[0]['name'] == 'scenario1_migration'
+
+    write(path, {'rules': [{'name': 'custom', 'action': 'scale_up', 'when': 'cpu > 90'}]})
+    assert loader.reload().version == 2
+    assert loader.get('rules')[0]['name'] == 'custom'
@@ -0,0 +1,66 @@
+import pytest
+
+from image_prepull import ImagePrepuller, image_keys
+
+PINNED = 'registry.local:5000/web:1.2@sha256:abc'
+
+
+@pytest.mark.parametrize('reference, keys', [
+    ('web', {'web:latest'}),
+    ('web:1.2', {'web:1.2'}),
+    ('registry.local:5000/web', {'registry.local:5000/web:latest'}),
+    ('registry.local:5000/web:1.2', {'registry.local:5000/web:1.2'}),
+    (PINNED, {'registry.local:5000/web@sha256:abc'}),
+    ('registry.local:5000/web@sha256:abc', {'registry.local:5000/web@sha256:abc'}),
+])
+def test_image_keys(reference, keys):
+    assert image_keys(reference) == keys
+
+
+class FakeController:
+    def __init__(self, images: dict):
+        self.images = images
+
+    def get_service_image(self, service_name: str):
+        return self.images.get(service_name)
+
+    def get_autoscaling_services(self) -> list:
+        return []
+
+
+def make_prepuller(images: dict, **settings) -> ImagePrepuller:
+    prepuller = ImagePrepuller({'image_prepull': dict({'autoscaled_services': False}, **settings)},
+                               FakeController(images))
+    for service in images:
+        prepuller.mark_at_risk(service)
+    prepuller.refresh()
+    return prepuller
+
+
+def test_pinned_image_matches_the_digest_not_the_tag():
+    prepuller = make_prepuller({'web': PINNED})
+    # Same tag, another digest: still needs the pull
+    prepuller.update_inventory('node-1', ['registry.local:5000/web:1.2', 'registry.local:5000/web@sha256:old'])
+    assert prepuller.pending_for('node-1') == [PINNED]
+    prepuller.update_inventory('node-2', ['registry.local:5000/web@sha256:abc'])
+    assert prepuller.pending_for('node-2') == []
+    assert prepuller.is_warm('node-2', PINNED) and not prepuller.is_warm('node-1', PINNED)
+
+
+def test_pending_for_throttles_requests(monkeypatch):
+    prepuller = make_prepuller({'a': 'a:1', 'b': 'b:1', 'c': 'c:1'}, max_pulls_per_node=2, request_ttl=300,
+                               inventory_max_age=600)
+    first = prepuller.pending_for('node-1')
+    assert len(first) == 2
+    # Requested images are not asked for again within request_ttl; the rest follow
+    second = prepuller.pending_for('node-1')
+    assert len(second) == 1 and set(first) | set(second) == {'a:1', 'b:1', 'c:1'}
+    assert prepuller.pending_for('node-1') == []
+    # Reporting the image settles its request
+    prepuller.update_inventory('node-1', ['a:1'])
+    assert ('node-1', 'a:1') not in prepuller.requested
+
+    now = prepuller.requested[('node-1', 'b:1')] + 301
+    monkeypatch.setattr('image_prepull.time.time', lambda: now)
+    assert sorted(prepuller.pending_for('node-1')) == ['b:1', 'c:1']
+    assert prepuller.stats()['requests_sent'] == 5
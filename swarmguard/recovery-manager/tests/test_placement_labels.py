@@ -0,0 +1,140 @@
+import uuid
+
+from config_loader import ConfigSnapshot
+from docker_controller import PLACEMENT_GEN_LABEL, DockerController
+from loadtest import FakeCluster, FakeDockerClient
+from placement_sync import PlacementSync
+
+CONFIG = {'scenarios': {'scenario1_migration': {'migration': {'poll_interval': 0.0, 'rollout_timeout': 5}}}}
+
+
+def make_controller(nodes: int = 3, services: int = 2):
+    cluster = FakeCluster(nodes, services, 1, {}, 0.0, 1)
+    controller = DockerController(ConfigSnapshot(CONFIG, 1))
+    controller._client = FakeDockerClient(cluster)
+    return cluster, controller
+
+
+def node_labels(cluster) -> dict:
+    return {node['Description']['Hostname']: dict(node['Spec'].get('Labels') or {}) for node in cluster.nodes.values()}
+
+
+def add_node(cluster, hostname: str):
+    node_id = uuid.uuid4().hex[:25]
+    cluster.nodes[node_id] = {'ID': node_id, 'Version': {'Index': cluster.next_version()},
+                              'Description': {'Hostname': hostname}, 'Status': {'State': 'ready'},
+                              'Spec': {'Availability': 'active', 'Role': 'worker', 'Labels': {}}}
+
+
+def test_migration_is_one_rollout_and_leaves_only_the_current_generation():
+    cluster, controller = make_controller()
+    for expected_gen in (1, 2):
+        from_node = cluster.service_node('loadtest-svc-0')
+        result = controller.migrate_container('loadtest-svc-0', from_node)
+        assert result['success'] and result['single_rollout']
+        assert result['new_node'] != from_node
+
+        spec = cluster.services['loadtest-svc-0']['Spec']
+        assert spec['Labels'][PLACEMENT_GEN_LABEL] == str(expected_gen)
+        assert spec['TaskTemplate']['Placement']['Constraints'] == \
+            [f'node.labels.swarmguard.placement.loadtest-svc-0.{expected_gen}==true']
+        for labels in node_labels(cluster).values():
+            assert labels == {f'swarmguard.placement.loadtest-svc-0.{expected_gen}': 'true'}
+    assert controller.migrating == set()
+
+
+def test_extra_rollout_fails_the_migration():
+    cluster, controller = make_controller()
+    update_service = cluster.update_service
+
+    def update_twice(*args, **kwargs):
+        update_service(*args, **kwargs)
+        service = next(s for s in cluster.services.values() if s['ID'] == args[0])
+        dead = cluster.new_task(next(iter(cluster.nodes)))
+        dead['DesiredState'] = dead['Status']['State'] = 'shutdown'
+        service['Tasks'].append(dead)
+
+    cluster.update_service = update_twice
+    result = controller.migrate_container('loadtest-svc-0', cluster.service_node('loadtest-svc-0'))
+    assert not result['success']
+    assert result['single_rollout'] is False and result['tasks_created'] == 2
+    assert 'exactly one rollout' in result['error']
+
+
+def test_reconcile_labels_new_nodes_and_drops_stale_labels():
+    cluster, controller = make_controller()
+    controller.migrate_container('loadtest-svc-0', cluster.service_node('loadtest-svc-0'))
+    add_node(cluster, 'worker-new')
+    first = next(iter(cluster.nodes.values()))
+    first['Spec']['Labels'].update({'swarmguard.placement.removed-svc.4': 'true',
+                                    'swarmguard.placement.loadtest-svc-0.0': 'true', 'zone': 'a'})
+
+    assert controller.reconcile_placement_labels() == 2
+    labels = node_labels(cluster)
+    assert labels['worker-new'] == {'swarmguard.placement.loadtest-svc-0.1': 'true'}
+    assert labels[first['Description']['Hostname']] == {'swarmguard.placement.loadtest-svc-0.1': 'true', 'zone': 'a'}
+    assert controller.reconcile_placement_labels() == 0
+
+
+def test_reconcile_leaves_migrating_and_foreign_services_alone():
+    cluster, controller = make_controller()
+    controller.migrate_container('loadtest-svc-0', cluster.service_node('loadtest-svc-0'))
+    add_node(cluster, 'worker-new')
+
+    controller.migrating.add('loadtest-svc-0')
+    assert controller.reconcile_placement_labels() == 0
+    controller.migrating.clear()
+    assert controller.reconcile_placement_labels(owns=lambda service_name: False) == 0
+    assert node_labels(cluster)['worker-new'] == {}
+
+
+def test_placement_sync_reconciles_on_node_events():
+    cluster, controller = make_controller()
+    controller.migrate_container('loadtest-svc-0', cluster.service_node('loadtest-svc-0'))
+    sync = PlacementSync(ConfigSnapshot({'placement_sync': {'reconcile_interval': 3600}}, 1), controller)
+    sync.last_reconcile = float('inf')
+    add_node(cluster, 'worker-new')
+
+    sync.poll()
+    assert node_labels(cluster)['worker-new'] == {}
+
+    controller._client.events = lambda **kwargs: [{'Type': 'node', 'Action': 'create'}]
+    sync.poll()
+    assert node_labels(cluster)['worker-new'] == {'swarmguard.placement.loadtest-svc-0.1': 'true'}
+    assert sync.stats()['nodes_updated'] == 1
+
+
+def test_probe_follows_the_replacement_of_the_migrated_slot():
+    cluster, controller = make_controller(nodes=4)
+    cluster.scale('loadtest-svc-0', 3)
+    probed = []
+    controller.task_address = lambda task: task['ID']
+    controller.probe = lambda url, timeout: probed.append(url) or True
+
+    before = {t['ID'] for t in cluster.services['loadtest-svc-0']['Tasks']}
+    old = next(t for t in cluster.services['loadtest-svc-0']['Tasks'] if t['Slot'] == 2)
+    from_node = cluster.hostname(old['NodeID'])
+    result = controller.migrate_container('loadtest-svc-0', from_node)
+    assert result['success'] and result['readiness']['ready']
+
+    replacement = next(t for t in cluster.services['loadtest-svc-0']['Tasks']
+                       if t['Slot'] == 2 and t['ID'] not in before)
+    assert set(probed) == {f"http://{replacement['ID']}:8080/health"}
+    assert result['new_node'] == cluster.hostname(replacement['NodeID']) != from_node
+
+
+def test_target_node_pins_single_replica_services_only():
+    cluster, controller = make_controller(nodes=4)
+    from_node = cluster.service_node('loadtest-svc-0')
+    target = next(n for n in sorted(node_labels(cluster)) if n != from_node)
+    result = controller.migrate_container('loadtest-svc-0', from_node, target)
+    assert result['success'] and result['new_node'] == target
+
+    cluster.scale('loadtest-svc-1', 3)
+    from_node = cluster.service_node('loadtest-svc-1')
+    target = next(n for n in sorted(node_labels(cluster)) if n != from_node)
+    result = controller.migrate_container('loadtest-svc-1', from_node, target)
+    assert result['success'] and result['tasks_created'] == 3
+    running = [cluster.hostname(t['NodeID']) for t in cluster.running_tasks(cluster.services['loadtest-svc-1'])]
+    # Every replica was recreated, spread over the other nodes rather than stacked on the target
+    assert from_node not in running and len(set(running)) == 3
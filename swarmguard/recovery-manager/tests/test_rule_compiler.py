@@ -0,0 +1,112 @@
+import math
+
+import numpy as np
+import pytest
+
+from rule_compiler import DEFAULT_RULES, METRIC_NAMES, RollingHistory, RuleError, compile_rules
+
+PARAMS = {'cpu_threshold': 75, 'memory_threshold': 80, 'network_threshold_max': 35,
+          'network_threshold_min': 65, 'window': 3}
+
+
+def compile_one(when: str, **extra):
+    return compile_rules([dict({'name': 'r', 'action': 'scale_up', 'when': when, 'params': PARAMS}, **extra)])
+
+
+@pytest.mark.parametrize('when', [
+    "__import__('os').system('true')",
+    "open('/etc/passwd')",
+    "cpu.__class__",
+    "[cpu for cpu in (1, 2)]",
+    "cpu if mem else net",
+    "lambda: cpu",
+    "cpu in (1, 2)",
+    "cpu is None",
+    "cpu ** 2 > 4",
+    "cpu // 2 > 4",
+    "~cpu > 1",
+    "'80' < cpu",
+    "True",
+    "avg(cpu) > 1",
+    "avg(cpu, n=3) > 1",
+    "avg(cpu, -1) > 1",
+    "avg(cpu, 2.5) > 1",
+    "avg(cpu_threshold, 3) > 1",
+    "avg(cpu, mem) > 1",
+    "median(cpu, 3) > 1",
+    "undefined_name > 1",
+    "cpu >",
+])
+def test_rejects_everything_outside_the_whitelist(when):
+    with pytest.raises(RuleError):
+        compile_one(when)
+
+
+def test_rejects_non_numeric_params():
+    with pytest.raises(RuleError):
+        compile_rules([{'name': 'r', 'action': 'migration', 'when': 'cpu > limit', 'params': {'limit': 'high'}}])
+
+
+def test_action_is_validated():
+    with pytest.raises(RuleError, match='action'):
+        compile_rules([{'name': 'custom', 'when': 'cpu > 90'}])
+    with pytest.raises(RuleError, match='action'):
+        compile_rules([{'name': 'custom', 'action': 'reboot', 'when': 'cpu > 90'}])
+    rules = compile_rules([{'name': 'custom', 'action': 'scale_down', 'when': 'cpu < 5'},
+                           {'name': 'scenario1_migration', 'when': 'cpu > 90'}])
+    assert rules.action_for('custom') == 'scale_down'
+    assert rules.action_for('scenario1_migration') == 'migration'
+    assert rules.action_for('scenario2_scale_down') == 'scale_down'
+    assert rules.action_for('unknown') is None
+
+
+def test_duplicate_names_are_rejected():
+    with pytest.raises(RuleError, match='Duplicate'):
+        compile_rules([{'name': 'r', 'action': 'scale_up', 'when': 'cpu > 1'}] * 2)
+
+
+def test_optional_metrics_never_match_when_missing():
+    rules = compile_one("p95 > 250 or inflight > 1")
+    assert rules.evaluate({'cpu': 99.0, 'mem': 99.0, 'net': 99.0}) is None
+    assert rules.evaluate({'cpu': 0.0, 'mem': 0.0, 'net': 0.0, 'p95': 300.0}) == 'r'
+
+
+EXPRESSIONS = [
+    DEFAULT_RULES[0]['when'],
+    DEFAULT_RULES[1]['when'],
+    "avg(cpu, window) > 60 and delta(mem, 3) > 5",
+    "not (min(net, 2) > 10) or std(cpu, 4) >= 20",
+    "-cpu + 2 * mem / 4 - net != 0 and 10 < cpu <= 90",
+    "max(p95, 3) > 200 or inflight >= 2",
+]
+
+
+@pytest.mark.parametrize('when', EXPRESSIONS)
+def test_scalar_and_vectorized_agree(when):
+    rules = compile_one(when)
+    rng = np.random.default_rng(7)
+    keys = [f"c{i}" for i in range(40)]
+    history = RollingHistory(rules.history_size)
+    for step in range(6):
+        samples = {}
+        for key in keys:
+            sample = {m: float(rng.integers(0, 100)) for m in METRIC_NAMES}
+            if rng.random() < 0.3:
+                del sample['p95']
+                del sample['inflight']
+            samples[key] = sample
+            history.push(key, sample)
+
+        columns = {m: [samples[k].get(m, math.nan) for k in keys] for m in METRIC_NAMES}
+        vectorized = rules.evaluate_batch(columns, history.matrix(keys))['r'].tolist()
+        scalar = [bool(rules.by_name['r'].scalar(samples[k], history.samples[k])) for k in keys]
+        assert scalar == vectorized, f"step {step}"
+
+
+def test_first_match_batch_follows_rule_order():
+    definitions = [dict(rule, params=PARAMS) for rule in DEFAULT_RULES]
+    rules = compile_rules(definitions)
+    columns = {'cpu': [90, 90, 10], 'mem': [10, 10, 10], 'net': [10, 90, 50]}
+    assert rules.first_match_batch(columns) == ['scenario1_migration', 'scenario2_scaling', None]
+    assert [rules.evaluate({m: float(columns[m][i]) for m in columns}) for i in range(3)] == \
+        ['scenario1_migration', 'scenario2_scaling', None]
@@ -0,0 +1,126 @@
+import os
+import sys
+import time
+import socket
+import subprocess
+
+import pytest
+import requests
+
+from sharding import ConsistentHashRing, ShardMembership
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A stand-in worker: joins the router with ShardMembership and answers alerts
+# with whether it owns the service (plain text for service 'plain')
+WORKER = '''
+import os, sys
+from flask import Flask, request, jsonify
+from sharding import ShardMembership
+
+app = Flask(__name__)
+membership = ShardMembership(int(sys.argv[1]))
+
+@app.route('/alert', methods=['POST'])
+def alert():
+    service = request.get_json()['service_name']
+    if service == 'plain':
+        return 'not json', 500
+    return jsonify({'worker': membership.worker_id, 'owns': membership.owns(service), 'epoch': membership.epoch})
+
+@app.route('/shards')
+def shards():
+    return jsonify(membership.info())
+
+membership.start()
+app.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True)
+'''
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(condition, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if condition():
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    return False
+
+
+def test_ring_moves_only_the_removed_members_keys():
+    ring = ConsistentHashRing(['a', 'b', 'c'])
+    keys = [f'service-{i}' for i in range(300)]
+    before = {k: ring.get(k) for k in keys}
+    assert set(before.values()) == {'a', 'b', 'c'}
+    ring.remove('b')
+    after = {k: ring.get(k) for k in keys}
+    assert all(after[k] == before[k] for k in keys if before[k] != 'b')
+    assert 'b' not in after.values()
+
+
+def test_worker_owns_nothing_before_membership_is_known(monkeypatch):
+    monkeypatch.setenv('SHARD_ROUTER_URL', 'http://127.0.0.1:9')
+    membership = ShardMembership(5000)
+    assert membership.enabled
+    assert not any(membership.owns(f'service-{i}') for i in range(20))
+    monkeypatch.delenv('SHARD_ROUTER_URL')
+    assert ShardMembership(5000).owns('service-0')
+
+
+@pytest.fixture
+def cluster(tmp_path):
+    router_port = free_port()
+    router_url = f'http://127.0.0.1:{router_port}'
+    script = tmp_path / 'worker.py'
+    script.write_text(WORKER)
+    env = dict(os.environ, PYTHONPATH=HERE, FLASK_HOST='127.0.0.1', FLASK_PORT=str(router_port),
+               SHARD_MEMBER_TTL='2', SHARD_HEARTBEAT_INTERVAL='0.2', SHARD_ROUTER_URL=router_url)
+    processes = {'router': subprocess.Popen([sys.executable, os.path.join(HERE, 'router.py')], env=env, cwd=HERE,
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)}
+    for index in range(2):
+        port = free_port()
+        worker_env = dict(env, SHARD_WORKER_ID=f'worker-{index}', SHARD_ADVERTISE_URL=f'http://127.0.0.1:{port}')
+        processes[f'worker-{index}'] = subprocess.Popen([sys.executable, str(script), str(port)], env=worker_env,
+                                                        cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        assert wait_for(lambda: len(requests.get(f'{router_url}/shards', timeout=1).json()['members']) == 2)
+        yield router_url, processes
+    finally:
+        for process in processes.values():
+            process.kill()
+            process.wait()
+
+
+def send_alerts(router_url: str, services: list) -> dict:
+    return {s: requests.post(f'{router_url}/alert', json={'service_name': s}, timeout=5) for s in services}
+
+
+def test_router_forwards_to_the_owner_and_fails_over(cluster):
+    router_url, processes = cluster
+    services = [f'service-{i}' for i in range(30)]
+    epoch = requests.get(f'{router_url}/shards', timeout=1).json()['epoch']
+    # Workers pick up the two-member ring on their next heartbeat
+    assert wait_for(lambda: all(r.json()['epoch'] == epoch for r in send_alerts(router_url, services[:4]).values()))
+
+    responses = send_alerts(router_url, services)
+    assert all(r.status_code == 200 and r.json()['owns'] for r in responses.values())
+    assert {r.json()['worker'] for r in responses.values()} == {'worker-0', 'worker-1'}
+    forwarded = {w: m['forwarded'] for w, m in requests.get(f'{router_url}/shards', timeout=1).json()['members'].items()}
+    assert sum(forwarded.values()) >= len(services)
+
+    plain = requests.post(f'{router_url}/alert', json={'service_name': 'plain'}, timeout=5)
+    assert plain.status_code == 502 and 'JSON' in plain.json()['message']
+
+    processes['worker-1'].kill()
+    processes['worker-1'].wait()
+    responses = send_alerts(router_url, services)
+    assert all(r.status_code == 200 and r.json()['worker'] == 'worker-0' for r in responses.values())
+    assert wait_for(lambda: all(r.json()['owns'] for r in send_alerts(router_url, services).values()))
@@ -0,0 +1,26 @@
+from simulator import DEFAULT_MODEL, SimClock, SimDockerController
+
+
+def run_migration(nodes: list) -> tuple:
+    clock = SimClock(1000.0)
+    swarm = SimDockerController(clock, DEFAULT_MODEL, {})
+    for node in nodes:
+        swarm.observe_node(node)
+    swarm.observe('worker-1', {'container_id': 'c1', 'service_name': 'web'}, 1)
+    result = {}
+    clock.spawn(lambda: result.update(swarm.migrate_container('web', 'worker-1')))
+    clock.wait_idle()
+    return swarm, result
+
+
+def test_migration_reaches_a_node_that_only_reported_node_metrics():
+    swarm, result = run_migration(['worker-1', 'worker-2'])
+    assert result['success'] and result['new_node'] == 'worker-2'
+    assert swarm.placement['c1'] == 'worker-2' and 'c1' in swarm.relieved
+
+
+def test_migration_without_another_node_fails():
+    swarm, result = run_migration(['worker-1'])
+    assert not result['success']
+    assert swarm.placement['c1'] == 'worker-1' and not swarm.relieved and not swarm.effects
+    assert swarm.operations[-1]['success'] is False
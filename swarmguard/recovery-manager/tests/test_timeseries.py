@@ -0,0 +1,41 @@
+from timeseries import TimeSeriesStore
+
+
+def store(**settings) -> TimeSeriesStore:
+    return TimeSeriesStore({'timeseries': settings})
+
+
+def test_missing_metrics_are_left_out_of_the_aggregates():
+    series = store()
+    series.record('service', 'web', 100.0, {'cpu_percent': 40, 'latency_p95_ms': 300, 'in_flight': 4}, weight=1)
+    series.record('service', 'web', 101.0, {'cpu_percent': 20}, weight=3)
+    observed = series.aggregate('service', 'web', window_seconds=60, now=102.0)
+    assert observed['mean']['cpu_percent'] == 25.0
+    # Points without latency do not pull the mean towards 0
+    assert observed['mean']['latency_p95_ms'] == 300.0
+    assert observed['mean']['in_flight'] == 4.0
+    assert observed['max']['latency_p95_ms'] == 300.0
+    assert observed['last']['latency_p95_ms'] is None
+    assert observed['mean']['memory_percent'] is None
+
+
+def test_reload_resizes_existing_series():
+    config = {'timeseries': {'service_points': 4, 'max_series': 3}}
+    series = TimeSeriesStore(config)
+    for name in ('a', 'b', 'c'):
+        for t in range(6):
+            series.record('service', name, 100.0 + t, {'cpu_percent': t}, weight=1)
+
+    config['timeseries'].update(service_points=2, max_series=2)
+    series.load_settings()
+    assert len(series.series) == 2
+    ring = series.series[('service', 'c')]
+    assert len(ring.times) == 2
+    # The newest points are kept
+    assert series.aggregate('service', 'c', window_seconds=60, now=110.0)['mean']['cpu_percent'] == 4.5
+
+    config['timeseries'].update(service_points=8)
+    series.load_settings()
+    series.record('service', 'c', 106.0, {'cpu_percent': 6}, weight=1)
+    observed = series.aggregate('service', 'c', window_seconds=60, now=110.0)
+    assert observed['points'] == 3 and observed['last']['cpu_percent'] == 6.0
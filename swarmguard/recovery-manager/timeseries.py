@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Time-Series Store - Fixed-size NumPy ring buffers of recent per-service and per-node load"""
+
+import math
+import time
+import logging
+from threading import Lock
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SERIES_METRICS = {
+    'service': ('cpu_percent', 'memory_percent', 'network_percent', 'latency_p95_ms', 'in_flight'),
+    'node': ('cpu_percent', 'memory_percent', 'network_rx_mbps', 'network_tx_mbps'),
+}
+
+
+class RingSeries:
+    """
+    One series: timestamps, a float32 row per point and a weight per point
+    (replicas the point averages over). Slots are preallocated; the oldest
+    point is overwritten once the ring is full.
+    """
+
+    __slots__ = ('times', 'values', 'weights', 'head', 'count', 'updated')
+
+    def __init__(self, capacity: int, width: int):
+        self.times = np.full(capacity, -np.inf)
+        self.values = np.zeros((capacity, width), dtype=np.float32)
+        self.weights = np.zeros(capacity, dtype=np.float32)
+        self.head = 0
+        self.count = 0
+        self.updated = 0.0
+
+    @staticmethod
+    def point_bytes(width: int) -> int:
+        return 8 + 4 * width + 4
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.nbytes + self.values.nbytes + self.weights.nbytes
+
+    def append(self, timestamp: float, row: list, weight: float):
+        self.times[self.head] = timestamp
+        self.values[self.head] = row
+        self.weights[self.head] = weight
+        self.head = (self.head + 1) % len(self.times)
+        self.count = min(self.count + 1, len(self.times))
+        self.updated = time.time()
+
+    def resized(self, capacity: int) -> 'RingSeries':
+        """A copy holding the newest points that fit in capacity slots"""
+        ring = RingSeries(capacity, self.values.shape[1])
+        kept = min(self.count, capacity)
+        order = (self.head - kept + np.arange(kept)) % len(self.times)  # oldest kept point first
+        ring.times[:kept] = self.times[order]
+        ring.values[:kept] = self.values[order]
+        ring.weights[:kept] = self.weights[order]
+        ring.head = kept % capacity
+        ring.count = kept
+        ring.updated = self.updated
+        return ring
+
+    def window(self, since: float):
+        """(times, values, weights) of points at or after since, unordered"""
+        mask = self.times >= since
+        return self.times[mask], self.values[mask], self.weights[mask]
+
+
+class TimeSeriesStore:
+    """
+    Recent cpu/memory/network per service (weighted by the replicas each
+    agent summary covers; p95 latency and in-flight requests for services
+    that export them) and per node, fed by the samples agents send every
+    poll. A metric a point does not carry is stored as NaN and left out of
+    the aggregates, which report None for a metric no point in the window
+    carries. Memory is bounded: a fixed number of points per series and at
+    most max_series series, evicting the least recently updated.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = Lock()
+        self.series = {}  # (kind, name) -> RingSeries
+        self.points = 0
+        self.evictions = 0
+        self.load_settings()
+        logger.info(f"Time-series store initialized: {self.service_points} points/service, "
+                    f"{self.node_points} points/node, max {self.max_series} series")
+
+    def load_settings(self):
+        settings = self.config.get('timeseries', {}) or {}
+        self.enabled = settings.get('enabled', True)
+        self.service_points = int(settings.get('service_points', 720))
+        self.node_points = int(settings.get('node_points', 180))
+        self.max_series = int(settings.get('max_series', 1000))
+        self.default_window = float(settings.get('default_window_seconds', 60))
+        self._apply_capacity()
+
+    def _apply_capacity(self):
+        """Fit existing series to the current points per series and series limit (after a reload)"""
+        with self.lock:
+            for key, series in list(self.series.items()):
+                capacity = self.service_points if key[0] == 'service' else self.node_points
+                if len(series.times) != capacity:
+                    self.series[key] = series.resized(capacity)
+            while len(self.series) > self.max_series:
+                oldest = min(self.series, key=lambda k: self.series[k].updated)
+                del self.series[oldest]
+                self.evictions += 1
+
+    def _series(self, kind: str, name: str) -> RingSeries:
+        key = (kind, name)
+        series = self.series.get(key)
+        if series is None:
+            if len(self.series) >= self.max_series:
+                oldest = min(self.series, key=lambda k: self.series[k].updated)
+                del self.series[oldest]
+                self.evictions += 1
+            capacity = self.service_points if kind == 'service' else self.node_points
+            series = self.series[key] = RingSeries(capacity, len(SERIES_METRICS[kind]))
+        return series
+
+    def record(self, kind: str, name: str, timestamp: float, metrics: dict, weight: float = 1.0):
+        if not self.enabled or not name:
+            return
+        row = [math.nan if metrics.get(metric) is None else float(metrics[metric]) for metric in SERIES_METRICS[kind]]
+        with self.lock:
+            self._series(kind, name).append(timestamp, row, weight)
+            self.points += 1
+
+    def aggregate(self, kind: str, name: str, window_seconds: float = None, now: float = None):
+        """
+        {'points', 'span_seconds', 'mean', 'max', 'last'} over the
+        window ('mean' weighted by replicas), or None without points in it
+        """
+        now = time.time() if now is None else now
+        window_seconds = self.default_window if window_seconds is None else window_seconds
+        with self.lock:
+            series = self.series.get((kind, name))
+            if series is None:
+                return None
+            times, values, weights = series.window(now - window_seconds)
+        if not len(times):
+            return None
+        metrics = SERIES_METRICS[kind]
+        values, weights = values.astype(np.float64), weights.astype(np.float64)
+        # Weighted nanmean/nanmax per metric: points without the metric do not count
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
+        covered = weights @ present
+        mean = np.where(covered > 0, weights @ filled / np.maximum(covered, 1e-9), np.nan)
+        peak = np.where(present.any(axis=0), np.where(present, values, -np.inf).max(axis=0), np.nan)
+        latest = int(times.argmax())
+
+        def as_dict(vector) -> dict:
+            return {m: None if math.isnan(v) else v for m, v in zip(metrics, vector.round(2).tolist())}
+        return {'points': int(len(times)), 'span_seconds': float(times.max() - times.min()),
+                'mean': as_dict(mean), 'max': as_dict(peak), 'last': as_dict(values[latest])}
+
+    def names(self, kind: str) -> list:
+        with self.lock:
+            return sorted(name for k, name in self.series if k == kind)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'enabled': self.enabled,
+                    'services': sum(1 for kind, _ in self.series if kind == 'service'),
+                    'nodes': sum(1 for kind, _ in self.series if kind == 'node'),
+                    'points_ingested': self.points, 'evictions': self.evictions,
+                    'memory_bytes': sum(s.nbytes for s in self.series.values()),
+                    'memory_limit_bytes': self.max_series * max(
+                        self.service_points * RingSeries.point_bytes(len(SERIES_METRICS['service'])),
+                        self.node_points * RingSeries.point_bytes(len(SERIES_METRICS['node'])))}
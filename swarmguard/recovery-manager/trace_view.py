@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+SwarmGuard Trace Viewer - Per-phase latency waterfall of one alert, from the
+breaching sample on the agent to the completed recovery action
+
+Usage:
+    python trace_view.py --list                        # recent traces in tracing.path
+    python trace_view.py <trace_id | recovery_id>      # waterfall of one trace
+    python trace_view.py --service web-stress          # latest trace that ran an action for the service
+    python trace_view.py --spans spans.jsonl --spans agent-spans.jsonl <id>
+    python trace_view.py --url http://recovery-manager:5000 <id>   # spans held by a running manager
+    python trace_view.py --influx --since 6h <id>      # agent and manager spans shipped to InfluxDB
+
+Span files are the OTLP/JSON lines written by the manager (tracing.path) and
+by the agents (TRACE_FILE); several can be merged. InfluxDB holds both, so
+--influx shows the agent's spans without copying files off the nodes.
+Delivery spans cross from the agent's clock to the manager's: skew between
+the nodes shows up there (negative if the manager's clock is behind).
+"""
+
+import os
+import re
+import csv
+import sys
+import argparse
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import yaml
+import requests
+
+from tracing import read_otlp_line
+
+BAR_WIDTH = 40
+ROOT_NAMES = ('alert', 'recovery')
+
+
+def load_files(paths: list) -> list:
+    spans = []
+    for path in paths:
+        try:
+            with open(path) as f:
+                for number, line in enumerate(f, 1):
+                    if line.strip():
+                        try:
+                            spans.extend(read_otlp_line(line))
+                        except (ValueError, KeyError) as e:
+                            print(f"{path}:{number}: skipped ({e})", file=sys.stderr)
+        except OSError as e:
+            print(f"Cannot read {path}: {e}", file=sys.stderr)
+    return spans
+
+
+def load_manager(url: str) -> list:
+    response = requests.get(f"{url.rstrip('/')}/traces", params={'limit': 100000}, timeout=5)
+    response.raise_for_status()
+    return response.json()['spans']
+
+
+def parse_rfc3339(value: str) -> float:
+    """Epoch seconds of an RFC3339 timestamp with up to nanosecond precision"""
+    match = re.match(r'(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(\d+))?Z', value)
+    seconds = datetime.strptime(match.group(1), '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc).timestamp()
+    return seconds + (int(match.group(2)) / 10 ** len(match.group(2)) if match.group(2) else 0.0)
+
+
+def load_influx(config: dict, since: str) -> list:
+    influx = config.get('influxdb', {})
+    query = (f'from(bucket: "{influx["bucket"]}") |> range(start: -{since})'
+             f' |> filter(fn: (r) => r._measurement == "spans")'
+             f' |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")')
+    response = requests.post(f"{influx['url'].rstrip('/')}/api/v2/query", params={'org': influx['org']},
+                             headers={'Authorization': f"Token {influx['token']}", 'Accept': 'application/csv',
+                                      'Content-Type': 'application/vnd.flux'}, data=query, timeout=30)
+    response.raise_for_status()
+    reserved = {'', 'result', 'table', '_start', '_stop', '_time', '_measurement', 'source', 'name',
+                'trace_id', 'span_id', 'parent_id', 'duration_ms', 'ok'}
+    spans, header = [], None
+    for row in csv.reader(response.text.splitlines()):
+        if not row:
+            header = None
+        elif row[1:3] == ['result', 'table']:
+            header = row
+        elif header:
+            record = dict(zip(header, row))
+            start = parse_rfc3339(record['_time'])
+            attributes = {k: v for k, v in record.items() if k not in reserved and v != ''}
+            spans.append({'trace_id': record['trace_id'], 'span_id': record['span_id'],
+                          'parent_id': record.get('parent_id') or None, 'name': record['name'],
+                          'start': start, 'end': start + float(record['duration_ms']) / 1000,
+                          'ok': record.get('ok', 'true') == 'true', 'source': record['source'],
+                          'attributes': attributes})
+    return spans
+
+
+def group_traces(spans: list) -> dict:
+    traces = defaultdict(dict)
+    for span in spans:
+        traces[span['trace_id']][span['span_id'], span['name']] = span  # the same span from several sources once
+    return {trace_id: sorted(by_id.values(), key=lambda s: (s['start'], s['end'])) for trace_id, by_id in traces.items()}
+
+
+def root_of(spans: list) -> dict:
+    roots = [s for s in spans if not s['parent_id'] and s['name'] in ROOT_NAMES]
+    return roots[0] if roots else None
+
+
+def summary(trace_id: str, spans: list) -> dict:
+    root = root_of(spans)
+    attributes = dict(root['attributes']) if root else {}
+    for span in spans:
+        for key in ('service', 'recovery_id', 'action'):
+            if attributes.get(key) is None:
+                attributes[key] = span['attributes'].get(key)
+    return {'trace_id': trace_id, 'start': min(s['start'] for s in spans), 'end': max(s['end'] for s in spans),
+            'service': attributes.get('service'), 'scenario': attributes.get('scenario'),
+            'status': attributes.get('status'), 'recovery_id': attributes.get('recovery_id'),
+            'action': attributes.get('action'), 'spans': len(spans)}
+
+
+def find_trace(traces: dict, key: str = None, service: str = None):
+    if key:
+        if key in traces:
+            return key
+        matches = [t for t, spans in traces.items() if any(s['attributes'].get('recovery_id') == key for s in spans)]
+        return max(matches, key=lambda t: summary(t, traces[t])['start']) if matches else None
+    candidates = [summary(t, spans) for t, spans in traces.items()]
+    candidates = [c for c in candidates if c['service'] == service]
+    acted = [c for c in candidates if c['action']]
+    pool = acted or candidates
+    return max(pool, key=lambda c: c['start'])['trace_id'] if pool else None
+
+
+def short_source(source: str) -> str:
+    return 'agent' if 'agent' in (source or '') else 'manager'
+
+
+def render(trace_id: str, spans: list) -> str:
+    info = summary(trace_id, spans)
+    t0, total = info['start'], max(info['end'] - info['start'], 1e-9)
+    root = root_of(spans)
+    lines = [f"trace {trace_id}",
+             '  ' + '  '.join(f"{k}={info[k]}" for k in ('service', 'scenario', 'action', 'status', 'recovery_id') if info[k]),
+             f"  started {datetime.fromtimestamp(t0).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]}, total {total:.3f}s"
+             + ('' if root and str(root['attributes'].get('agent_context', True)).lower() == 'true'
+                else ' (no agent context: starts at receipt)'),
+             '']
+    children = [s for s in spans if s is not root]
+    phases = [s for s in children if s['name'].startswith(('agent.', 'alert.', 'manager.', 'recovery.'))]
+    for span in ([root] if root else []) + children:
+        duration = span['end'] - span['start']
+        # Calls made during a phase (docker.*, standby.*) are drawn under it
+        nested = span is not root and span not in phases and any(
+            p['start'] <= span['start'] and span['end'] <= p['end'] for p in phases)
+        name = ('    ' if nested else '  ' if span is not root else '') + span['name'] + ('' if span['ok'] else ' !')
+        offset = max(span['start'] - t0, 0.0)
+        begin = min(int(offset / total * BAR_WIDTH), BAR_WIDTH - 1)
+        length = max(1, min(round(max(duration, 0) / total * BAR_WIDTH), BAR_WIDTH - begin))
+        bar = ' ' * begin + '█' * length
+        lines.append(f"  {offset:+8.3f}s  {name:<32} {duration:9.3f}s  {short_source(span['source']):<7} |{bar:<{BAR_WIDTH}}|")
+    skewed = [s for s in spans if s['name'] == 'alert.delivery' and s['end'] < s['start']]
+    if skewed:
+        lines.append("\n  alert.delivery is negative: the manager's clock is behind the agent's")
+    return '\n'.join(lines)
+
+
+def render_list(traces: dict, limit: int) -> str:
+    rows = sorted((summary(t, spans) for t, spans in traces.items()), key=lambda r: r['start'], reverse=True)[:limit]
+    lines = [f"{'started':<23} {'trace_id':<32} {'service':<20} {'action':<11} {'status':<10} {'recovery':<12} {'total':>9}"]
+    for r in rows:
+        lines.append(f"{datetime.fromtimestamp(r['start']).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]:<23} {r['trace_id']:<32} "
+                     f"{(r['service'] or '-')[:20]:<20} {r['action'] or '-':<11} {r['status'] or '-':<10} "
+                     f"{r['recovery_id'] or '-':<12} {r['end'] - r['start']:8.3f}s")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SwarmGuard recovery trace waterfall')
+    parser.add_argument('id', nargs='?', help='trace ID or recovery ID')
+    parser.add_argument('--config', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.yaml'))
+    parser.add_argument('--spans', action='append', default=[], help='OTLP/JSON span file (default: tracing.path)')
+    parser.add_argument('--url', help='read spans from a running manager (GET /traces)')
+    parser.add_argument('--influx', action='store_true', help="read spans from InfluxDB's 'spans' measurement")
+    parser.add_argument('--since', default='24h', help='InfluxDB range, e.g. 30m, 6h, 7d')
+    parser.add_argument('--service', help='latest trace for this service that ran a recovery action')
+    parser.add_argument('--list', action='store_true', help='list recent traces')
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+    if not (args.id or args.service or args.list):
+        parser.error('give a trace or recovery ID, --service or --list')
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f) or {}
+    if args.influx:
+        spans = load_influx(config, args.since)
+    elif args.url:
+        spans = load_manager(args.url)
+    else:
+        spans = load_files(args.spans or [config.get('tracing', {}).get('path', '/app/state/spans.jsonl')])
+    traces = group_traces(spans)
+
+    if args.list:
+        print(render_list(traces, args.limit))
+        return 0
+    trace_id = find_trace(traces, args.id, args.service)
+    if trace_id is None:
+        print(f"No trace found for {args.id or args.service} in {len(traces)} traces", file=sys.stderr)
+        return 1
+    print(render(trace_id, traces[trace_id]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
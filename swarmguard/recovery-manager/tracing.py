@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""Tracing - End-to-end spans from the breaching sample to the completed recovery action"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock, Event, Thread
+
+import requests
+
+from event_journal import PHASES
+
+logger = logging.getLogger(__name__)
+
+SCOPE = 'swarmguard'
+STATUS_OK, STATUS_ERROR = 1, 2
+
+# (tracer, trace) of the alert being handled on this thread; DockerController calls add child spans to it
+_active = contextvars.ContextVar('swarmguard_trace', default=None)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def carrier(headers) -> dict:
+    """traceparent/tracestate from HTTP headers (or any mapping), or None"""
+    if not headers or not headers.get('traceparent'):
+        return None
+    return {'traceparent': headers.get('traceparent'), 'tracestate': headers.get('tracestate', '')}
+
+
+def extract(trace_carrier: dict) -> dict:
+    """
+    {'trace_id', 'root_id', 'sampled', 'sent'} from a W3C traceparent plus
+    the agent's tracestate entry (swarmguard=sampled:<ms>;sent:<ms>), or
+    None if the carrier is missing or malformed
+    """
+    try:
+        version, trace_id, span_id, _ = trace_carrier['traceparent'].split('-')
+        int(trace_id, 16), int(span_id, 16)
+        if len(trace_id) != 32 or len(span_id) != 16:
+            return None
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+    context = {'trace_id': trace_id, 'root_id': span_id, 'sampled': None, 'sent': None}
+    for member in (trace_carrier.get('tracestate') or '').split(','):
+        key, _, value = member.strip().partition('=')
+        if key != SCOPE:
+            continue
+        for item in value.split(';'):
+            name, _, millis = item.partition(':')
+            if name in ('sampled', 'sent'):
+                try:
+                    context[name] = int(millis) / 1000.0
+                except ValueError:
+                    pass
+    return context
+
+
+def otlp_attributes(attributes: dict) -> list:
+    encoded = []
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            encoded.append({'key': key, 'value': {'boolValue': value}})
+        elif isinstance(value, int):
+            encoded.append({'key': key, 'value': {'intValue': str(value)}})
+        elif isinstance(value, float):
+            encoded.append({'key': key, 'value': {'doubleValue': value}})
+        else:
+            encoded.append({'key': key, 'value': {'stringValue': str(value)}})
+    return encoded
+
+
+def otlp_line(service_name: str, spans: list) -> str:
+    """One OTLP/JSON ExportTraceServiceRequest (as read by the collector's otlpjsonfile receiver)"""
+    return json.dumps({'resourceSpans': [{
+        'resource': {'attributes': otlp_attributes({'service.name': service_name})},
+        'scopeSpans': [{'scope': {'name': SCOPE}, 'spans': [{
+            'traceId': span['trace_id'], 'spanId': span['span_id'], 'parentSpanId': span['parent_id'] or '',
+            'name': span['name'], 'kind': 1,
+            'startTimeUnixNano': str(int(span['start'] * 1e9)), 'endTimeUnixNano': str(int(span['end'] * 1e9)),
+            'attributes': otlp_attributes(span['attributes']),
+            'status': {'code': STATUS_OK if span['ok'] else STATUS_ERROR}} for span in spans]}]}]},
+        separators=(',', ':'))
+
+
+def read_otlp_line(line: str) -> list:
+    """Spans of one OTLP/JSON line, flattened to the dicts Tracer records"""
+    spans = []
+    for resource_spans in json.loads(line).get('resourceSpans', []):
+        resource = {a['key']: next(iter(a['value'].values())) for a in resource_spans.get('resource', {}).get('attributes', [])}
+        for scope_spans in resource_spans.get('scopeSpans', []):
+            for span in scope_spans.get('spans', []):
+                attributes = {}
+                for attribute in span.get('attributes', []):
+                    kind, value = next(iter(attribute['value'].items()))
+                    attributes[attribute['key']] = int(value) if kind == 'intValue' else value
+                spans.append({'trace_id': span['traceId'], 'span_id': span['spanId'],
+                              'parent_id': span.get('parentSpanId') or None, 'name': span['name'],
+                              'start': int(span['startTimeUnixNano']) / 1e9, 'end': int(span['endTimeUnixNano']) / 1e9,
+                              'ok': span.get('status', {}).get('code', STATUS_OK) != STATUS_ERROR,
+                              'source': resource.get('service.name'), 'attributes': attributes})
+    return spans
+
+
+def influx_line(span: dict, source: str) -> str:
+    """'spans' point: bounded tags (source, name), ids and attributes as fields, ns timestamp = span start"""
+    fields = {'trace_id': span['trace_id'], 'span_id': span['span_id'], 'parent_id': span['parent_id'] or '',
+              'duration_ms': round((span['end'] - span['start']) * 1000, 3), 'ok': span['ok']}
+    fields.update((k.replace('.', '_'), v) for k, v in span['attributes'].items() if v is not None)
+    encoded = []
+    for key, value in fields.items():
+        if isinstance(value, bool):
+            encoded.append(f"{key}={'true' if value else 'false'}")
+        elif isinstance(value, (int, float)):
+            encoded.append(f"{key}={float(value)}")
+        else:
+            encoded.append(f"{key}=\"{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}\"")
+    return f"spans,source={source},name={span['name']} {','.join(encoded)} {int(span['start'] * 1e9)}"
+
+
+def current() -> dict:
+    """Trace of the alert being handled in this context, or None"""
+    active = _active.get()
+    return active[1] if active else None
+
+
+@contextmanager
+def activate(tracer, trace: dict):
+    token = _active.set((tracer, trace) if trace else None)
+    try:
+        yield trace
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the block as a child of the active trace's root span (no-op outside a traced alert)"""
+    active = _active.get()
+    start = time.time()
+    ok = True
+    try:
+        yield
+    except Exception:
+        ok = False
+        raise
+    finally:
+        if active:
+            tracer, trace = active
+            tracer.record(trace, name, start, time.time(), ok=ok, **attributes)
+
+
+class Tracer:
+    """
+    Each alert is one trace. The agent starts it when a sample breaches a
+    rule: it picks the trace ID and the root span ID, records its collect,
+    evaluate and send spans, and passes the context with the alert
+    (traceparent/tracestate headers, or a 'trace' entry in streamed
+    alerts). Alerts without a context get a trace started on receipt.
+
+    The manager adds alert.delivery (agent send to receipt), manager.queue
+    (admission queue wait), one recovery.<phase> span per recovery phase
+    (ending when the phase was reached, as in the journal), docker.* spans
+    around DockerController calls, and closes the root 'alert' span. Spans
+    are appended to tracing.path as OTLP/JSON lines, kept in memory for
+    /traces and shipped to InfluxDB as 'spans' points by a flush thread.
+    """
+
+    def __init__(self, config, service_name: str = 'swarmguard-recovery-manager'):
+        self.config = config
+        self.service_name = service_name
+        self.lock = Lock()
+        self.file = None
+        self.path = None
+        self.recent = deque()
+        self.influx_buffer = deque()
+        self.spans_recorded = 0
+        self.spans_shipped = 0
+        self.spans_dropped = 0
+        self.ship_failures = 0
+        self.stopping = Event()
+        self.thread = None
+        self.load_settings()
+
+    def load_settings(self):
+        settings = self.config.get('tracing', {}) or {}
+        self.enabled = settings.get('enabled', True)
+        self.ship = settings.get('ship_to_influxdb', True) and bool(self.config.get('influxdb.url'))
+        self.flush_interval = float(settings.get('flush_interval', 5))
+        self.max_buffer = int(settings.get('max_buffer', 5000))
+        with self.lock:
+            self.recent = deque(self.recent, maxlen=int(settings.get('recent_spans', 5000)))
+            path = settings.get('path', '/app/state/spans.jsonl')
+            if self.enabled and path != self.path:
+                if self.file is not None:
+                    self.file.close()
+                self.path = path
+                self.file = self._open()
+
+    def _open(self):
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            f = open(self.path, 'a', buffering=1)
+            logger.info(f"Trace spans: {self.path}")
+            return f
+        except OSError as e:
+            logger.error(f"Cannot open span file {self.path}: {e} - spans kept in memory only")
+            return None
+
+    def received(self, alert_data: dict, transport: str, now: float = None) -> dict:
+        """Replace the alert's trace carrier with its context, stamped with the receipt time"""
+        if not self.enabled or not alert_data:
+            return None
+        trace = alert_data.get('trace')
+        if isinstance(trace, dict) and 'received' in trace:
+            return trace
+        trace = extract(trace) or {'trace_id': new_trace_id(), 'root_id': new_span_id(), 'sampled': None, 'sent': None}
+        trace.update(received=time.time() if now is None else now, transport=transport)
+        alert_data['trace'] = trace
+        return trace
+
+    def begin(self, alert_data: dict, start_time: float) -> dict:
+        """Trace of an alert whose handling starts at start_time (None when tracing is off)"""
+        if not self.enabled:
+            return None
+        return self.received(alert_data, 'direct', start_time)
+
+    def _span(self, trace: dict, name: str, start: float, end: float, ok: bool = True, span_id: str = None,
+              **attributes) -> dict:
+        """A child of the trace's root span, or the root itself when span_id is the root's"""
+        span_id = span_id or new_span_id()
+        return {'trace_id': trace['trace_id'], 'span_id': span_id,
+                'parent_id': None if span_id == trace['root_id'] else trace['root_id'], 'name': name,
+                'start': start, 'end': max(end, start), 'ok': ok, 'source': self.service_name,
+                'attributes': attributes}
+
+    def _emit(self, spans: list):
+        if not spans:
+            return
+        line = otlp_line(self.service_name, spans)
+        with self.lock:
+            self.recent.extend(spans)
+            self.spans_recorded += len(spans)
+            if self.file is not None:
+                try:
+                    self.file.write(line + '\n')
+                except OSError as e:
+                    logger.error(f"Span write failed: {e}")
+            if self.ship:
+                for s in spans:
+                    if len(self.influx_buffer) >= self.max_buffer:
+                        self.influx_buffer.popleft()
+                        self.spans_dropped += 1
+                    self.influx_buffer.append(influx_line(s, 'manager'))
+
+    def record(self, trace: dict, name: str, start: float, end: float, ok: bool = True, **attributes):
+        if trace is None or not self.enabled:
+            return
+        self._emit([self._span(trace, name, start, end, ok, **attributes)])
+
+    def record_phases(self, trace: dict, phases: dict, **attributes):
+        """
+        recovery.<phase> spans from the recovery's phase timestamps. Recoveries
+        the manager starts itself (predictive scale-up, scale-down) have no
+        alert trace: they get their own, rooted in a 'recovery' span.
+        """
+        if not self.enabled or not phases:
+            return
+        ordered = sorted((p for p in PHASES if p in phases), key=lambda p: (phases[p], PHASES.index(p)))
+        spans = []
+        if trace is None:
+            trace = {'trace_id': new_trace_id(), 'root_id': new_span_id()}
+            spans.append(self._span(trace, 'recovery', phases[ordered[0]], phases[ordered[-1]],
+                                    span_id=trace['root_id'], **attributes))
+        else:
+            trace['phases_recorded'] = True
+        ok = attributes.get('status', 'success').startswith('success')
+        for previous, phase in zip(ordered, ordered[1:]):
+            spans.append(self._span(trace, f'recovery.{phase}', phases[previous], phases[phase],
+                                    ok=ok or phase != ordered[-1], **attributes))
+        self._emit(spans)
+
+    def finish(self, trace: dict, alert_data: dict, start_time: float, result: dict):
+        """Close an alert's trace once the manager has answered it"""
+        if trace is None or not self.enabled:
+            return
+        end = time.time()
+        status = result.get('status', 'unknown')
+        spans = []
+        if trace.get('sent') is not None:
+            spans.append(self._span(trace, 'alert.delivery', trace['sent'], trace['received'], transport=trace.get('transport')))
+        spans.append(self._span(trace, 'manager.queue', trace['received'], start_time))
+        if not trace.get('phases_recorded'):
+            spans.append(self._span(trace, 'manager.decide', start_time, end, outcome=status))
+        spans.append(self._span(trace, 'alert', trace.get('sampled') or trace['received'], end, ok=status != 'error',
+                                span_id=trace['root_id'],
+                                service=alert_data.get('service_name', alert_data.get('container_name')),
+                                node=alert_data.get('node'), scenario=alert_data.get('scenario'), status=status,
+                                recovery_id=result.get('recovery_id') or trace.get('recovery_id'),
+                                agent_context=trace.get('sampled') is not None))
+        self._emit(spans)
+
+    def spans(self, trace_id: str = None, recovery_id: str = None, limit: int = 500) -> list:
+        with self.lock:
+            spans = list(self.recent)
+        if recovery_id:
+            traces = {s['trace_id'] for s in spans if s['attributes'].get('recovery_id') == recovery_id}
+            spans = [s for s in spans if s['trace_id'] in traces]
+        if trace_id:
+            spans = [s for s in spans if s['trace_id'] == trace_id]
+        return spans[-limit:]
+
+    def flush(self) -> int:
+        """Ship buffered spans to InfluxDB; returns the number written"""
+        with self.lock:
+            lines = list(self.influx_buffer)
+            self.influx_buffer.clear()
+        if not lines:
+            return 0
+        try:
+            response = requests.post(f"{self.config.get('influxdb.url').rstrip('/')}/api/v2/write",
+                                     params={'org': self.config.get('influxdb.org'),
+                                             'bucket': self.config.get('influxdb.bucket'), 'precision': 'ns'},
+                                     headers={'Authorization': f"Token {self.config.get('influxdb.token')}",
+                                              'Content-Type': 'text/plain; charset=utf-8'},
+                                     data='\n'.join(lines).encode(), timeout=2)
+            if response.status_code == 204:
+                with self.lock:
+                    self.spans_shipped += len(lines)
+                return len(lines)
+            logger.error(f"InfluxDB span write failed: HTTP {response.status_code} - {response.text[:200]}")
+        except requests.RequestException as e:
+            logger.error(f"InfluxDB span write error: {e}")
+        with self.lock:
+            self.ship_failures += 1
+            # Keep the newest of the batch for the next flush, within the buffer bound
+            room = max(self.max_buffer - len(self.influx_buffer), 0)
+            kept = lines[len(lines) - room:] if room < len(lines) else lines
+            self.influx_buffer.extendleft(reversed(kept))
+            self.spans_dropped += len(lines) - len(kept)
+        return 0
+
+    def flush_loop(self):
+        while not self.stopping.wait(self.flush_interval):
+            if self.ship:
+                self.flush()
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.stopping.clear()
+        self.thread = Thread(target=self.flush_loop, daemon=True, name='trace-flush')
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        if self.ship:
+            self.flush()
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'enabled': self.enabled, 'path': self.path if self.file is not None else None,
+                    'spans_recorded': self.spans_recorded, 'shipping': self.ship,
+                    'spans_shipped': self.spans_shipped, 'buffered': len(self.influx_buffer),
+                    'spans_dropped': self.spans_dropped, 'ship_failures': self.ship_failures}
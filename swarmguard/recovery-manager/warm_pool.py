@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Warm Pool - Standby replicas promoted into service on scale-up, and scale-up readiness timing"""
+
+import time
+import logging
+from collections import deque
+from threading import Lock, Event, Thread
+
+logger = logging.getLogger(__name__)
+
+SCALE_PATHS = ('warm_pool', 'partial', 'cold')
+
+
+class WarmPool:
+    """
+    A service labelled 'swarmguard.warm_pool=<K>' runs K replicas more than it
+    serves with. Its tasks boot in standby (STANDBY_START=true) and the
+    service healthcheck targets /ready, which fails until the task is
+    promoted, so Swarm keeps standbys out of the load balancer while they sit
+    in their start period. Swarm cannot move a task between services, so the
+    pool lives inside the service itself.
+
+    The reconciler keeps replicas - K tasks promoted (initial deployment,
+    tasks Swarm replaced). A scale-up promotes booted standbys for the added
+    capacity and raises the replica count by the same amount; the new tasks
+    boot in standby and refill the pool. Every scale-up is timed from the
+    decision until Swarm reports the added replicas running (healthy, in
+    rotation), by path: warm_pool, partial (pool too small) or cold.
+    """
+
+    def __init__(self, config, docker_controller, metrics, owns=None):
+        self.config = config
+        self.docker_controller = docker_controller
+        self.metrics = metrics
+        self.owns = owns or (lambda service_name: True)
+        self.lock = Lock()
+        # Reconciler and scale-ups must not both promote from the same view of the pool
+        self.promote_lock = Lock()
+        self.services = {}  # service_name -> pool size
+        self.pools = {}     # service_name -> last reconciled view
+        self.latencies = {path: deque(maxlen=100) for path in SCALE_PATHS}
+        self.promotions = 0
+        self.failed_promotions = 0
+        self.timeouts = 0
+        self.wake = Event()
+        self.running = False
+        self.thread = None
+        self.load_settings()
+
+    def load_settings(self):
+        settings = self.config.get('warm_pool', {}) or {}
+        self.enabled = settings.get('enabled', False)
+        self.reconcile_interval = float(settings.get('reconcile_interval', 2.0))
+        self.measure_scale_up = settings.get('measure_scale_up', True)
+        self.measure_interval = float(settings.get('measure_interval', 0.25))
+        self.measure_timeout = float(settings.get('measure_timeout', 120))
+
+    def pool_size(self, service_name: str) -> int:
+        if not self.enabled:
+            return 0
+        with self.lock:
+            return self.services.get(service_name, 0)
+
+    def active_replicas(self, service_name: str):
+        """Replicas meant to serve (desired replicas minus the pool), None if unknown"""
+        replicas = self.docker_controller.get_replica_count(service_name)
+        if replicas is None:
+            return None
+        return max(replicas - self.pool_size(service_name), 0)
+
+    def task_states(self, service_name: str) -> list:
+        """The service's tasks, each with 'standby' True/False (None: no address or no answer)"""
+        tasks = self.docker_controller.get_service_tasks(service_name)
+        for task in tasks:
+            task['standby'] = None
+            if task['address'] and task['state'] in ('starting', 'running'):
+                task['standby'] = self.docker_controller.standby_state(task['address'])
+        return tasks
+
+    def promote(self, service_name: str, tasks: list, count: int) -> list:
+        """Promote up to count standbys, longest-booted first; returns the promoted task IDs"""
+        promoted = []
+        for task in sorted((t for t in tasks if t['standby']), key=lambda t: t['created']):
+            if len(promoted) >= count:
+                break
+            if self.docker_controller.promote_standby(task['address']):
+                task['standby'] = False
+                promoted.append(task['id'])
+            else:
+                with self.lock:
+                    self.failed_promotions += 1
+                logger.warning(f"Failed to promote standby {task['id'][:12]} of {service_name} at {task['address']}")
+        if promoted:
+            with self.lock:
+                self.promotions += len(promoted)
+            logger.info(f"Promoted {len(promoted)} standby replica(s) of {service_name}: {[t[:12] for t in promoted]}")
+        return promoted
+
+    def scale_up(self, service_name: str, active: int, target: int = None) -> dict:
+        """Add target - active serving replicas (at least one): promote standbys, then refill the pool"""
+        start = time.time()
+        size = self.pool_size(service_name)
+        wanted = max((target or active + 1) - active, 1)
+        with self.promote_lock:
+            tasks = self.task_states(service_name)
+            running_before = sum(1 for t in tasks if t['state'] == 'running')
+            promoted = self.promote(service_name, tasks, wanted)
+            # Standbys booting for the refill are promoted by the reconciler if the pool fell short
+            result = self.docker_controller.scale_up(service_name, active + wanted + size)
+
+        outcome = dict(result, success=bool(promoted) or result.get('success', False), promoted=len(promoted),
+                       pool_size=size, active_replicas=active + wanted, duration_seconds=time.time() - start)
+        if promoted and not result.get('success'):
+            outcome['refill_error'] = outcome.pop('error', None)
+            logger.warning(f"Promoted {len(promoted)} standby(s) of {service_name} but the pool was not refilled: "
+                           f"{outcome['refill_error']}")
+        path = 'warm_pool' if len(promoted) >= wanted else 'partial' if promoted else 'cold'
+        if outcome['success']:
+            self.watch(service_name, path, running_before + wanted, start)
+        return outcome
+
+    def watch(self, service_name: str, path: str, running_target: int, started: float):
+        """Time the scale-up until the service has running_target running tasks (in the background)"""
+        if not (self.running and self.measure_scale_up):
+            return
+        Thread(target=self._watch, args=(service_name, path, running_target, started),
+               daemon=True, name=f'scale-watch-{service_name}').start()
+
+    def _watch(self, service_name: str, path: str, running_target: int, started: float):
+        while self.running and time.time() - started < self.measure_timeout:
+            tasks = self.docker_controller.get_service_tasks(service_name)
+            running = sum(1 for t in tasks if t['state'] == 'running')
+            if running >= running_target:
+                seconds = time.time() - started
+                with self.lock:
+                    self.latencies[path].append(seconds)
+                self.metrics.observe_scale_ready(path, seconds)
+                logger.info(f"Scale-up of {service_name} ready in {seconds:.2f}s via {path} ({running} running)")
+                return
+            time.sleep(self.measure_interval)
+        if self.running:
+            with self.lock:
+                self.timeouts += 1
+            logger.warning(f"Scale-up of {service_name} ({path}) not ready within {self.measure_timeout:.0f}s")
+
+    def reconcile(self):
+        """Keep replicas - pool size tasks promoted for every pool service this worker owns"""
+        services = {s: k for s, k in self.docker_controller.get_warm_pool_services().items() if self.owns(s)}
+        with self.lock:
+            self.services = services
+            for service_name in [s for s in self.pools if s not in services]:
+                del self.pools[service_name]
+
+        for service_name, size in services.items():
+            replicas = self.docker_controller.get_replica_count(service_name)
+            if replicas is None:
+                continue
+            with self.promote_lock:
+                tasks = self.task_states(service_name)
+                active = sum(1 for t in tasks if t['standby'] is False)
+                missing = replicas - size - active
+                if missing > 0:
+                    active += len(self.promote(service_name, tasks, missing))
+            with self.lock:
+                self.pools[service_name] = {'pool_size': size, 'replicas': replicas, 'active': active,
+                                            'standby': sum(1 for t in tasks if t['standby']),
+                                            'unknown': sum(1 for t in tasks if t['standby'] is None),
+                                            'updated': time.time()}
+
+    def reconcile_loop(self):
+        logger.info("Warm pool reconciler started")
+        while self.running:
+            self.wake.wait(self.reconcile_interval)
+            self.wake.clear()
+            if not self.running:
+                break
+            if not self.enabled:
+                continue
+            try:
+                self.reconcile()
+            except Exception as e:
+                logger.error(f"Error reconciling warm pools: {e}")
+        logger.info("Warm pool reconciler stopped")
+
+    def start(self):
+        self.running = True
+        self.wake.set()
+        self.thread = Thread(target=self.reconcile_loop, daemon=True, name='warm-pool')
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+    def latency_summary(self) -> dict:
+        with self.lock:
+            samples = {path: sorted(values) for path, values in self.latencies.items() if values}
+        return {path: {'count': len(values), 'p50_seconds': round(values[len(values) // 2], 3),
+                       'max_seconds': round(values[-1], 3)} for path, values in samples.items()}
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        with self.lock:
+            pools = {service: dict({k: v for k, v in pool.items() if k != 'updated'},
+                                   age_seconds=round(now - pool['updated'], 1)) for service, pool in self.pools.items()}
+        return {'enabled': self.enabled, 'services': pools, 'scale_up_ready': self.latency_summary()}
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'enabled': self.enabled, 'services': len(self.services), 'promotions': self.promotions,
+                    'failed_promotions': self.failed_promotions, 'scale_up_watch_timeouts': self.timeouts,
+                    'scale_up_ready_samples': {path: len(values) for path, values in self.latencies.items()}}
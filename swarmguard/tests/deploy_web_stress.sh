@@ -9,12 +9,40 @@
 #
 # This prevents Docker from restarting containers during heavy load testing
 # while still monitoring for actual crashes/failures.
+#
+# Warm pool (second argument, e.g. "./deploy_web_stress.sh 2 1"): keeps that many extra
+# replicas booted in standby. Their healthcheck targets /ready, which fails until the
+# recovery manager promotes them, and the long start period keeps Swarm from restarting
+# them meanwhile; the 1s start interval lets a promoted replica join the load balancer
+# within about a second. Requires warm_pool.enabled in the recovery manager config.
+#
+# Limitation: Swarm has no readiness check separate from the healthcheck, so during the
+# start period it does not check liveness of a standby either - a hung standby stays
+# in the pool (the warm pool counts it as 'unknown' and does not promote it) until the
+# period ends, fails its healthcheck and Swarm replaces it. STANDBY_START_PERIOD (third
+# argument, default 24h) bounds that: a shorter period recycles unpromoted standbys
+# sooner, at the cost of rebooting healthy ones as often.
+#
+# The swarmguard.latency.port container label has the monitoring agents scrape each
+# replica's GET /latency (in-flight requests, per-route latency histograms), so rules
+# can scale on p95 latency and concurrency (see rules in the recovery manager config).
+# swarmguard.latency.exclude_routes keeps the bulk downloads and the stress controls
+# out of the percentiles, so p95 tracks the request path the SLO is about.
 
 set -e
 
 REGISTRY="docker-registry.amirmuz.com"
 IMAGE="${REGISTRY}/swarmguard-web-stress:latest"
 REPLICAS=${1:-1}  # Default to 1 replica
+WARM_POOL=${2:-0}  # Standby replicas on top of REPLICAS
+STANDBY_START_PERIOD=${3:-${STANDBY_START_PERIOD:-24h}}  # Longest a standby waits for promotion
+
+HEALTH_ARGS="--health-cmd 'curl -f http://localhost:8080/health || exit 1' --health-start-period 30s"
+POOL_ARGS=""
+if [ "${WARM_POOL}" -gt 0 ]; then
+  HEALTH_ARGS="--health-cmd 'curl -f http://localhost:8080/ready || exit 1' --health-start-period ${STANDBY_START_PERIOD} --health-start-interval 1s"
+  POOL_ARGS="--label swarmguard.warm_pool=${WARM_POOL} --env STANDBY_START=true"
+fi
 
 echo "==========================================="
 echo "Deploying web-stress"
@@ -24,16 +52,18 @@ echo ""
 echo "[1/2] Deploying to Docker Swarm..."
 ssh master "docker service create \
   --name web-stress \
-  --replicas ${REPLICAS} \
+  --replicas $((REPLICAS + WARM_POOL)) \
   --constraint 'node.role==worker' \
   --constraint 'node.hostname!=master' \
   --network swarmguard-net \
   --publish 8080:8080 \
-  --health-cmd 'curl -f http://localhost:8080/health || exit 1' \
+  --container-label swarmguard.latency.port=8080 \
+  --container-label 'swarmguard.latency.exclude_routes=GET /download/data,GET /stress/*' \
+  ${HEALTH_ARGS} \
   --health-interval 15s \
   --health-timeout 10s \
   --health-retries 5 \
-  --health-start-period 30s \
+  ${POOL_ARGS} \
   ${IMAGE}"
 
 echo ""
@@ -67,6 +97,7 @@ echo ""
 echo "Available endpoints:"
 echo "  - http://192.168.2.50:8080/health"
 echo "  - http://192.168.2.50:8080/metrics"
+echo "  - http://192.168.2.50:8080/latency"
 echo "  - http://192.168.2.50:8080/stress/cpu?target=80&duration=120&ramp=30"
 echo "  - http://192.168.2.50:8080/stress/memory?target=1024&duration=120&ramp=30"
 echo "  - http://192.168.2.50:8080/stress/network?bandwidth=50&duration=120&ramp=30"
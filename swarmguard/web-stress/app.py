@@ -1,35 +1,88 @@
 #!/usr/bin/env python3
 """SwarmGuard Web Stress Application - Controllable stress testing"""
 
+import os
 import time
 import logging
 from threading import Thread
-from fastapi import FastAPI, BackgroundTasks
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, BackgroundTasks, Request
+from fastapi.responses import JSONResponse
 import uvicorn
 
 from stress.cpu_stress import CPUStressor
 from stress.memory_stress import MemoryStressor
 from stress.network_stress import NetworkStressor
 from metrics import get_current_metrics
+from latency import LatencyMiddleware, LatencyTracker
+from compute import ComputePool
+from payload import MB, Payload, PayloadResponse, parse_range
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="SwarmGuard Web Stress", version="1.0")
+compute_pool = ComputePool()
+payload = Payload()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    compute_pool.start()
+    yield
+    compute_pool.stop()
+
+
+app = FastAPI(title="SwarmGuard Web Stress", version="1.0", lifespan=lifespan)
+
+# In-flight requests and per-route latency histograms, scraped by the monitoring agent from
+# GET /latency (service label swarmguard.latency.port) to scale on latency instead of CPU
+latency_tracker = LatencyTracker()
+app.add_middleware(LatencyMiddleware, tracker=latency_tracker)
 
 cpu_stressor = CPUStressor()
 memory_stressor = MemoryStressor()
 network_stressor = NetworkStressor()
 
+# Warm standby: with STANDBY_START=true the replica boots out of rotation - /ready answers 503
+# (the service healthcheck targets /ready, so Swarm's load balancer skips it) until the
+# recovery manager promotes it with POST /standby/promote. /health stays liveness-only.
+standby = {"active": os.getenv("STANDBY_START", "false").lower() == "true", "since": time.time()}
+
 
 @app.get("/health")
 async def health():
     return {"status": "healthy", "uptime": time.time()}
 
 
+@app.get("/ready")
+async def ready():
+    if standby["active"]:
+        return JSONResponse({"status": "standby"}, status_code=503)
+    return {"status": "ready"}
+
+
+@app.get("/standby")
+async def standby_state():
+    return {"standby": standby["active"], "since": standby["since"]}
+
+
+@app.post("/standby/promote")
+async def promote_standby():
+    was_standby = standby["active"]
+    if was_standby:
+        logger.info(f"Promoted from standby after {time.time() - standby['since']:.1f}s")
+        standby.update(active=False, since=time.time())
+    return {"standby": False, "promoted": was_standby}
+
+
 @app.get("/metrics")
 async def metrics():
-    return get_current_metrics()
+    return dict(get_current_metrics(), cpu_stress=cpu_stressor.stats())
+
+
+@app.get("/latency")
+async def latency():
+    return latency_tracker.snapshot()
 
 
 @app.get("/stress/cpu")
@@ -80,77 +133,69 @@ async def stop_stress():
 
 
 @app.get("/compute/pi")
-async def compute_pi(iterations: int = 1000000):
+async def compute_pi(iterations: int = 1000000, batch: int = 1):
     """
     Calculate Pi using Monte Carlo method - CPU-intensive operation
     Used for generating distributed load across replicas
-    """
-    import random
-
-    inside_circle = 0
-    total_points = iterations
-
-    for _ in range(total_points):
-        x = random.random()
-        y = random.random()
 
-        if x*x + y*y <= 1:
-            inside_circle += 1
-
-    pi_estimate = (inside_circle / total_points) * 4
-
-    return {
-        "pi_estimate": pi_estimate,
+    Runs in the compute pool (one process per CPU of the container's quota,
+    vectorized NumPy chunks), so load spreads across cores and /health keeps
+    answering. batch > 1 returns that many independent estimates; pi_estimate
+    is then their mean.
+    """
+    if iterations < 1 or not 1 <= batch <= compute_pool.max_batch:
+        return JSONResponse({"status": "error", "message": f"iterations must be >= 1 and batch 1-{compute_pool.max_batch}"},
+                            status_code=400)
+    estimates = await compute_pool.estimate_pi(iterations, batch)
+    result = {
+        "pi_estimate": sum(estimates) / batch,
         "iterations": iterations,
         "status": "completed"
     }
+    if batch > 1:
+        result.update(batch=batch, estimates=estimates)
+    return result
 
 
 @app.get("/download/data")
-async def download_data(size_mb: int = 10, cpu_work: int = 100000):
+async def download_data(request: Request, size_mb: int = 10, cpu_work: int = 100000,
+                        chunk_kb: int = int(os.getenv("DOWNLOAD_CHUNK_KB", "1024"))):
     """
-    Generate and serve data payload for download - creates REAL network traffic
+    Serve a data payload for download - creates REAL network traffic
 
     Args:
-        size_mb: Size of data to generate in MB (creates real network load)
-        cpu_work: Number of Pi iterations to do while generating data (CPU load)
+        size_mb: Size of data to serve in MB (creates real network load)
+        cpu_work: Number of Pi iterations to do before serving it (CPU load)
+        chunk_kb: Size of each chunk written to the socket
 
     This endpoint:
-    - Generates real data that flows through Docker Swarm load balancer
-    - Does CPU work (Pi calculation) while generating the payload
-    - Consumes memory to hold the payload
-    - Creates measurable network traffic when Alpine downloads it
+    - Serves data that flows through Docker Swarm load balancer
+    - Does CPU work (Pi calculation) in the compute pool, off the event loop
+    - Streams zero-copy slices of one memory-mapped payload (no per-chunk allocation)
+    - Supports HTTP Range requests (single range) for partial and resumed downloads
     """
-    import random
-    from fastapi.responses import StreamingResponse
-    import io
-
-    # Do CPU-intensive work (Pi calculation)
-    inside_circle = 0
-    for _ in range(cpu_work):
-        x = random.random()
-        y = random.random()
-        if x*x + y*y <= 1:
-            inside_circle += 1
-
-    # Generate data payload (creates memory + network load)
-    # Each MB = 1,048,576 bytes
-    chunk_size = 1024 * 1024  # 1 MB chunks
-
-    def generate_data():
-        for _ in range(size_mb):
-            # Generate random data chunk
-            yield b'X' * chunk_size
-
-    return StreamingResponse(
-        generate_data(),
-        media_type="application/octet-stream",
-        headers={
-            "Content-Disposition": f"attachment; filename=data_{size_mb}mb.bin",
-            "X-CPU-Work": str(cpu_work),
-            "X-Data-Size": f"{size_mb}MB"
-        }
-    )
+    if size_mb < 0 or cpu_work < 0 or not 4 <= chunk_kb <= 16384:
+        return JSONResponse({"status": "error", "message": "size_mb and cpu_work must be >= 0, chunk_kb 4-16384"},
+                            status_code=400)
+    if cpu_work:
+        await compute_pool.estimate_pi(cpu_work)
+
+    total = size_mb * MB
+    headers = {
+        "Content-Disposition": f"attachment; filename=data_{size_mb}mb.bin",
+        "Accept-Ranges": "bytes",
+        "X-CPU-Work": str(cpu_work),
+        "X-Data-Size": f"{size_mb}MB"
+    }
+    requested = parse_range(request.headers.get("range"), total)
+    if requested == "unsatisfiable":
+        return JSONResponse({"status": "error", "message": "range not satisfiable"}, status_code=416,
+                            headers={"Content-Range": f"bytes */{total}"})
+    if requested is None:
+        return PayloadResponse(payload, 0, total, chunk_kb * 1024, headers=headers)
+    start, end = requested
+    headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+    return PayloadResponse(payload, start, end - start + 1, chunk_kb * 1024, status_code=206, headers=headers)
 
 
 @app.get("/stress/incremental")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Container CPU limits and usage from the cgroup filesystem (v2, falling back to v1)"""
+
+import os
+import math
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+
+def _read(path: str):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_quota(root: str = CGROUP_ROOT):
+    """CPUs the container may use (e.g. 1.5 for --limit-cpu 1.5), None if unlimited"""
+    limit = _read(os.path.join(root, 'cpu.max'))  # v2: '<quota> <period>' or 'max <period>'
+    if limit:
+        quota, _, period = limit.partition(' ')
+        if quota != 'max' and period:
+            return int(quota) / int(period)
+        return None
+    quota = _read(os.path.join(root, 'cpu', 'cpu.cfs_quota_us')) or _read(os.path.join(root, 'cpu,cpuacct', 'cpu.cfs_quota_us'))
+    period = _read(os.path.join(root, 'cpu', 'cpu.cfs_period_us')) or _read(os.path.join(root, 'cpu,cpuacct', 'cpu.cfs_period_us'))
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def cpu_usage_seconds(root: str = CGROUP_ROOT):
+    """CPU time used by every process in the container so far (s), None without a readable cgroup"""
+    stat = _read(os.path.join(root, 'cpu.stat'))  # v2: 'usage_usec <n>' line
+    if stat:
+        for line in stat.splitlines():
+            key, _, value = line.partition(' ')
+            if key == 'usage_usec':
+                return int(value) / 1e6
+    usage = _read(os.path.join(root, 'cpuacct', 'cpuacct.usage')) or _read(os.path.join(root, 'cpu,cpuacct', 'cpuacct.usage'))
+    return int(usage) / 1e9 if usage else None
+
+
+def cpu_capacity() -> float:
+    """CPUs the container can use at most: its quota, or the CPUs it may run on"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = cpu_quota()
+    return min(cpus, quota) if quota else float(cpus)
+
+
+def available_cpus() -> int:
+    """Whole CPUs this container can keep busy: its capacity rounded up"""
+    return max(1, math.ceil(cpu_capacity() - 1e-9))
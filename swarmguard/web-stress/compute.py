@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""CPU-bound request work (Monte Carlo Pi) in a process pool, off the event loop"""
+
+import os
+import math
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cgroup import available_cpus
+
+logger = logging.getLogger(__name__)
+
+
+def count_inside(points: int, chunk: int) -> int:
+    """Of `points` random points in the unit square, how many fall in the quarter circle (vectorized chunks)"""
+    rng = np.random.default_rng()
+    size = min(chunk, points)
+    x, y = np.empty(size), np.empty(size)
+    inside = 0
+    while points > 0:
+        n = min(size, points)
+        rng.random(out=x[:n])
+        rng.random(out=y[:n])
+        np.multiply(x[:n], x[:n], out=x[:n])
+        np.multiply(y[:n], y[:n], out=y[:n])
+        x[:n] += y[:n]
+        inside += int(np.count_nonzero(x[:n] <= 1.0))
+        points -= n
+    return inside
+
+
+def _ready() -> bool:
+    return True
+
+
+class ComputePool:
+    """
+    A process pool sized to the container's CPU quota (COMPUTE_WORKERS
+    overrides), so Pi requests load every core the replica is given and the
+    event loop stays free for /health and /ready. An estimate larger than one
+    chunk is split across the workers; a batch is several independent
+    estimates in one request.
+    """
+
+    def __init__(self):
+        self.workers = int(os.getenv('COMPUTE_WORKERS', '0')) or available_cpus()
+        self.chunk = int(os.getenv('COMPUTE_CHUNK', str(1 << 18)))
+        self.max_batch = int(os.getenv('COMPUTE_MAX_BATCH', '64'))
+        self.executor = None
+
+    def start(self):
+        if self.executor is not None:
+            return
+        # spawn: forking the server's process (event loop, threads) is not safe
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        for _ in range(self.workers):
+            self.executor.submit(_ready)  # start the workers now rather than on the first request
+        logger.info(f"Compute pool: {self.workers} worker processes, {self.chunk} points per chunk")
+
+    def stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def estimate_pi(self, iterations: int, batch: int = 1) -> list:
+        """`batch` independent Pi estimates of `iterations` points each"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        parts = max(1, min(self.workers, math.ceil(iterations / self.chunk)))
+        sizes = [iterations // parts + (1 if i < iterations % parts else 0) for i in range(parts)]
+        counts = await asyncio.gather(*(loop.run_in_executor(self.executor, count_inside, size, self.chunk)
+                                        for _ in range(batch) for size in sizes))
+        return [4 * sum(counts[i * parts:(i + 1) * parts]) / iterations for i in range(batch)]
+
+    def stats(self) -> dict:
+        return {'workers': self.workers, 'chunk': self.chunk, 'max_batch': self.max_batch, 'running': self.executor is not None}
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Request latency - ASGI middleware counting in-flight requests and keeping a
+latency histogram per route
+
+The monitoring agent scrapes GET /latency every poll and works out the
+poll's p50/p95, request rate and mean concurrency from the differences
+between two scrapes, so everything here is a cumulative counter.
+"""
+
+import os
+import time
+from bisect import bisect_left
+
+# Bucket upper bounds (ms); the last bucket counts everything slower
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+DEFAULT_EXCLUDE = '/health,/ready,/standby,/standby/promote,/metrics,/latency'
+
+
+class RouteStats:
+    __slots__ = ('counts', 'sum_ms', 'errors')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum_ms = 0.0
+        self.errors = 0
+
+
+class LatencyTracker:
+    """
+    Per-route ('GET /compute/pi') histograms and the number of requests in
+    flight. in_flight_seconds integrates the in-flight count over time, so its
+    difference between two scrapes divided by the time between them is the
+    mean concurrency over that interval (spikes between scrapes included).
+    Updated from the event loop only, so no locking.
+    """
+
+    def __init__(self, buckets: tuple = BUCKETS_MS, exclude: str = None):
+        self.buckets = tuple(buckets)
+        self.exclude = frozenset(p.strip() for p in (exclude if exclude is not None else
+                                                      os.getenv('LATENCY_EXCLUDE', DEFAULT_EXCLUDE)).split(',') if p.strip())
+        self.routes = {}
+        self.in_flight = 0
+        self.started = time.time()
+        self._area = 0.0
+        self._changed = time.monotonic()
+
+    def _advance(self, now: float):
+        self._area += self.in_flight * (now - self._changed)
+        self._changed = now
+
+    def enter(self):
+        self._advance(time.monotonic())
+        self.in_flight += 1
+
+    def exit(self, route: str, duration: float, status: int):
+        self._advance(time.monotonic())
+        self.in_flight -= 1
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = RouteStats(len(self.buckets) + 1)
+        ms = duration * 1000
+        stats.counts[bisect_left(self.buckets, ms)] += 1
+        stats.sum_ms += ms
+        if status >= 500:
+            stats.errors += 1
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        self._advance(now)
+        return {'started': self.started, 'clock': now, 'buckets_ms': list(self.buckets),
+                'in_flight': self.in_flight, 'in_flight_seconds': round(self._area, 6),
+                'routes': {route: {'counts': list(s.counts), 'sum_ms': round(s.sum_ms, 3), 'errors': s.errors}
+                           for route, s in self.routes.items()}}
+
+
+class LatencyMiddleware:
+    """
+    Pure ASGI middleware (no per-request Request/Response objects). The
+    route is the matched path template, so '/items/{id}' stays one series;
+    requests that match no route are counted as 'unmatched'. A request's
+    latency runs until the app returns, i.e. after the last body chunk was
+    sent - the whole download for streamed responses.
+    """
+
+    def __init__(self, app, tracker: LatencyTracker):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] in self.tracker.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        self.tracker.enter()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            route = scope.get('route')
+            path = getattr(route, 'path', None)
+            self.tracker.exit(f"{scope['method']} {path}" if path else 'unmatched', time.perf_counter() - start, status)
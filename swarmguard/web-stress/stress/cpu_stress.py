@@ -1,95 +1,130 @@
 #!/usr/bin/env python3
-"""CPU Stressor - Gradual CPU load generation"""
+"""CPU Stressor - Gradual, closed-loop CPU load across every core of the container"""
 
+import os
 import time
 import logging
 import multiprocessing
-from threading import Thread, Event
-
-logger = logging.getLogger(__name__)
+from threading import Event
 
+from cgroup import available_cpus, cpu_capacity, cpu_usage_seconds
 
-def cpu_burn_process(target_percent, ramp_seconds, duration_seconds):
-    """Burn CPU gradually ramping from 0% to target_percent over ramp_seconds"""
-    start_time = time.time()
-    end_time = start_time + duration_seconds
-
-    while time.time() < end_time:
-        elapsed = time.time() - start_time
+logger = logging.getLogger(__name__)
 
-        # Calculate current target percentage based on ramp
-        if elapsed < ramp_seconds:
-            # Gradual ramp: 0% → target_percent over ramp_seconds
-            current_percent = (elapsed / ramp_seconds) * target_percent
-        else:
-            # After ramp, maintain target
-            current_percent = target_percent
+PERIOD = 0.01  # duty-cycle period: 10ms on/off slices average out within any sample window
+CONTROL_INTERVAL = 0.5
+GAIN = 0.5  # share of the remaining error corrected per control interval
 
-        # Burn CPU for current_percent of each second
-        cycle_start = time.time()
-        burn_duration = current_percent / 100.0
 
-        # Busy loop for burn_duration seconds
-        while (time.time() - cycle_start) < burn_duration:
+def duty_cycle_process(duty, period: float = PERIOD):
+    """Busy for duty.value of every period, asleep for the rest; exits when duty goes negative"""
+    while True:
+        share = duty.value
+        if share < 0:
+            return
+        start = time.perf_counter()
+        busy_until = start + share * period
+        while time.perf_counter() < busy_until:
             _ = 2 ** 1000
-
-        # Sleep for the rest of the second
-        sleep_time = max(0, 1.0 - (time.time() - cycle_start))
-        if sleep_time > 0:
-            time.sleep(sleep_time)
+        remaining = start + period - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
 
 
 class CPUStressor:
-    def __init__(self):
+    """
+    One duty-cycled worker process per CPU the container may use
+    (CPU_STRESS_WORKERS overrides), all sharing one duty value. target_percent
+    is a share of the container's capacity (its CPU quota, else the CPUs it
+    may run on). The duty starts from the open-loop estimate and a controller
+    corrects it every CONTROL_INTERVAL from the cgroup's measured CPU usage,
+    so the container as a whole - including the server's own work - settles
+    at the target. Without a readable cgroup it runs open loop.
+    usage_fn replaces the cgroup reading (returns CPU seconds used so far).
+    """
+
+    def __init__(self, usage_fn=None):
         self.active = False
-        self.processes = []
-
-    def cpu_burn(self, target_percent: float, stop_event: Event):
-        """Burn CPU cycles to achieve target percentage (legacy threading version)"""
-        while not stop_event.is_set():
-            start_time = time.time()
-            # Busy-wait for target_percent of each second
-            end_time = start_time + (target_percent / 100.0)
-            while time.time() < end_time:
-                # Maximum intensity calculation
-                for _ in range(100000):
-                    _ = 2 ** 1000
-            # Sleep for the remaining time
-            sleep_time = max(0, 1.0 - (time.time() - start_time))
-            if sleep_time > 0:
-                time.sleep(sleep_time)
+        self.usage_fn = usage_fn or cpu_usage_seconds
+        self.run = None  # {'stop', 'duty', 'processes'} of the stress currently running
+        self.state = {'target_percent': 0.0, 'measured_percent': None, 'duty': 0.0, 'workers': 0}
 
     def start_stress(self, target_percent: int, duration_seconds: int, ramp_seconds: int):
         self.stop()
+        workers = int(os.getenv('CPU_STRESS_WORKERS', '0')) or available_cpus()
+        capacity = cpu_capacity()
+        context = multiprocessing.get_context('spawn')
+        run = {'stop': Event(), 'duty': context.Value('d', 0.0, lock=False), 'processes': []}
+        self.run = run
         self.active = True
-
         try:
-            # Use single process that gradually increases CPU from 0% to target%
-            logger.info(f"Starting CPU stress: 0% → {target_percent}% over {ramp_seconds}s, hold for {duration_seconds}s")
-
-            # Start single process with gradual ramp
-            p = multiprocessing.Process(
-                target=cpu_burn_process,
-                args=(target_percent, ramp_seconds, duration_seconds)
-            )
-            p.start()
-            self.processes.append(p)
-
-            logger.info(f"CPU stress: ramping to {target_percent}% over {ramp_seconds}s")
-
-            # Wait for the process to complete
-            p.join()
+            logger.info(f"Starting CPU stress: 0% → {target_percent}% of {capacity:g} CPUs over {ramp_seconds}s "
+                        f"on {workers} workers, hold for {duration_seconds}s")
+            for _ in range(workers):
+                p = context.Process(target=duty_cycle_process, args=(run['duty'],), daemon=True)
+                p.start()
+                run['processes'].append(p)
+            self.control(run, target_percent, duration_seconds, ramp_seconds, workers, capacity)
         finally:
-            self.stop()
-
-    def stop(self):
-        logger.info(f"Stopping {len(self.processes)} CPU processes...")
-        for p in self.processes:
+            self.stop_run(run)
+
+    def control(self, run: dict, target_percent: float, duration_seconds: float, ramp_seconds: float,
+                workers: int, capacity: float):
+        start = time.time()
+        correction = 0.0
+        last_usage, last_time = self.usage_fn(), time.perf_counter()
+        if last_usage is None:
+            logger.warning("No cgroup CPU usage available - CPU stress runs open loop")
+        last_log = start
+
+        while not run['stop'].is_set():
+            elapsed = time.time() - start
+            if elapsed >= duration_seconds:
+                break
+            # Gradual ramp: 0% → target_percent over ramp_seconds
+            setpoint = target_percent * min(elapsed / ramp_seconds, 1.0) if ramp_seconds > 0 else target_percent
+            # Open-loop share per worker for the setpoint, plus the controller's correction
+            feed_forward = setpoint / 100.0 * capacity / workers
+
+            usage, now = self.usage_fn(), time.perf_counter()
+            measured = None
+            if usage is not None and last_usage is not None and now > last_time:
+                measured = (usage - last_usage) / (now - last_time) / capacity * 100.0
+                correction += GAIN * (setpoint - measured) / 100.0 * capacity / workers
+                correction = max(-1.0, min(1.0, correction))  # anti-windup
+            last_usage, last_time = usage, now
+
+            duty = max(0.0, min(1.0, feed_forward + correction))
+            run['duty'].value = duty
+            self.state = {'target_percent': round(setpoint, 1),
+                          'measured_percent': None if measured is None else round(measured, 1),
+                          'duty': round(duty, 3), 'workers': workers}
+            if time.time() - last_log >= 10:
+                logger.info(f"CPU stress: target={setpoint:.1f}% measured={self.state['measured_percent']}% duty={duty:.2f}")
+                last_log = time.time()
+            run['stop'].wait(CONTROL_INTERVAL)
+
+    def stats(self) -> dict:
+        return dict(self.state, active=self.active)
+
+    def stop_run(self, run: dict):
+        run['stop'].set()
+        run['duty'].value = -1.0  # workers exit at the end of their current period
+        logger.info(f"Stopping {len(run['processes'])} CPU processes...")
+        for p in run['processes']:
+            p.join(timeout=PERIOD * 10)
             if p.is_alive():
                 p.terminate()
                 p.join(timeout=2)
                 if p.is_alive():
                     p.kill()
-        self.processes = []
-        self.active = False
-        logger.info("CPU stress stopped")
+        run['processes'] = []
+        if self.run is run:
+            self.run = None
+            self.active = False
+            self.state = dict(self.state, target_percent=0.0, measured_percent=None, duty=0.0)
+            logger.info("CPU stress stopped")
+
+    def stop(self):
+        if self.run is not None:
+            self.stop_run(self.run)
@@ -0,0 +1,24 @@
+import pytest
+
+from payload import parse_range
+
+
+@pytest.mark.parametrize('header, total, expected', [
+    (None, 100, None),
+    ('bytes=0-9', 100, (0, 9)),
+    ('bytes=90-', 100, (90, 99)),
+    ('bytes=90-500', 100, (90, 99)),
+    ('bytes=-5', 100, (95, 99)),
+    ('bytes=-500', 100, (0, 99)),
+    ('bytes=0-0,5-9', 100, None),
+    ('bytes=-', 100, None),
+    # Invalid ranges are ignored: the whole body, not 416
+    ('bytes=9-3', 100, None),
+    ('bytes=100-', 100, 'unsatisfiable'),
+    ('bytes=-0', 100, 'unsatisfiable'),
+    # Nothing of an empty body is satisfiable
+    ('bytes=-5', 0, 'unsatisfiable'),
+    ('bytes=0-', 0, 'unsatisfiable'),
+])
+def test_parse_range(header, total, expected):
+    assert parse_range(header, total) == expected